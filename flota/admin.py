@@ -1,6 +1,19 @@
 # flota/admin.py
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 from .models import *
+from .services.cierre_anual import cerrar_anio, reabrir_anio
+from .services.movimientos_presupuesto import presupuesto_diferido
+
+
+class PresupuestoDiferidoAdmin(admin.ModelAdmin):
+    """
+    Borrado masivo de registros que cargan presupuesto: el libro se sincroniza una vez al final, con un UPDATE por (cuenta, año).
+    """
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(), presupuesto_diferido():
+            super().delete_queryset(request, queryset)
 
 class ViajePacienteInline(admin.TabularInline):
     model = PacienteTraslado
@@ -61,7 +74,7 @@ class PacienteTrasladoAdmin(admin.ModelAdmin):
     search_fields = ('rut',)
 
 @admin.register(CargaCombustible)
-class CargaCombustibleAdmin(admin.ModelAdmin):
+class CargaCombustibleAdmin(PresupuestoDiferidoAdmin):
     list_display = ('fecha', 'patente_vehiculo', 'litros', 'costo_total')
     list_filter = ('fecha', 'patente_vehiculo')
     date_hierarchy = 'fecha'
@@ -74,24 +87,24 @@ class FallaReportadaAdmin(admin.ModelAdmin):
 
 @admin.register(Alerta)
 class AlertaAdmin(admin.ModelAdmin):
-    list_display = ('vehiculo', 'descripcion', 'valor_umbral', 'vigente', 'generado_en')
-    list_filter = ('vigente', 'vehiculo')
+    list_display = ('vehiculo', 'regla', 'descripcion', 'valor_umbral', 'vigente', 'generado_en')
+    list_filter = ('vigente', 'regla', 'vehiculo')
     date_hierarchy = 'generado_en'
 
 @admin.register(Mantenimiento)
-class MantenimientoAdmin(admin.ModelAdmin):
+class MantenimientoAdmin(PresupuestoDiferidoAdmin):
     list_display = ('vehiculo', 'tipo_mantencion', 'fecha_ingreso', 'estado', 'costo_total_real')
     list_filter = ('tipo_mantencion', 'estado', 'vehiculo')
     date_hierarchy = 'fecha_ingreso'
 
 @admin.register(Arriendo)
-class ArriendoAdmin(admin.ModelAdmin):
+class ArriendoAdmin(PresupuestoDiferidoAdmin):
     list_display = ('vehiculo_arrendado', 'vehiculo_reemplazado', 'fecha_inicio', 'fecha_fin', 'estado')
     list_filter = ('estado', 'proveedor')
     date_hierarchy = 'fecha_inicio'
 
 @admin.register(OrdenCompra)
-class OrdenCompraAdmin(admin.ModelAdmin):
+class OrdenCompraAdmin(PresupuestoDiferidoAdmin):
     list_display = ('nro_oc', 'fecha_emision', 'proveedor', 'monto_total', 'estado')
     list_filter = ('estado', 'proveedor', 'fecha_emision')
     search_fields = ('nro_oc', 'id_licitacion', 'folio_sigfe')
@@ -115,9 +128,62 @@ class PresupuestoAdmin(admin.ModelAdmin):
     list_display = ('anio', 'cuenta', 'monto_asignado', 'monto_ejecutado', 'disponible', 'activo')
     list_filter = ('anio', 'activo', 'cuenta')
     search_fields = ('cuenta__codigo', 'cuenta__nombre')
+    actions = ['cerrar_anios']
+
+    @admin.action(description='Cerrar año fiscal de los presupuestos seleccionados')
+    def cerrar_anios(self, request, queryset):
+        for anio in sorted(set(queryset.values_list('anio', flat=True))):
+            try:
+                cerrar_anio(anio, usuario=request.user)
+                self.message_user(request, f'Año {anio} cerrado.', messages.SUCCESS)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
 
 @admin.register(CuentaPresupuestaria)
 class CuentaPresupuestariaAdmin(admin.ModelAdmin):
     list_display = ('codigo', 'nombre')
     search_fields = ('codigo', 'nombre')
-    
\ No newline at end of file
+    
+@admin.register(ResumenMensualVehiculo)
+class ResumenMensualVehiculoAdmin(admin.ModelAdmin):
+    list_display = ('vehiculo', 'anio', 'mes', 'km_recorridos', 'costo_combustible', 'costo_preventivo', 'costo_correctivo', 'dias_fuera_servicio', 'actualizado_en')
+    list_filter = ('anio', 'mes', 'vehiculo')
+    readonly_fields = ('actualizado_en',)
+
+@admin.register(CierreAnual)
+class CierreAnualAdmin(admin.ModelAdmin):
+    list_display = ('anio', 'cerrado_en', 'cerrado_por', 'planilla_mantenimientos')
+    fields = ('anio', 'cerrado_en', 'cerrado_por', 'planilla_mantenimientos')
+    readonly_fields = fields
+    actions = ['reabrir_anios']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Reabrir años seleccionados (borra el snapshot)')
+    def reabrir_anios(self, request, queryset):
+        for anio in list(queryset.values_list('anio', flat=True)):
+            reabrir_anio(anio)
+            self.message_user(request, f'Año {anio} reabierto.', messages.SUCCESS)
+
+@admin.register(LecturaOdometro)
+class LecturaOdometroAdmin(admin.ModelAdmin):
+    list_display = ('vehiculo', 'fecha', 'km', 'origen', 'origen_id', 'creado_en')
+    list_filter = ('origen', 'vehiculo')
+    readonly_fields = ('creado_en',)
+
+@admin.register(MovimientoPresupuestario)
+class MovimientoPresupuestarioAdmin(admin.ModelAdmin):
+    list_display = ('anio', 'cuenta', 'monto', 'tipo', 'origen', 'origen_id', 'creado_en')
+    list_filter = ('anio', 'tipo', 'origen', 'cuenta')
+    search_fields = ('cuenta__codigo',)
+
+    # Solo inserción: las correcciones son nuevos movimientos
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -5,18 +5,39 @@ from calendar import monthrange
 from collections import defaultdict
 from datetime import date
 from decimal import Decimal
+from functools import cached_property
 
 from django.db.models import (
+    Aggregate,
+    Avg,
+    Case,
     Count,
     ExpressionWrapper,
     F,
+    FloatField,
     IntegerField,
-    Max,
-    Min,
+    OuterRef,
+    Subquery,
     Sum,
+    Value,
+    When,
 )
+from django.db.models.functions import ExtractHour, ExtractMinute, ExtractSecond
 
-from .models import HojaRuta
+from .models import LecturaOdometro, Vehiculo
+from .services.resumen_mensual import es_periodo_mensual, leer_resumenes, usar_resumen_mensual
+
+
+class PercentilContinuo(Aggregate):
+    """
+    PERCENTILE_CONT(fraccion) WITHIN GROUP (ORDER BY expresion) de PostgreSQL.
+    """
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraccion)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraccion, **extra):
+        super().__init__(expression, fraccion=float(fraccion), **extra)
 
 
 def rango_fechas_reporte(anio, mes=None):
@@ -30,76 +51,54 @@ def rango_fechas_reporte(anio, mes=None):
     return date(anio, 1, 1), date(anio, 12, 31)
 
 
-def km_recorridos_desde_hojas(vehiculo_ids, fecha_desde, fecha_hasta):
-    """
-    Suma (km_fin - km_inicio) por vehículo en el período.
-    """
-    if not vehiculo_ids:
-        return {}
-    qs = HojaRuta.objects.filter(
-        vehiculo_id__in=vehiculo_ids,
-        fecha__gte=fecha_desde,
-        fecha__lte=fecha_hasta,
-        km_fin__isnull=False,
-    ).values('vehiculo_id').annotate(
-        km_sum=Sum(
-            ExpressionWrapper(
-                F('km_fin') - F('km_inicio'),
-                output_field=IntegerField(),
-            )
-        )
-    )
-    return {row['vehiculo_id']: max(0, row['km_sum'] or 0) for row in qs}
-
-
-def km_recorridos_fallback_cargas(vehiculo_ids, fecha_desde, fecha_hasta):
+def km_recorridos_desde_lecturas(vehiculo_ids, fecha_desde, fecha_hasta):
     """
-    max(km carga) - min(km carga) por vehículo si hay cargas en el período.
+    Última lectura de odómetro del período menos la última anterior al período (o la primera del período si no hay anteriores).
+    Cada valor es una búsqueda en el índice (vehiculo, fecha, km) de LecturaOdometro: una consulta para toda la flota.
     """
     if not vehiculo_ids:
         return {}
-    from .models import CargaCombustible
-
-    qs = (
-        CargaCombustible.objects.filter(
-            patente_vehiculo_id__in=vehiculo_ids,
-            fecha__gte=fecha_desde,
-            fecha__lte=fecha_hasta,
-        )
-        .values('patente_vehiculo_id')
-        .annotate(mx=Max('kilometraje_al_cargar'), mn=Min('kilometraje_al_cargar'))
-    )
+    lecturas = LecturaOdometro.objects.filter(vehiculo=OuterRef('pk'))
+    en_periodo = lecturas.filter(fecha__gte=fecha_desde, fecha__lte=fecha_hasta)
+    qs = Vehiculo.objects.filter(pk__in=vehiculo_ids).annotate(
+        km_ultima=Subquery(en_periodo.order_by('-fecha', '-km').values('km')[:1]),
+        km_primera=Subquery(en_periodo.order_by('fecha', 'km').values('km')[:1]),
+        km_anterior=Subquery(lecturas.filter(fecha__lt=fecha_desde).order_by('-fecha', '-km').values('km')[:1]),
+    ).values_list('pk', 'km_ultima', 'km_primera', 'km_anterior')
     out = {}
-    for row in qs:
-        mx, mn = row['mx'], row['mn']
-        if mx is not None and mn is not None:
-            out[row['patente_vehiculo_id']] = max(0, mx - mn)
-        else:
-            out[row['patente_vehiculo_id']] = 0
+    for vid, ultima, primera, anterior in qs:
+        if ultima is None:
+            continue
+        base = anterior if anterior is not None else primera
+        out[vid] = max(0, ultima - base)
     return out
 
 
-def km_totales_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
+def km_totales_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta, usar_resumen=None):
     """
-    Km recorridos en el período: preferir suma de hojas de ruta. Si es 0, usar diferencia de odómetro entre cargas de combustible.
+    Km recorridos en el período según las lecturas de odómetro (hojas de ruta, viajes y cargas de combustible).
+    Con usar_resumen (o settings.USAR_RESUMEN_MENSUAL) y un período de meses completos, suma ResumenMensualVehiculo.
     """
-    desde_hojas = km_recorridos_desde_hojas(vehiculo_ids, fecha_desde, fecha_hasta)
-    fallback = km_recorridos_fallback_cargas(vehiculo_ids, fecha_desde, fecha_hasta)
-    result = {}
-    for vid in vehiculo_ids:
-        k = desde_hojas.get(vid, 0)
-        if k < 1:
-            k = fallback.get(vid, 0)
-        result[vid] = k
-    return result
+    if usar_resumen_mensual(usar_resumen) and es_periodo_mensual(fecha_desde, fecha_hasta):
+        resumen = leer_resumenes(vehiculo_ids, fecha_desde, fecha_hasta)
+        return {vid: resumen[vid]['km_recorridos'] for vid in vehiculo_ids}
+    km = km_recorridos_desde_lecturas(vehiculo_ids, fecha_desde, fecha_hasta)
+    return {vid: km.get(vid, 0) for vid in vehiculo_ids}
 
 
-def agregados_combustible_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
+def agregados_combustible_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta, usar_resumen=None):
     """
     litros y costo_total de CargaCombustible por vehículo.
     """
     if not vehiculo_ids:
         return {}
+    if usar_resumen_mensual(usar_resumen) and es_periodo_mensual(fecha_desde, fecha_hasta):
+        resumen = leer_resumenes(vehiculo_ids, fecha_desde, fecha_hasta)
+        return {
+            vid: {'litros': fila['litros'] or Decimal('0'), 'costo': fila['costo_combustible']}
+            for vid, fila in resumen.items()
+            if fila['litros'] or fila['costo_combustible']
+        }
     from .models import CargaCombustible
 
     qs = (
@@ -120,12 +119,13 @@ def agregados_combustible_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
     }
 
 
-def indicadores_costos_combustible(vehiculo_ids, fecha_desde, fecha_hasta):
+def indicadores_costos_combustible(vehiculo_ids, fecha_desde, fecha_hasta, indicadores=None):
     """
     Por vehículo: rendimiento (km/l), costo combustible $/km, índice $/l efectivo. Valores None donde no aplica; strings para plantilla: 'Sin datos', 'N/A'.
     """
-    km_map = km_totales_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta)
-    comb_map = agregados_combustible_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta)
+    indicadores = indicadores or IndicadoresPeriodo(vehiculo_ids, fecha_desde, fecha_hasta)
+    km_map = indicadores.km
+    comb_map = indicadores.combustible
     out = {}
     for vid in vehiculo_ids:
         km = km_map.get(vid, 0)
@@ -157,17 +157,15 @@ def indicadores_costos_combustible(vehiculo_ids, fecha_desde, fecha_hasta):
     return out
 
 
-def frecuencia_fallas_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
+def correctivos_finalizados_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
     """
-    (correctivos finalizados) / (km_totales / 10000). Solo mantenimientos con estado Finalizado.
+    Cantidad de mantenimientos correctivos finalizados por vehículo, por fecha de ingreso.
     """
     from .models import Mantenimiento
 
-    km_map = km_totales_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta)
     if not vehiculo_ids:
         return {}
-
-    corr_rows = (
+    rows = (
         Mantenimiento.objects.filter(
             vehiculo_id__in=vehiculo_ids,
             tipo_mantencion='Correctivo',
@@ -177,8 +175,37 @@ def frecuencia_fallas_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
         )
         .values('vehiculo_id')
         .annotate(n=Count('id'))
+        .order_by()
+    )
+    return {row['vehiculo_id']: row['n'] for row in rows}
+
+
+def incidentes_por_vehiculo(vehiculo_ids):
+    """
+    Cantidad total de fallas reportadas por vehículo (sin filtro de período, como en los reportes).
+    """
+    from .models import FallaReportada
+
+    if not vehiculo_ids:
+        return {}
+    rows = (
+        FallaReportada.objects.filter(vehiculo_id__in=vehiculo_ids)
+        .values('vehiculo_id')
+        .annotate(n=Count('id'))
+        .order_by()
     )
-    corr_map = {row['vehiculo_id']: row['n'] for row in corr_rows}
+    return {row['vehiculo_id']: row['n'] for row in rows}
+
+
+def frecuencia_fallas_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta, indicadores=None):
+    """
+    (correctivos finalizados) / (km_totales / 10000). Solo mantenimientos con estado Finalizado.
+    """
+    if not vehiculo_ids:
+        return {}
+    indicadores = indicadores or IndicadoresPeriodo(vehiculo_ids, fecha_desde, fecha_hasta)
+    km_map = indicadores.km
+    corr_map = indicadores.correctivos
 
     out = {}
     for vid in vehiculo_ids:
@@ -225,3 +252,113 @@ def promedio_dias_indisponibilidad_por_vehiculo(vehiculo_ids, fecha_desde, fecha
         else:
             out[vid] = 'N/A'
     return out
+
+
+class IndicadoresPeriodo:
+    """
+    Agregados base de un período para un conjunto de vehículos. Cada uno se consulta la primera vez que se pide y se reutiliza: una vista crea un solo objeto y se lo pasa a los indicadores, así ninguna consulta se repite en la misma petición.
+    """
+
+    def __init__(self, vehiculo_ids, fecha_desde, fecha_hasta, usar_resumen=None):
+        self.vehiculo_ids = list(vehiculo_ids)
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+        self.usar_resumen = usar_resumen
+
+    def _periodo(self):
+        return self.vehiculo_ids, self.fecha_desde, self.fecha_hasta
+
+    @cached_property
+    def km(self):
+        return km_totales_por_vehiculo(*self._periodo(), usar_resumen=self.usar_resumen)
+
+    @cached_property
+    def combustible(self):
+        return agregados_combustible_por_vehiculo(*self._periodo(), usar_resumen=self.usar_resumen)
+
+    @cached_property
+    def correctivos(self):
+        return correctivos_finalizados_por_vehiculo(*self._periodo())
+
+    @cached_property
+    def incidentes(self):
+        return incidentes_por_vehiculo(self.vehiculo_ids)
+
+    @cached_property
+    def promedio_indisponibilidad(self):
+        return promedio_dias_indisponibilidad_por_vehiculo(*self._periodo())
+
+    @cached_property
+    def tiempos_hbo(self):
+        return tiempos_retencion_hbo_por_vehiculo(*self._periodo())
+
+    @cached_property
+    def costos_combustible(self):
+        return indicadores_costos_combustible(*self._periodo(), indicadores=self)
+
+    @cached_property
+    def frecuencia_fallas(self):
+        return frecuencia_fallas_por_vehiculo(*self._periodo(), indicadores=self)
+
+
+def _segundos_del_dia(campo):
+    return ExtractHour(campo) * 3600 + ExtractMinute(campo) * 60 + ExtractSecond(campo)
+
+
+def _segundos_en_hbo():
+    """
+    (hora_llegada_hbo - hora_salida_hbo) en segundos; si la llegada es menor que la salida, el viaje cruzó la medianoche y se suma un día.
+    """
+    diferencia = ExpressionWrapper(
+        _segundos_del_dia('hora_llegada_hbo') - _segundos_del_dia('hora_salida_hbo'),
+        output_field=IntegerField(),
+    )
+    return Case(
+        When(hora_llegada_hbo__lt=F('hora_salida_hbo'), then=diferencia + Value(86400)),
+        default=diferencia,
+        output_field=IntegerField(),
+    )
+
+
+def tiempos_retencion_hbo_por_vehiculo(vehiculo_ids, fecha_desde, fecha_hasta):
+    """
+    Minutos de retención en HBO por vehículo (promedio, p50, p90 y cantidad de viajes) en una sola consulta agrupada sobre Viaje + HojaRuta.
+    """
+    from .models import Viaje
+
+    if not vehiculo_ids:
+        return {}
+
+    qs = (
+        Viaje.objects.filter(
+            hoja_ruta__vehiculo_id__in=vehiculo_ids,
+            hora_salida_hbo__isnull=False,
+            hora_llegada_hbo__isnull=False,
+            hoja_ruta__fecha__gte=fecha_desde,
+            hoja_ruta__fecha__lte=fecha_hasta,
+        )
+        .annotate(segundos_hbo=_segundos_en_hbo())
+        .values('hoja_ruta__vehiculo_id')
+        .annotate(
+            promedio=Avg('segundos_hbo'),
+            p50=PercentilContinuo('segundos_hbo', 0.5),
+            p90=PercentilContinuo('segundos_hbo', 0.9),
+            viajes=Count('id'),
+        )
+        .order_by()
+    )
+    filas = {row['hoja_ruta__vehiculo_id']: row for row in qs}
+
+    out = {}
+    for vid in vehiculo_ids:
+        row = filas.get(vid)
+        if not row:
+            out[vid] = {'promedio': None, 'p50': None, 'p90': None, 'viajes': 0}
+            continue
+        out[vid] = {
+            'promedio': float(row['promedio']) / 60,
+            'p50': float(row['p50']) / 60,
+            'p90': float(row['p90']) / 60,
+            'viajes': row['viajes'],
+        }
+    return out
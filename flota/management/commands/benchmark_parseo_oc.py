@@ -0,0 +1,46 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from flota.services.parseo_oc import parsear_oc
+
+
+class Command(BaseCommand):
+    help = 'Mide parsear_oc sobre las respuestas grabadas de la API de Mercado Público (MERCADO_PUBLICO_MODO=grabar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directorio con las respuestas JSON (por defecto MERCADO_PUBLICO_FIXTURES_DIR)')
+        parser.add_argument('--repeticiones', type=int, default=200, help='Pasadas sobre el corpus completo')
+
+    def handle(self, *args, **options):
+        directorio = Path(options['dir'] or settings.MERCADO_PUBLICO_FIXTURES_DIR)
+        corpus = []
+        for ruta in sorted(directorio.glob('*.json')):
+            with open(ruta, encoding='utf-8') as f:
+                corpus.append((ruta.stem, json.load(f)))
+        if not corpus:
+            raise CommandError(f'No hay respuestas grabadas en {directorio}')
+        repeticiones = max(1, options['repeticiones'])
+
+        # Resultados de una pasada, para notar si un cambio en el parseo altera lo que se extrae
+        resultados = [parsear_oc(payload, codigo) for codigo, payload in corpus]
+        validas = [datos for datos in resultados if 'error' not in datos]
+        self.stdout.write(
+            f'{len(corpus)} respuestas ({len(corpus) - len(validas)} sin OC): '
+            f'{sum(1 for datos in validas if datos["codigo_presupuestario"])} con cuenta, '
+            f'{sum(len(datos["patentes_posibles"]) for datos in validas)} patentes posibles'
+        )
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for codigo, payload in corpus:
+                parsear_oc(payload, codigo)
+        duracion = time.perf_counter() - inicio
+        total = len(corpus) * repeticiones
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} parseos en {duracion:.3f} s: {total / duracion:,.0f} respuestas/s, '
+            f'{duracion / total * 1_000_000:.1f} µs por respuesta'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from flota.services.cierre_anual import cerrar_anio, reabrir_anio
+
+
+class Command(BaseCommand):
+    help = 'Cierra un año fiscal guardando el snapshot de panel de control, reportes y planilla de mantenimientos (o lo reabre)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('anio', type=int)
+        parser.add_argument('--reabrir', action='store_true', help='Borra el snapshot y vuelve a calcular desde las tablas')
+        parser.add_argument('--forzar', action='store_true', help='Permite cerrar el año en curso')
+
+    def handle(self, *args, **options):
+        anio = options['anio']
+        if options['reabrir']:
+            if reabrir_anio(anio):
+                self.stdout.write(self.style.SUCCESS(f'Año {anio} reabierto'))
+            else:
+                self.stdout.write(self.style.WARNING(f'El año {anio} no estaba cerrado'))
+            return
+
+        try:
+            cierre = cerrar_anio(anio, forzar=options['forzar'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Año {anio} cerrado: {len(cierre.reportes)} vistas de reportes y planilla {cierre.planilla_mantenimientos.name}'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from flota.services.movimientos_presupuesto import conciliar, corregir
+
+
+class Command(BaseCommand):
+    help = 'Compara monto_ejecutado de cada presupuesto con el libro de movimientos y con el recálculo completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, help='Solo presupuestos de este año')
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Resincroniza los registros de los presupuestos con diferencias y asienta un ajuste por el resto',
+        )
+
+    def handle(self, *args, **options):
+        diferencias = conciliar(options['anio'])
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Presupuestos consistentes con el libro de movimientos'))
+            return
+        for presupuesto, ejecutado, en_libro, recalculado in diferencias:
+            self.stdout.write(
+                f'{presupuesto.anio} {presupuesto.cuenta.codigo}: ejecutado={ejecutado} '
+                f'libro={en_libro} recalculado={recalculado}'
+            )
+        if options['corregir']:
+            corregir(diferencias)
+            self.stdout.write(self.style.SUCCESS(f'{len(diferencias)} presupuestos corregidos'))
+            return
+        raise CommandError(f'{len(diferencias)} presupuestos no cuadran con el libro de movimientos')
@@ -8,6 +8,7 @@ from django.utils.dateparse import parse_date
 from flota.models import (
     Usuario, CuentaPresupuestaria, Proveedor, Vehiculo,
 )
+from flota.services.movimientos_presupuesto import presupuesto_diferido
 
 
 class Command(BaseCommand):
@@ -42,18 +43,20 @@ class Command(BaseCommand):
         self._patch_auto_now_add(Usuario, 'creado_en')
         self._patch_auto_now_add(Vehiculo, 'creado_en')
 
-        self.stdout.write(self.style.WARNING('Limpiando tablas existentes...'))
-        Vehiculo.objects.all().delete()
-        Proveedor.objects.all().delete()
-        CuentaPresupuestaria.objects.all().delete()
-        Usuario.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS('Tablas limpiadas.'))
-
-        with transaction.atomic():
-            self.cargar_usuarios(os.path.join(csv_dir, csv_files[Usuario]))
-            self.cargar_cuentas(os.path.join(csv_dir, csv_files[CuentaPresupuestaria]))
-            self.cargar_proveedores(os.path.join(csv_dir, csv_files[Proveedor]))
-            self.cargar_vehiculos(os.path.join(csv_dir, csv_files[Vehiculo]))
+        # Los borrados en cascada y las altas no sincronizan el presupuesto fila a fila: se hace una vez al terminar
+        with presupuesto_diferido():
+            self.stdout.write(self.style.WARNING('Limpiando tablas existentes...'))
+            Vehiculo.objects.all().delete()
+            Proveedor.objects.all().delete()
+            CuentaPresupuestaria.objects.all().delete()
+            Usuario.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS('Tablas limpiadas.'))
+
+            with transaction.atomic():
+                self.cargar_usuarios(os.path.join(csv_dir, csv_files[Usuario]))
+                self.cargar_cuentas(os.path.join(csv_dir, csv_files[CuentaPresupuestaria]))
+                self.cargar_proveedores(os.path.join(csv_dir, csv_files[Proveedor]))
+                self.cargar_vehiculos(os.path.join(csv_dir, csv_files[Vehiculo]))
 
         self._restore_auto_now_add(Usuario, 'creado_en')
         self._restore_auto_now_add(Vehiculo, 'creado_en')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from flota.services.motor_alertas import REGLAS_MOTOR, evaluar_alertas
+
+
+class Command(BaseCommand):
+    help = 'Evalúa las reglas de alertas para toda la flota: abre, actualiza y resuelve alertas (uso periódico, p.ej. cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--regla',
+            action='append',
+            choices=REGLAS_MOTOR,
+            help='Evaluar solo esta regla (se puede repetir)',
+        )
+        parser.add_argument('--fecha', type=str, help='Fecha de evaluación (YYYY-MM-DD); por defecto hoy')
+
+    def handle(self, *args, **options):
+        hoy = None
+        if options['fecha']:
+            hoy = parse_date(options['fecha'])
+            if not hoy:
+                raise CommandError('La fecha debe tener formato YYYY-MM-DD')
+        resultado = evaluar_alertas(reglas=options['regla'], hoy=hoy)
+        self.stdout.write(self.style.SUCCESS(
+            f"Alertas evaluadas: {resultado['abiertas']} abiertas, {resultado['actualizadas']} actualizadas, "
+            f"{resultado['resueltas']} resueltas, {len(resultado['bloqueados'])} vehículos bloqueados"
+        ))
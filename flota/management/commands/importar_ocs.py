@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from flota.services.importacion_oc import extraer_codigos, importar_ocs
+
+
+class Command(BaseCommand):
+    help = 'Importa órdenes de compra desde Mercado Público consultando la API en paralelo y las guarda en una transacción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('codigos', nargs='*', help='Códigos de OC (p.ej. 1057531-912-CC25)')
+        parser.add_argument('--archivo', help='Archivo CSV o de texto con los códigos')
+        parser.add_argument('--hilos', type=int, help='Consultas simultáneas (por defecto MERCADO_PUBLICO_HILOS)')
+
+    def handle(self, *args, **options):
+        texto = '\n'.join(options['codigos'])
+        if options['archivo']:
+            try:
+                with open(options['archivo'], encoding='utf-8-sig') as f:
+                    texto += '\n' + f.read()
+            except OSError as e:
+                raise CommandError(f'No se pudo leer {options["archivo"]}: {e}')
+        codigos = extraer_codigos(texto)
+        if not codigos:
+            raise CommandError('No se encontraron códigos de Orden de Compra')
+
+        resultados = importar_ocs(codigos, hilos=options['hilos'])
+        for resultado in resultados:
+            linea = f'{resultado["codigo"]}: {resultado["mensaje"]}'
+            if resultado['ok']:
+                avisos = [aviso for nivel, aviso in resultado['avisos'] if nivel == 'warning']
+                self.stdout.write(self.style.SUCCESS(linea))
+                for aviso in avisos:
+                    self.stdout.write(self.style.WARNING(f'  {aviso}'))
+            else:
+                self.stdout.write(self.style.ERROR(linea))
+
+        importadas = sum(1 for resultado in resultados if resultado['ok'])
+        if not importadas:
+            raise CommandError(f'Ninguna de las {len(resultados)} OCs se pudo importar')
+        estilo = self.style.SUCCESS if importadas == len(resultados) else self.style.WARNING
+        self.stdout.write(estilo(f'{importadas} de {len(resultados)} OCs importadas'))
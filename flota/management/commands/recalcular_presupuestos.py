@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from flota.models import Presupuesto
+from flota.services.movimientos_presupuesto import recalcular_presupuestos_anio
+
+
+class Command(BaseCommand):
+    help = 'Recalcula monto_ejecutado de todos los presupuestos de un año con consultas agrupadas y muestra las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, required=True, help='Año presupuestario a recalcular')
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra las diferencias, sin guardar')
+
+    def handle(self, *args, **options):
+        anio = options['anio']
+        if not Presupuesto.objects.filter(anio=anio).exists():
+            raise CommandError(f'No hay presupuestos para el año {anio}')
+        cambios = recalcular_presupuestos_anio(anio, aplicar=not options['dry_run'])
+        for presupuesto, antes, despues in cambios:
+            self.stdout.write(
+                f'{presupuesto.cuenta.codigo}: {antes} -> {despues} ({despues - antes:+d})'
+            )
+        if not cambios:
+            self.stdout.write(self.style.SUCCESS(f'Presupuestos {anio} ya coinciden con el recálculo'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(cambios)} presupuestos cambiarían (sin guardar)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(cambios)} presupuestos actualizados'))
@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from flota.services.resumen_mensual import (
+    reconstruir_resumenes,
+    refrescar_abiertos,
+    verificar_resumenes,
+)
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye, verifica o refresca la tabla ResumenMensualVehiculo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, help='Limitar al año indicado')
+        parser.add_argument('--desde', type=str, help='Fecha inicial (YYYY-MM-DD)')
+        parser.add_argument('--hasta', type=str, help='Fecha final (YYYY-MM-DD)')
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Compara el resumen guardado con un recálculo sin modificar nada',
+        )
+        parser.add_argument(
+            '--abiertos',
+            action='store_true',
+            help='Solo recalcula los meses de mantenimientos en taller y arriendos sin fecha de fin (uso diario)',
+        )
+
+    def handle(self, *args, **options):
+        if options['abiertos']:
+            n = refrescar_abiertos()
+            self.stdout.write(self.style.SUCCESS(f'Resumen mensual refrescado: {n} filas revisadas'))
+            return
+
+        desde, hasta = self._periodo(options)
+
+        if options['verificar']:
+            diferencias = verificar_resumenes(desde, hasta)
+            if not diferencias:
+                self.stdout.write(self.style.SUCCESS('Resumen mensual consistente con las tablas de origen'))
+                return
+            for (vid, anio, mes), campo, guardado, calculado in diferencias:
+                self.stdout.write(
+                    f'vehiculo={vid} {anio}/{mes:02d} {campo}: guardado={guardado} calculado={calculado}'
+                )
+            raise CommandError(f'{len(diferencias)} diferencias en el resumen mensual')
+
+        n = reconstruir_resumenes(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Resumen mensual reconstruido: {n} filas'))
+
+    def _periodo(self, options):
+        if options['anio']:
+            return date(options['anio'], 1, 1), date(options['anio'], 12, 31)
+        desde = parse_date(options['desde']) if options['desde'] else None
+        hasta = parse_date(options['hasta']) if options['hasta'] else None
+        if (options['desde'] and not desde) or (options['hasta'] and not hasta):
+            raise CommandError('Las fechas deben tener formato YYYY-MM-DD')
+        return desde, hasta
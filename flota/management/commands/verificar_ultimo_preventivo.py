@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from flota.services.kilometraje import actualizar_ultimo_preventivo, verificar_ultimo_preventivo
+
+
+class Command(BaseCommand):
+    help = 'Compara km/fecha del último preventivo guardados en Vehiculo con los mantenimientos finalizados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Recalcula los vehículos con diferencias y reevalúa sus alertas de kilometraje',
+        )
+
+    def handle(self, *args, **options):
+        diferencias = verificar_ultimo_preventivo()
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Último preventivo consistente en todos los vehículos'))
+            return
+        for vehiculo, guardado, calculado in diferencias:
+            self.stdout.write(f'{vehiculo.patente}: guardado={guardado} calculado={calculado}')
+        if options['corregir']:
+            n = len(actualizar_ultimo_preventivo([v.pk for v, _, _ in diferencias]))
+            self.stdout.write(self.style.SUCCESS(f'{n} vehículos corregidos'))
+            return
+        raise CommandError(f'{len(diferencias)} vehículos con último preventivo desactualizado')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0004_viaje_no_aplica_defaults'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensualVehiculo',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('anio', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('km_recorridos', models.IntegerField(default=0)),
+                ('litros', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('costo_combustible', models.IntegerField(default=0)),
+                ('costo_preventivo', models.IntegerField(default=0)),
+                ('costo_correctivo', models.IntegerField(default=0)),
+                ('costo_arriendo', models.IntegerField(default=0)),
+                ('dias_fuera_preventivo', models.IntegerField(default=0)),
+                ('dias_fuera_correctivo', models.IntegerField(default=0)),
+                ('dias_fuera_servicio', models.IntegerField(default=0)),
+                ('hojas_ruta', models.IntegerField(default=0)),
+                ('viajes', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_mensuales', to='flota.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Vehículo',
+                'verbose_name_plural': 'Resúmenes Mensuales de Vehículos',
+                'db_table': 'resumen_mensual_vehiculo',
+                'indexes': [models.Index(fields=['anio', 'mes'], name='resumen_men_anio_9cce22_idx')],
+                'unique_together': {('vehiculo', 'anio', 'mes')},
+            },
+        ),
+    ]
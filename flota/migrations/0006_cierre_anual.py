@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0005_resumen_mensual_vehiculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreAnual',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('anio', models.IntegerField(unique=True, verbose_name='Año Presupuestario')),
+                ('cerrado_en', models.DateTimeField(auto_now_add=True)),
+                ('panel_control', models.JSONField(default=dict)),
+                ('reportes', models.JSONField(default=dict)),
+                ('planilla_mantenimientos', models.FileField(blank=True, null=True, upload_to='cierres_anuales/')),
+                ('cerrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cierres_anuales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cierre Anual',
+                'verbose_name_plural': 'Cierres Anuales',
+                'db_table': 'cierre_anual',
+                'ordering': ['-anio'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:11
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def rellenar_ultimo_preventivo(apps, schema_editor):
+    Vehiculo = apps.get_model('flota', 'Vehiculo')
+    Mantenimiento = apps.get_model('flota', 'Mantenimiento')
+    ultimo = Mantenimiento.objects.filter(
+        vehiculo=OuterRef('pk'),
+        tipo_mantencion='Preventivo',
+        estado='Finalizado'
+    ).order_by('-fecha_salida', '-id')
+    Vehiculo.objects.update(
+        km_ultimo_preventivo=Subquery(ultimo.values('km_al_ingreso')[:1]),
+        fecha_ultimo_preventivo=Subquery(ultimo.values('fecha_salida')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0006_cierre_anual'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='fecha_ultimo_preventivo',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='km_ultimo_preventivo',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['estado', 'km_ultimo_preventivo'], name='vehiculo_estado_3a936e_idx'),
+        ),
+        migrations.RunPython(rellenar_ultimo_preventivo, migrations.RunPython.noop),
+    ]
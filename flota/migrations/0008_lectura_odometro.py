@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def cargar_lecturas(apps, schema_editor):
+    LecturaOdometro = apps.get_model('flota', 'LecturaOdometro')
+    HojaRuta = apps.get_model('flota', 'HojaRuta')
+    Viaje = apps.get_model('flota', 'Viaje')
+    CargaCombustible = apps.get_model('flota', 'CargaCombustible')
+
+    def lecturas():
+        for pk, vehiculo_id, fecha, km_inicio, km_fin in HojaRuta.objects.values_list(
+            'pk', 'vehiculo_id', 'fecha', 'km_inicio', 'km_fin'
+        ).iterator():
+            for km in (km_inicio, km_fin):
+                if km:
+                    yield LecturaOdometro(vehiculo_id=vehiculo_id, fecha=fecha, km=km, origen='hoja_ruta', origen_id=pk)
+        for pk, vehiculo_id, fecha, km_salida, km_llegada in Viaje.objects.values_list(
+            'pk', 'hoja_ruta__vehiculo_id', 'hoja_ruta__fecha', 'km_salida', 'km_llegada'
+        ).iterator():
+            for km in (km_salida, km_llegada):
+                if km:
+                    yield LecturaOdometro(vehiculo_id=vehiculo_id, fecha=fecha, km=km, origen='viaje', origen_id=pk)
+        for pk, vehiculo_id, fecha, km in CargaCombustible.objects.values_list(
+            'pk', 'patente_vehiculo_id', 'fecha', 'kilometraje_al_cargar'
+        ).iterator():
+            if km:
+                yield LecturaOdometro(vehiculo_id=vehiculo_id, fecha=fecha, km=km, origen='carga_combustible', origen_id=pk)
+
+    LecturaOdometro.objects.bulk_create(lecturas(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0007_vehiculo_ultimo_preventivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturaOdometro',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('km', models.IntegerField()),
+                ('origen', models.CharField(choices=[('hoja_ruta', 'Hoja de Ruta'), ('viaje', 'Viaje'), ('carga_combustible', 'Carga de Combustible')], max_length=20)),
+                ('origen_id', models.IntegerField()),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lecturas_odometro', to='flota.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Lectura de Odómetro',
+                'verbose_name_plural': 'Lecturas de Odómetro',
+                'db_table': 'lectura_odometro',
+                'indexes': [models.Index(fields=['vehiculo', 'fecha', 'km'], name='lectura_odo_vehicul_8b0dd5_idx'), models.Index(fields=['origen', 'origen_id'], name='lectura_odo_origen_b9d1ed_idx')],
+            },
+        ),
+        migrations.RunPython(cargar_lecturas, migrations.RunPython.noop),
+    ]
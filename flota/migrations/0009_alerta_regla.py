@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:29
+
+from django.db import migrations, models
+
+
+def clasificar_alertas(apps, schema_editor):
+    """
+    Asigna regla (y el registro de origen cuando se puede identificar) a las alertas creadas antes del motor de alertas, según su descripción.
+    """
+    Alerta = apps.get_model('flota', 'Alerta')
+    Mantenimiento = apps.get_model('flota', 'Mantenimiento')
+    FallaReportada = apps.get_model('flota', 'FallaReportada')
+
+    Alerta.objects.filter(descripcion__startswith='Alerta por kilometraje').update(regla='km_preventivo')
+    Alerta.objects.filter(descripcion__startswith='ALERTA CRÍTICA').update(regla='km_critico')
+
+    programados = {
+        (vid, str(fecha)): pk
+        for pk, vid, fecha in Mantenimiento.objects.filter(fecha_programada__isnull=False).values_list(
+            'pk', 'vehiculo_id', 'fecha_programada'
+        )
+    }
+    for alerta in Alerta.objects.filter(descripcion__startswith='Mantenimiento programado '):
+        fecha = alerta.descripcion[len('Mantenimiento programado '):].split(' ', 1)[0]
+        alerta.regla = 'mantenimiento_programado'
+        alerta.referencia_id = programados.get((alerta.vehiculo_id, fecha))
+        alerta.save(update_fields=['regla', 'referencia_id'])
+
+    fallas = {
+        (vid, descripcion): pk
+        for pk, vid, descripcion in FallaReportada.objects.values_list('pk', 'vehiculo_id', 'descripcion')
+    }
+    for alerta in Alerta.objects.filter(descripcion__startswith='Falla reportada: '):
+        alerta.regla = 'falla'
+        alerta.referencia_id = fallas.get((alerta.vehiculo_id, alerta.descripcion[len('Falla reportada: '):]))
+        alerta.save(update_fields=['regla', 'referencia_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0008_lectura_odometro'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerta',
+            name='referencia_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerta',
+            name='regla',
+            field=models.CharField(blank=True, choices=[('km_preventivo', 'Kilometraje preventivo'), ('km_critico', 'Kilometraje crítico'), ('mantenimiento_programado', 'Mantenimiento programado'), ('falla', 'Falla reportada')], default='', max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='alerta',
+            index=models.Index(fields=['regla', 'vigente'], name='alerta_regla_d15adb_idx'),
+        ),
+        migrations.RunPython(clasificar_alertas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:30
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+
+
+def calcular_niveles(apps, schema_editor):
+    Presupuesto = apps.get_model('flota', 'Presupuesto')
+    Presupuesto.objects.filter(monto_asignado__gt=0).alias(
+        ejecutado_x100=F('monto_ejecutado') * 100,
+    ).update(
+        nivel_alerta=Case(
+            When(ejecutado_x100__gte=F('monto_asignado') * 100, then=Value(100)),
+            When(ejecutado_x100__gte=F('monto_asignado') * 80, then=Value(80)),
+            default=Value(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0009_alerta_regla'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presupuesto',
+            name='nivel_alerta',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Normal'), (80, 'En riesgo (80%)'), (100, 'Agotado (100%)')], default=0, editable=False, verbose_name='Nivel de alerta de ejecución'),
+        ),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(fields=['activo', 'alerta_presupuesto_ignorada', 'nivel_alerta'], name='presupuesto_activo_02dcd9_idx'),
+        ),
+        migrations.RunPython(calcular_niveles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:34
+
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+from flota.services.arriendos import costo_por_anio
+
+
+def cargar_movimientos(apps, schema_editor):
+    """
+    Una fila por registro con lo que aporta hoy a cada (cuenta, año), con las reglas de services/movimientos_presupuesto.py. monto_ejecutado no se toca: las diferencias con lo guardado se revisan con `manage.py conciliar_presupuestos`.
+    """
+    MovimientoPresupuestario = apps.get_model('flota', 'MovimientoPresupuestario')
+    OrdenCompra = apps.get_model('flota', 'OrdenCompra')
+    Mantenimiento = apps.get_model('flota', 'Mantenimiento')
+    CargaCombustible = apps.get_model('flota', 'CargaCombustible')
+    Arriendo = apps.get_model('flota', 'Arriendo')
+    Presupuesto = apps.get_model('flota', 'Presupuesto')
+
+    finalizados = Mantenimiento.objects.filter(estado='Finalizado', cuenta_presupuestaria__isnull=False)
+    absorbidas = {
+        (oc_id, cuenta_id, fecha.year)
+        for oc_id, cuenta_id, fecha in finalizados.filter(orden_compra__isnull=False).values_list(
+            'orden_compra_id', 'cuenta_presupuestaria_id', 'fecha_ingreso'
+        )
+    }
+    ultimo_anio = dict(Presupuesto.objects.values('cuenta_id').annotate(anio=Max('anio')).values_list('cuenta_id', 'anio'))
+    anio_actual = date.today().year
+
+    def movimientos():
+        for pk, cuenta_id, fecha, monto in (
+            OrdenCompra.objects.filter(cuenta_presupuestaria__isnull=False).exclude(estado='Anulada')
+            .values_list('pk', 'cuenta_presupuestaria_id', 'fecha_emision', 'monto_total').iterator()
+        ):
+            if monto and (pk, cuenta_id, fecha.year) not in absorbidas:
+                yield MovimientoPresupuestario(cuenta_id=cuenta_id, anio=fecha.year, monto=monto, tipo='compromiso', origen='orden_compra', origen_id=pk)
+        for pk, cuenta_id, fecha, monto in finalizados.values_list(
+            'pk', 'cuenta_presupuestaria_id', 'fecha_ingreso', 'costo_total_real'
+        ).iterator():
+            if monto:
+                yield MovimientoPresupuestario(cuenta_id=cuenta_id, anio=fecha.year, monto=monto, tipo='ejecucion', origen='mantenimiento', origen_id=pk)
+        for pk, cuenta_id, fecha, monto in (
+            CargaCombustible.objects.filter(cuenta_presupuestaria__isnull=False)
+            .values_list('pk', 'cuenta_presupuestaria_id', 'fecha', 'costo_total').iterator()
+        ):
+            if monto:
+                yield MovimientoPresupuestario(cuenta_id=cuenta_id, anio=fecha.year, monto=monto, tipo='ejecucion', origen='carga_combustible', origen_id=pk)
+        for arriendo in Arriendo.objects.filter(cuenta_presupuestaria__isnull=False).iterator():
+            cuenta_id = arriendo.cuenta_presupuestaria_id
+            anio_hasta = max(anio_actual, ultimo_anio.get(cuenta_id) or 0)
+            for anio, costo in costo_por_anio(arriendo, anio_hasta).items():
+                monto = int(round(costo))
+                if monto:
+                    yield MovimientoPresupuestario(cuenta_id=cuenta_id, anio=anio, monto=monto, tipo='ejecucion', origen='arriendo', origen_id=arriendo.pk)
+
+    MovimientoPresupuestario.objects.bulk_create(movimientos(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flota', '0010_presupuesto_nivel_alerta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoPresupuestario',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('anio', models.IntegerField(verbose_name='Año Presupuestario')),
+                ('monto', models.IntegerField(verbose_name='Monto (con signo)')),
+                ('tipo', models.CharField(choices=[('compromiso', 'Compromiso'), ('ejecucion', 'Ejecución'), ('ajuste', 'Ajuste de conciliación')], max_length=20)),
+                ('origen', models.CharField(choices=[('orden_compra', 'Orden de compra'), ('mantenimiento', 'Mantenimiento'), ('carga_combustible', 'Carga de combustible'), ('arriendo', 'Arriendo'), ('conciliacion', 'Conciliación')], max_length=20)),
+                ('origen_id', models.IntegerField(blank=True, null=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('cuenta', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos_presupuestarios', to='flota.cuentapresupuestaria', verbose_name='Cuenta SIGFE')),
+            ],
+            options={
+                'verbose_name': 'Movimiento Presupuestario',
+                'verbose_name_plural': 'Movimientos Presupuestarios',
+                'db_table': 'movimiento_presupuestario',
+                'indexes': [models.Index(fields=['cuenta', 'anio'], name='movimiento__cuenta__9a5d4f_idx'), models.Index(fields=['origen', 'origen_id'], name='movimiento__origen_1879d8_idx')],
+            },
+        ),
+        migrations.RunPython(cargar_movimientos, migrations.RunPython.noop),
+    ]
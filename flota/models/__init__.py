@@ -3,7 +3,7 @@
 from .choices import *
 from .usuario import Usuario, UsuarioManager
 from .proveedor import Proveedor, CuentaPresupuestaria
-from .presupuesto import Presupuesto
+from .presupuesto import Presupuesto, MovimientoPresupuestario
 from .vehiculo import Vehiculo
 from .orden_trabajo import OrdenTrabajo
 from .orden_compra import OrdenCompra
@@ -20,6 +20,9 @@ from .operativa import (
     FallaReportada,
     Alerta,
 )
+from .resumen import ResumenMensualVehiculo
+from .cierre import CierreAnual
+from .odometro import LecturaOdometro
 
 __all__ = [
     "TIPOS_SERVICIO",
@@ -36,6 +39,7 @@ __all__ = [
     "Proveedor",
     "CuentaPresupuestaria",
     "Presupuesto",
+    "MovimientoPresupuestario",
     "Vehiculo",
     "OrdenTrabajo",
     "OrdenCompra",
@@ -50,4 +54,7 @@ __all__ = [
     "CargaCombustible",
     "FallaReportada",
     "Alerta",
+    "ResumenMensualVehiculo",
+    "CierreAnual",
+    "LecturaOdometro",
 ]
@@ -82,12 +82,12 @@ class Arriendo(models.Model):
         # Al activar el arriendo, cambiamos el estado del vehículo arrendado a 'Disponible'
         if self.estado == 'Activo' and self.vehiculo_arrendado:
             self.vehiculo_arrendado.estado = 'Disponible'
-            self.vehiculo_arrendado.save()
+            self.vehiculo_arrendado.save(update_fields=['estado'])
                 
             # Marcar el vehículo propio como 'Fuera de servicio' si no lo está
             if self.vehiculo_reemplazado and self.vehiculo_reemplazado.estado != 'Baja':
                 self.vehiculo_reemplazado.estado = 'Fuera de servicio'
-                self.vehiculo_reemplazado.save()
+                self.vehiculo_reemplazado.save(update_fields=['estado'])
 
         super().save(*args, **kwargs)
 
@@ -0,0 +1,41 @@
+from django.db import models
+
+from .usuario import Usuario
+
+class CierreAnual(models.Model):
+    """
+    Snapshot de un año fiscal cerrado: contexto del panel de control, pestañas de reportes y planilla de mantenimientos.
+    Mientras exista, las vistas de ese año se sirven desde aquí; se genera y reabre con `manage.py cerrar_anio` (ver services/cierre_anual.py).
+    """
+    id = models.AutoField(primary_key=True)
+    anio = models.IntegerField(unique=True, verbose_name="Año Presupuestario")
+    cerrado_en = models.DateTimeField(auto_now_add=True)
+    cerrado_por = models.ForeignKey(
+        Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='cierres_anuales'
+    )
+
+    panel_control = models.JSONField(default=dict)
+    reportes = models.JSONField(default=dict)
+    planilla_mantenimientos = models.FileField(upload_to='cierres_anuales/', null=True, blank=True)
+
+    class Meta:
+        db_table = 'cierre_anual'
+        verbose_name = 'Cierre Anual'
+        verbose_name_plural = 'Cierres Anuales'
+        ordering = ['-anio']
+
+    def __str__(self):
+        return f"Cierre {self.anio}"
+
+    def contexto_panel_control(self):
+        from ..services.cierre_anual import deserializar
+        return deserializar(self.panel_control)
+
+    def datos_reporte(self, clave):
+        """
+        Contexto guardado de una pestaña de reportes (None si no se guardó esa combinación de filtros).
+        """
+        from ..services.cierre_anual import deserializar
+        if clave not in self.reportes:
+            return None
+        return deserializar(self.reportes[clave])
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -73,7 +73,7 @@ class Mantenimiento(models.Model):
 
     def _obtener_presupuesto_para_cierre(self):
         """
-        Obtiene el presupuesto aplicable por cuenta y año. No modifica nada.
+        Obtiene el presupuesto aplicable por cuenta y año. No modifica nada; puede estar inactivo si este mismo cierre lo agotó.
         """
         if not self.cuenta_presupuestaria or not self.vehiculo:
             return None
@@ -81,12 +81,12 @@ class Mantenimiento(models.Model):
         return Presupuesto.objects.filter(
             cuenta=self.cuenta_presupuestaria,
             anio=anio,
-            activo=True
         ).first()
 
     def ejecutar_cierre_presupuestario(self):
         """
-        Único punto de ejecución presupuestaria por mantenimiento. Valida: OC asociada, estado Finalizado, costos reales > 0, cuenta presupuestaria, presupuesto existe y con saldo.
+        Confirma la ejecución presupuestaria de un mantenimiento ya guardado. Valida: OC asociada, estado Finalizado, costos reales > 0, cuenta presupuestaria y presupuesto existente.
+        El saldo se valida antes de guardar (signals.validar_cierre_administrativo_mantenimiento) y el monto ya quedó en el libro de movimientos al guardar; aquí solo se asegura, sin duplicar.
         """
         if self.estado != 'Finalizado':
             return
@@ -108,13 +108,8 @@ class Mantenimiento(models.Model):
                 f"No hay presupuesto asignado para la cuenta {self.cuenta_presupuestaria.codigo} "
                 f"en el año {self.fecha_ingreso.year}."
             )
-        if not presupuesto.tiene_saldo_suficiente(self.costo_total_real):
-            raise ValueError(
-                f"Presupuesto insuficiente. Disponible: ${presupuesto.disponible:.0f}, "
-                f"Requerido: ${self.costo_total_real:.0f}"
-            )
-        from flota.signals import recalcular_monto_ejecutado
-        recalcular_monto_ejecutado(presupuesto)
+        from ..services.movimientos_presupuesto import sincronizar_movimientos
+        sincronizar_movimientos(self)
 
     def save(self, *args, **kwargs):
         # Auto-calcular total real si no se provee
@@ -130,15 +125,17 @@ class Mantenimiento(models.Model):
                 raise ValidationError(
                     "No se puede cerrar administrativamente un mantenimiento sin costos reales."
                 )
-        if self.estado == 'Finalizado':
-            from .operativa import Alerta
+        # La reserva de presupuesto ocurre en post_save: si no hay saldo, se deshace también el guardado
+        with transaction.atomic():
+            if self.estado == 'Finalizado':
+                from .operativa import Alerta
 
-            Alerta.objects.filter(
-                vehiculo=self.vehiculo,
-                vigente=True,
-                descripcion__icontains='kilometraje'
-            ).update(vigente=False, resuelta_en=timezone.now())
-        super().save(*args, **kwargs)
+                Alerta.objects.filter(
+                    vehiculo=self.vehiculo,
+                    vigente=True,
+                    descripcion__icontains='kilometraje'
+                ).update(vigente=False, resuelta_en=timezone.now())
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.tipo_mantencion} {self.vehiculo.patente} - {self.fecha_ingreso}"
@@ -0,0 +1,34 @@
+from django.db import models
+
+from .vehiculo import Vehiculo
+
+class LecturaOdometro(models.Model):
+    """
+    Lectura del odómetro de un vehículo en una fecha, tomada de hojas de ruta (inicio y cierre), viajes (salida y llegada) y cargas de combustible.
+    Se agrega desde señales; al editar o borrar el registro de origen se reemplazan solo sus lecturas (ver services/kilometraje.py).
+    """
+    ORIGENES = [
+        ('hoja_ruta', 'Hoja de Ruta'),
+        ('viaje', 'Viaje'),
+        ('carga_combustible', 'Carga de Combustible'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='lecturas_odometro')
+    fecha = models.DateField()
+    km = models.IntegerField()
+    origen = models.CharField(max_length=20, choices=ORIGENES)
+    origen_id = models.IntegerField()
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'lectura_odometro'
+        verbose_name = 'Lectura de Odómetro'
+        verbose_name_plural = 'Lecturas de Odómetro'
+        indexes = [
+            models.Index(fields=['vehiculo', 'fecha', 'km']),
+            models.Index(fields=['origen', 'origen_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.vehiculo.patente} - {self.fecha} - {self.km} km"
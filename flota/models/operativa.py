@@ -263,6 +263,14 @@ class FallaReportada(models.Model):
         return f"Falla {self.vehiculo.patente} - {self.fecha_reporte}"
 
 class Alerta(models.Model):
+    # Regla del motor de alertas (services/motor_alertas.py) que la abrió; vacío en alertas manuales o antiguas
+    REGLAS = [
+        ('km_preventivo', 'Kilometraje preventivo'),
+        ('km_critico', 'Kilometraje crítico'),
+        ('mantenimiento_programado', 'Mantenimiento programado'),
+        ('falla', 'Falla reportada'),
+    ]
+
     id = models.AutoField(primary_key=True)
     descripcion = models.TextField()
     valor_umbral = models.IntegerField()
@@ -270,8 +278,14 @@ class Alerta(models.Model):
     vigente = models.BooleanField(default=True)
     resuelta_en = models.DateTimeField(null=True, blank=True)
     vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='alertas')
+    regla = models.CharField(max_length=30, choices=REGLAS, blank=True, default='')
+    # Registro que originó la alerta según la regla (Mantenimiento o FallaReportada)
+    referencia_id = models.IntegerField(null=True, blank=True)
     
     class Meta:
         db_table = 'alerta'
         verbose_name = 'Alerta'
         verbose_name_plural = 'Alertas'
+        indexes = [
+            models.Index(fields=['regla', 'vigente']),
+        ]
@@ -1,9 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 
 from .proveedor import Proveedor, CuentaPresupuestaria
-from .presupuesto import Presupuesto
 from .orden_trabajo import OrdenTrabajo
 
 class OrdenCompra(models.Model):
@@ -50,48 +49,10 @@ class OrdenCompra(models.Model):
     
     def save(self, *args, **kwargs):
         """
-        Al guardar una OC, validar y gestionar presupuesto si corresponde.
-        NOTA: El consumo real del presupuesto se hace a través de signals que recalculan basándose en las OCs activas (no anuladas).
+        El compromiso presupuestario de la OC se reserva al guardar (signals.registrar_movimientos_presupuesto → reservar_presupuesto): un alta o aumento que no cabe en el saldo lanza PresupuestoInsuficiente y deshace el guardado.
         """
-        is_new = self.pk is None
-
-        # Si es nueva OC o se cambió el monto/estado, validar presupuesto
-        if self.cuenta_presupuestaria and self.monto_total > 0 and self.estado != 'Anulada':
-            anio = self.fecha_emision.year
-
-            # Buscar presupuesto por cuenta y año (ya no por vehículo)
-            presupuesto = Presupuesto.objects.filter(
-                cuenta=self.cuenta_presupuestaria,
-                anio=anio,
-                activo=True
-            ).first()
-
-            # Si es nueva OC, validar presupuesto disponible
-            if is_new and presupuesto:
-                if not presupuesto.tiene_saldo_suficiente(self.monto_total):
-                    raise ValueError(
-                        f"Presupuesto insuficiente para generar OC. "
-                        f"Disponible: ${presupuesto.disponible:.0f}, "
-                        f"Requerido: ${self.monto_total:.0f}"
-                    )
-            # Si se está modificando y cambió el monto, validar disponibilidad
-            elif not is_new and presupuesto:
-                try:
-                    oc_anterior = OrdenCompra.objects.get(pk=self.pk)
-                    monto_anterior = oc_anterior.monto_total if oc_anterior.estado != 'Anulada' else 0
-                    diferencia = self.monto_total - monto_anterior
-
-                    if diferencia > 0 and self.estado != 'Anulada':
-                        if not presupuesto.tiene_saldo_suficiente(diferencia):
-                            raise ValueError(
-                                f"Presupuesto insuficiente para aumentar OC. "
-                                f"Disponible: ${presupuesto.disponible:.0f}, "
-                                f"Incremento requerido: ${diferencia:.0f}"
-                            )
-                except OrdenCompra.DoesNotExist:
-                    pass
-
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"OC {self.nro_oc} - {self.proveedor.nombre_fantasia}"
@@ -1,8 +1,59 @@
 from django.db import models
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
 from django.core.validators import MinValueValidator
 
 from .proveedor import CuentaPresupuestaria
 
+
+class PresupuestoQuerySet(models.QuerySet):
+    def con_porcentaje_ejecucion(self):
+        """
+        Anota porcentaje_ejecucion (monto_ejecutado / monto_asignado * 100; 0 sin monto asignado) para filtrar u ordenar en SQL.
+        """
+        return self.annotate(
+            porcentaje_ejecucion=Case(
+                When(
+                    monto_asignado__gt=0,
+                    then=Cast('monto_ejecutado', FloatField()) * 100 / F('monto_asignado'),
+                ),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+    def sumar_ejecutado(self, monto):
+        """
+        Suma monto (con signo) a monto_ejecutado en un solo UPDATE, recalculando nivel_alerta, activo y alerta_presupuesto_ignorada como Presupuesto.save().
+        Las expresiones del SET leen los valores previos de la fila, así que el nivel se compara con el que tenía antes del incremento.
+        """
+        nuevo = F('monto_ejecutado') + monto
+        con_asignado = Q(monto_asignado__gt=0)
+
+        def alcanza(nivel):
+            return con_asignado & Q(GreaterThanOrEqual(nuevo * 100, F('monto_asignado') * nivel))
+
+        nivel = Case(
+            When(alcanza(Presupuesto.NIVEL_AGOTADO), then=Value(Presupuesto.NIVEL_AGOTADO)),
+            When(alcanza(Presupuesto.NIVEL_RIESGO), then=Value(Presupuesto.NIVEL_RIESGO)),
+            default=Value(Presupuesto.NIVEL_NORMAL),
+        )
+        return self.update(
+            monto_ejecutado=nuevo,
+            nivel_alerta=nivel,
+            activo=Case(
+                When(con_asignado & Q(GreaterThanOrEqual(nuevo, F('monto_asignado'))), then=Value(False)),
+                default=F('activo'),
+            ),
+            alerta_presupuesto_ignorada=Case(
+                When(con_asignado & ~alcanza(Presupuesto.NIVEL_RIESGO), then=Value(False)),
+                When(GreaterThan(nivel, F('nivel_alerta')), then=Value(False)),
+                default=F('alerta_presupuesto_ignorada'),
+            ),
+        )
+
+
 class Presupuesto(models.Model):
     """
     Presupuesto anual asignado a un vehículo o a la flota general.
@@ -27,12 +78,33 @@ class Presupuesto(models.Model):
         default=False,
         verbose_name="Alerta de ejecución descartada",
     )
+
+    # Umbral de ejecución (% del asignado) alcanzado; se recalcula en save() junto con monto_ejecutado
+    NIVEL_NORMAL = 0
+    NIVEL_RIESGO = 80
+    NIVEL_AGOTADO = 100
+    NIVELES_ALERTA = [
+        (NIVEL_NORMAL, 'Normal'),
+        (NIVEL_RIESGO, 'En riesgo (80%)'),
+        (NIVEL_AGOTADO, 'Agotado (100%)'),
+    ]
+    nivel_alerta = models.PositiveSmallIntegerField(
+        choices=NIVELES_ALERTA,
+        default=NIVEL_NORMAL,
+        editable=False,
+        verbose_name="Nivel de alerta de ejecución",
+    )
+
+    objects = PresupuestoQuerySet.as_manager()
     
     class Meta:
         db_table = 'presupuesto'
         verbose_name = 'Presupuesto'
         verbose_name_plural = 'Presupuestos'
         unique_together = ['anio', 'cuenta']
+        indexes = [
+            models.Index(fields=['activo', 'alerta_presupuesto_ignorada', 'nivel_alerta']),
+        ]
     
     def __str__(self):
         return f"{self.anio} - {self.cuenta.codigo} - {self.cuenta.nombre}"
@@ -58,29 +130,97 @@ class Presupuesto(models.Model):
     
     def consumir_presupuesto(self, monto):
         """
-        Consume un monto del presupuesto (incrementa monto_ejecutado)
+        Consume un monto del presupuesto (incrementa monto_ejecutado) solo si cabe en el saldo, verificando y escribiendo en un mismo UPDATE.
         """
-        if self.disponible >= monto:
-            self.monto_ejecutado += monto
-            self.save(update_fields=['monto_ejecutado'])
-            return True
-        return False
+        consumido = Presupuesto.objects.filter(pk=self.pk).alias(
+            saldo=F('monto_asignado') - F('monto_ejecutado'),
+        ).filter(saldo__gte=monto).sumar_ejecutado(monto)
+        self.refresh_from_db(fields=self.CAMPOS_EJECUCION)
+        return bool(consumido)
     
     def liberar_presupuesto(self, monto):
         """
-        Libera un monto del presupuesto (disminuye monto_ejecutado)
+        Libera un monto del presupuesto (disminuye monto_ejecutado) si no lo deja negativo, en un mismo UPDATE.
         """
-        if self.monto_ejecutado >= monto:
-            self.monto_ejecutado -= monto
-            self.save(update_fields=['monto_ejecutado'])
-            return True
-        return False
+        liberado = Presupuesto.objects.filter(pk=self.pk, monto_ejecutado__gte=monto).sumar_ejecutado(-monto)
+        self.refresh_from_db(fields=self.CAMPOS_EJECUCION)
+        return bool(liberado)
 
-    def save(self, *args, **kwargs):
+    def calcular_nivel_alerta(self):
+        """
+        Mayor umbral alcanzado, comparando en enteros (ejecutado * 100 >= asignado * umbral).
+        """
+        if self.monto_asignado <= 0:
+            return self.NIVEL_NORMAL
+        for nivel in (self.NIVEL_AGOTADO, self.NIVEL_RIESGO):
+            if self.monto_ejecutado * 100 >= self.monto_asignado * nivel:
+                return nivel
+        return self.NIVEL_NORMAL
+
+    # Campos que actualizar_estado_ejecucion() deriva de monto_ejecutado
+    CAMPOS_EJECUCION = ['monto_ejecutado', 'activo', 'nivel_alerta', 'alerta_presupuesto_ignorada']
+
+    def actualizar_estado_ejecucion(self):
+        """
+        Deriva activo, nivel_alerta y alerta_presupuesto_ignorada de monto_ejecutado, sin guardar (save() lo aplica; también bulk_update con CAMPOS_EJECUCION).
+        """
         # Si se supera el presupuesto asignado, se deshabilita automáticamente.
         if self.monto_asignado > 0 and self.monto_ejecutado >= self.monto_asignado:
             self.activo = False
-        if self.monto_asignado > 0 and self.porcentaje_ejecutado < 80:
+        nivel = self.calcular_nivel_alerta()
+        # Bajo el 80% o al cruzar un umbral más alto, la alerta descartada vuelve a mostrarse
+        if (self.monto_asignado > 0 and nivel == self.NIVEL_NORMAL) or nivel > self.nivel_alerta:
             self.alerta_presupuesto_ignorada = False
+        self.nivel_alerta = nivel
+
+    def save(self, *args, **kwargs):
+        self.actualizar_estado_ejecucion()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'nivel_alerta', 'alerta_presupuesto_ignorada'}
         super().save(*args, **kwargs)
 
+
+
+
+class MovimientoPresupuestario(models.Model):
+    """
+    Libro de solo-inserción de la ejecución presupuestaria: una fila con signo por cada cambio en lo que una OC (compromiso) o un mantenimiento, carga de combustible o arriendo (ejecución) aporta a una cuenta y año.
+    La suma por (cuenta, anio) es el monto ejecutado; las correcciones se registran como nuevas filas, nunca editando las existentes (ver services/movimientos_presupuesto.py).
+    """
+    id = models.AutoField(primary_key=True)
+
+    TIPO_COMPROMISO = 'compromiso'
+    TIPO_EJECUCION = 'ejecucion'
+    TIPO_AJUSTE = 'ajuste'
+    TIPOS = [
+        (TIPO_COMPROMISO, 'Compromiso'),
+        (TIPO_EJECUCION, 'Ejecución'),
+        (TIPO_AJUSTE, 'Ajuste de conciliación'),
+    ]
+    ORIGENES = [
+        ('orden_compra', 'Orden de compra'),
+        ('mantenimiento', 'Mantenimiento'),
+        ('carga_combustible', 'Carga de combustible'),
+        ('arriendo', 'Arriendo'),
+        ('conciliacion', 'Conciliación'),
+    ]
+
+    cuenta = models.ForeignKey(CuentaPresupuestaria, on_delete=models.PROTECT, related_name='movimientos_presupuestarios', verbose_name="Cuenta SIGFE")
+    anio = models.IntegerField(verbose_name="Año Presupuestario")
+    monto = models.IntegerField(verbose_name="Monto (con signo)")
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    origen = models.CharField(max_length=20, choices=ORIGENES)
+    origen_id = models.IntegerField(null=True, blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'movimiento_presupuestario'
+        verbose_name = 'Movimiento Presupuestario'
+        verbose_name_plural = 'Movimientos Presupuestarios'
+        indexes = [
+            models.Index(fields=['cuenta', 'anio']),
+            models.Index(fields=['origen', 'origen_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.anio} - {self.cuenta_id} - {self.get_origen_display()} {self.origen_id or ''}: {self.monto:+d}"
@@ -0,0 +1,41 @@
+from django.db import models
+
+from .vehiculo import Vehiculo
+
+class ResumenMensualVehiculo(models.Model):
+    """
+    Hechos mensuales por vehículo (km, combustible, gasto, arriendos, indisponibilidad y viajes).
+    Se mantiene desde señales y se reconstruye con `manage.py resumen_mensual`; ver services/resumen_mensual.py.
+    """
+    id = models.AutoField(primary_key=True)
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='resumenes_mensuales')
+    anio = models.IntegerField()
+    mes = models.IntegerField()
+
+    km_recorridos = models.IntegerField(default=0)
+    litros = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    costo_combustible = models.IntegerField(default=0)
+    costo_preventivo = models.IntegerField(default=0)
+    costo_correctivo = models.IntegerField(default=0)
+    costo_arriendo = models.IntegerField(default=0)
+
+    dias_fuera_preventivo = models.IntegerField(default=0)
+    dias_fuera_correctivo = models.IntegerField(default=0)
+    dias_fuera_servicio = models.IntegerField(default=0)
+
+    hojas_ruta = models.IntegerField(default=0)
+    viajes = models.IntegerField(default=0)
+
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'resumen_mensual_vehiculo'
+        verbose_name = 'Resumen Mensual de Vehículo'
+        verbose_name_plural = 'Resúmenes Mensuales de Vehículos'
+        unique_together = ['vehiculo', 'anio', 'mes']
+        indexes = [
+            models.Index(fields=['anio', 'mes']),
+        ]
+
+    def __str__(self):
+        return f"{self.vehiculo.patente} - {self.anio}/{self.mes:02d}"
@@ -1,6 +1,6 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator
-from django.utils import timezone
 
 class Vehiculo(models.Model):
     ESTADOS = [
@@ -45,6 +45,9 @@ class Vehiculo(models.Model):
     
     # Mantenimiento
     umbral_mantencion = models.IntegerField(default=10000, help_text="Kms entre mantenciones preventivas")
+    # Último preventivo finalizado (desnormalizado; lo mantienen las señales de Mantenimiento, ver services/kilometraje.py)
+    km_ultimo_preventivo = models.IntegerField(null=True, blank=True, editable=False)
+    fecha_ultimo_preventivo = models.DateField(null=True, blank=True, editable=False)
     
     # Clasificación
     tipo_carroceria = models.CharField(max_length=20, choices=TIPOS_CARROCERIA)
@@ -72,11 +75,19 @@ class Vehiculo(models.Model):
     tipo_propiedad = models.CharField(max_length=30, choices=TIPOS_PROPIEDAD, default='Propio')
     
     creado_en = models.DateTimeField(auto_now_add=True)
-    
+
+    # Km desde el último preventivo que generan alerta / bloquean el vehículo
+    UMBRAL_KM_PREVENTIVO = 8000
+    UMBRAL_KM_CRITICO = 12000
+    CAMPOS_ULTIMO_PREVENTIVO = ('km_ultimo_preventivo', 'fecha_ultimo_preventivo')
+
     class Meta:
         db_table = 'vehiculo'
         verbose_name = 'Vehículo'
         verbose_name_plural = 'Vehículos'
+        indexes = [
+            models.Index(fields=['estado', 'km_ultimo_preventivo']),
+        ]
     
     def __str__(self):
         return f"{self.patente} - {self.marca} {self.modelo}"
@@ -91,27 +102,49 @@ class Vehiculo(models.Model):
             return max(0, self.umbral_mantencion - resto)
         return 0
 
+    @property
+    def km_desde_ultimo_preventivo(self):
+        """
+        Km recorridos desde el último preventivo finalizado; 0 si nunca tuvo uno.
+        """
+        if self.km_ultimo_preventivo is None:
+            return 0
+        return self.kilometraje_actual - self.km_ultimo_preventivo
+
     @classmethod
-    def objetos_operativos(cls):
-        from django.db.models import OuterRef, Subquery, F, Value, IntegerField, Case, When
-        from .mantenimiento import Mantenimiento
+    def umbrales_km(cls, tipo_carroceria):
+        """
+        (preventivo, crítico) en km desde el último preventivo para el tipo de carrocería; settings.UMBRALES_KM_ALERTA reemplaza los de la clase.
+        """
+        return getattr(settings, 'UMBRALES_KM_ALERTA', {}).get(
+            tipo_carroceria, (cls.UMBRAL_KM_PREVENTIVO, cls.UMBRAL_KM_CRITICO)
+        )
 
-        last_maint = Mantenimiento.objects.filter(
-            vehiculo=OuterRef('pk'),
-            tipo_mantencion='Preventivo',
-            estado='Finalizado'
-        ).order_by('-fecha_salida').values('km_al_ingreso')[:1]
+    @classmethod
+    def expresion_umbral_km(cls, critico=False):
+        """
+        Umbral preventivo (o crítico) de cada fila según su tipo de carrocería, para usar en consultas.
+        """
+        from django.db.models import Case, IntegerField, Value, When
+
+        indice = 1 if critico else 0
+        return Case(
+            *[
+                When(tipo_carroceria=tipo, then=Value(umbrales[indice]))
+                for tipo, umbrales in getattr(settings, 'UMBRALES_KM_ALERTA', {}).items()
+            ],
+            default=Value((cls.UMBRAL_KM_PREVENTIVO, cls.UMBRAL_KM_CRITICO)[indice]),
+            output_field=IntegerField(),
+        )
 
-        qs = cls.objects.filter(estado__in=['Disponible', 'En uso']).annotate(
-            ultimo_km=Subquery(last_maint, output_field=IntegerField())
-        ).annotate(
-            recorrido=Case(
-                When(ultimo_km__isnull=True, then=Value(0)), 
-                default=F('kilometraje_actual') - F('ultimo_km'),
-                output_field=IntegerField()
-            )
-        ).filter(recorrido__lt=12000)
-        return qs
+    @classmethod
+    def objetos_operativos(cls):
+        from django.db.models import F, Q
+
+        return cls.objects.filter(estado__in=['Disponible', 'En uso']).filter(
+            Q(km_ultimo_preventivo__isnull=True)
+            | Q(kilometraje_actual__lt=F('km_ultimo_preventivo') + cls.expresion_umbral_km(critico=True))
+        )
 
     @classmethod
     def queryset_para_hoja_ruta(cls, incluir_pk=None):
@@ -131,79 +164,22 @@ class Vehiculo(models.Model):
         return qs.order_by('patente')
 
     def save(self, *args, **kwargs):
-        from .operativa import Alerta
-
-        # Guardar primero para tener el ID
+        # km/fecha del último preventivo solo se escriben desde services.kilometraje;
+        # un guardado completo con la instancia desactualizada no debe pisarlos
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CAMPOS_ULTIMO_PREVENTIVO
+            ]
         super().save(*args, **kwargs)
+        self.evaluar_alertas_km()
 
-        # Obtener el último mantenimiento preventivo finalizado
-        ultimo_mant = self.mantenimientos.filter(
-            tipo_mantencion='Preventivo',
-            estado='Finalizado'
-        ).order_by('-fecha_salida').first()
-
-        # Si no hay mantenimiento preventivo, no se generan alertas de kilometraje
-        if not ultimo_mant:
-            # Eliminar posibles alertas previas de kilometraje (por si acaso)
-            Alerta.objects.filter(
-                vehiculo=self,
-                vigente=True,
-                valor_umbral__in=[8000, 12000]
-            ).update(vigente=False, resuelta_en=timezone.now())
-            return
-
-        km_base = ultimo_mant.km_al_ingreso
-        recorrido = self.kilometraje_actual - km_base
-
-        UMBRAL_PREVENTIVO = 8000
-        UMBRAL_CRITICO = 12000
-
-        if recorrido >= UMBRAL_CRITICO:
-            nuevo_umbral = UMBRAL_CRITICO
-            descripcion = (
-                f'ALERTA CRÍTICA: {recorrido} km desde última mantención '
-                f'(supera los {UMBRAL_CRITICO} km). Vehículo bloqueado para operación.'
-            )
-            if self.estado not in ['Fuera de servicio', 'Baja']:
-                self.estado = 'Fuera de servicio'
-                # Guardamos el cambio de estado (evitamos recursión usando update_fields)
-                Vehiculo.objects.filter(pk=self.pk).update(estado=self.estado)
-
-        elif recorrido >= UMBRAL_PREVENTIVO:
-            nuevo_umbral = UMBRAL_PREVENTIVO
-            descripcion = (
-                f'Alerta por kilometraje: {recorrido} km desde última mantención '
-                f'(umbral {UMBRAL_PREVENTIVO} km). Programar mantenimiento.'
-            )
-        else:
-            # Si el recorrido es menor a 8000, no debe haber alerta de kilometraje vigente.
-            Alerta.objects.filter(
-                vehiculo=self,
-                vigente=True,
-                valor_umbral__in=[UMBRAL_PREVENTIVO, UMBRAL_CRITICO]
-            ).update(vigente=False, resuelta_en=timezone.now())
-            return
-
-        # Manejo de alertas existentes
-        alerta_existente = Alerta.objects.filter(
-            vehiculo=self,
-            vigente=True,
-            valor_umbral=nuevo_umbral
-        ).first()
-
-        if alerta_existente:
-            alerta_existente.descripcion = descripcion
-            alerta_existente.save()
-        else:
-            # Desactivar la otra alerta si existe
-            Alerta.objects.filter(
-                vehiculo=self,
-                vigente=True,
-                valor_umbral__in=[UMBRAL_PREVENTIVO, UMBRAL_CRITICO]
-            ).exclude(valor_umbral=nuevo_umbral).update(vigente=False, resuelta_en=timezone.now())
+    def evaluar_alertas_km(self):
+        """
+        Aplica la regla de kilometraje del motor de alertas a este vehículo: abre, actualiza o resuelve su alerta y, sobre el umbral crítico, lo deja Fuera de servicio.
+        """
+        from ..services.motor_alertas import evaluar_alertas
 
-            Alerta.objects.create(
-                vehiculo=self,
-                descripcion=descripcion,
-                valor_umbral=nuevo_umbral
-            )
+        resultado = evaluar_alertas([self.pk], reglas=['km'])
+        if self.pk in resultado['bloqueados']:
+            self.estado = 'Fuera de servicio'
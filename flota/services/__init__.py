@@ -4,10 +4,28 @@ from .presupuesto import (
     obtener_presupuesto_activo,
     validar_presupuesto_disponible,
     mensaje_presupuesto_disponible,
+    reservar_presupuesto,
+    PresupuestoInsuficiente,
+)
+from .disponibilidad import (
+    calcular_indisponibilidad,
+    dias_en_periodo,
+)
+from .resumen_mensual import (
+    leer_resumenes,
+    reconstruir_resumenes,
+    verificar_resumenes,
 )
 
 __all__ = [
     'obtener_presupuesto_activo',
     'validar_presupuesto_disponible',
     'mensaje_presupuesto_disponible',
+    'reservar_presupuesto',
+    'PresupuestoInsuficiente',
+    'calcular_indisponibilidad',
+    'dias_en_periodo',
+    'leer_resumenes',
+    'reconstruir_resumenes',
+    'verificar_resumenes',
 ]
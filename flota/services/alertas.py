@@ -1,41 +1,47 @@
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
 from ..models import Alerta, Mantenimiento, Presupuesto
+from .cache_reportes import firma_modelos, obtener_versionado
 
-UMBRAL_ALERTA_PRESUPUESTO = 80
+UMBRAL_ALERTA_PRESUPUESTO = Presupuesto.NIVEL_RIESGO
 
-
-def _ids_alertas_pausadas():
-    ids_pausadas = set()
-    for alerta in Alerta.objects.filter(vigente=True).select_related('vehiculo'):
-        if alerta.vehiculo.estado == 'En mantenimiento' and Mantenimiento.objects.filter(
-            vehiculo=alerta.vehiculo,
-            estado__in=['En taller', 'Esperando repuestos'],
-            fecha_salida__isnull=True,
-        ).exists():
-            ids_pausadas.add(alerta.id)
-    return ids_pausadas
+# Modelos cuyas escrituras pueden cambiar el conteo de alertas vigentes
+MODELOS_CONTEO_ALERTAS = ['Alerta', 'Mantenimiento', 'Vehiculo', 'Presupuesto']
 
 
 def alertas_mantenimiento_vigentes():
-    return Alerta.objects.filter(vigente=True).exclude(
-        id__in=_ids_alertas_pausadas()
+    """
+    Alertas vigentes, salvo las de vehículos en mantenimiento con un ingreso a taller abierto (quedan en pausa hasta que salga).
+    """
+    en_taller = Mantenimiento.objects.filter(
+        vehiculo=OuterRef('vehiculo'),
+        estado__in=['En taller', 'Esperando repuestos'],
+        fecha_salida__isnull=True,
+    )
+    return Alerta.objects.filter(vigente=True).alias(pausada=Exists(en_taller)).exclude(
+        vehiculo__estado='En mantenimiento', pausada=True,
     ).select_related('vehiculo').order_by('-generado_en')
 
 
+def presupuestos_con_alerta_qs():
+    """
+    Presupuestos activos con ejecución sobre el umbral y la alerta no descartada, según el nivel guardado al recalcular la ejecución.
+    """
+    return Presupuesto.objects.filter(
+        activo=True,
+        alerta_presupuesto_ignorada=False,
+        nivel_alerta__gte=UMBRAL_ALERTA_PRESUPUESTO,
+    ).select_related('cuenta')
+
+
 def presupuestos_con_alerta():
-    return [
-        presupuesto for presupuesto in Presupuesto.objects.filter(
-            activo=True,
-            alerta_presupuesto_ignorada=False,
-        ).exclude(monto_asignado=0).select_related('cuenta')
-        if presupuesto.porcentaje_ejecutado >= UMBRAL_ALERTA_PRESUPUESTO
-    ]
+    return list(presupuestos_con_alerta_qs())
 
 
 def contar_alertas_vigentes():
     count_mant = alertas_mantenimiento_vigentes().count()
-    count_presupuesto = len(presupuestos_con_alerta())
+    count_presupuesto = presupuestos_con_alerta_qs().count()
     return {
         'count': count_mant + count_presupuesto,
         'mantenimiento': count_mant,
@@ -43,6 +49,17 @@ def contar_alertas_vigentes():
     }
 
 
+def version_conteo_alertas():
+    return firma_modelos(MODELOS_CONTEO_ALERTAS)
+
+
+def conteo_alertas_cacheado():
+    """
+    contar_alertas_vigentes() desde el caché; las señales de los modelos de MODELOS_CONTEO_ALERTAS lo invalidan.
+    """
+    return obtener_versionado('conteo_alertas', MODELOS_CONTEO_ALERTAS, contar_alertas_vigentes)
+
+
 def resolver_alerta_mantenimiento(alerta):
     alerta.vigente = False
     alerta.resuelta_en = timezone.now()
@@ -0,0 +1,101 @@
+"""
+Prorrateo del costo de arriendos: costo_diario (o costo_total / dias_arriendo si no hay tarifa diaria) por los días de intersección de cada contrato con el período, repartido por mes. Fuente única para reportes, resumen mensual y ejecución presupuestaria.
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q
+
+
+def tarifa_diaria(costo_diario, costo_total, dias_arriendo):
+    """
+    Costo por día del contrato; None si no se puede determinar.
+    """
+    if costo_diario:
+        return costo_diario
+    if dias_arriendo > 0 and costo_total:
+        return Decimal(costo_total) / dias_arriendo
+    return None
+
+
+def _dias_por_mes(inicio, fin):
+    """
+    {(anio, mes): días} del rango inclusivo [inicio, fin].
+    """
+    dias = {}
+    actual = inicio
+    while actual <= fin:
+        siguiente = date(actual.year + 1, 1, 1) if actual.month == 12 else date(actual.year, actual.month + 1, 1)
+        hasta = min(fin, date.fromordinal(siguiente.toordinal() - 1))
+        dias[(actual.year, actual.month)] = (hasta - actual).days + 1
+        actual = siguiente
+    return dias
+
+
+def prorratear_arriendos(fecha_desde, fecha_hasta, vehiculo_ids=None, cuenta_ids=None):
+    """
+    Costo de arriendos del período inclusivo en una consulta. Los contratos sin fecha de fin corren hasta fecha_hasta. Filtra opcionalmente por vehículo reemplazado y por cuenta presupuestaria.
+
+    Retorna {'total', 'por_cuenta_arriendo': {(cuenta_id, arriendo_id)}, 'por_vehiculo': {vehiculo_id}, 'por_cuenta': {cuenta_id}, 'por_mes': {(anio, mes)}, 'por_vehiculo_mes': {(vehiculo_id, anio, mes)}} con montos Decimal sin redondear; los contratos sin vehículo reemplazado o sin cuenta no aparecen en el desglose respectivo.
+    """
+    from ..models import Arriendo
+
+    qs = Arriendo.objects.filter(fecha_inicio__lte=fecha_hasta).filter(
+        Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=fecha_desde)
+    )
+    if vehiculo_ids is not None:
+        qs = qs.filter(vehiculo_reemplazado_id__in=vehiculo_ids)
+    if cuenta_ids is not None:
+        qs = qs.filter(cuenta_presupuestaria_id__in=cuenta_ids)
+    filas = qs.values_list(
+        'pk', 'vehiculo_reemplazado_id', 'cuenta_presupuestaria_id', 'fecha_inicio', 'fecha_fin',
+        'costo_diario', 'costo_total', 'dias_arriendo',
+    )
+
+    total = Decimal('0')
+    por_cuenta_arriendo = defaultdict(Decimal)
+    por_vehiculo = defaultdict(Decimal)
+    por_cuenta = defaultdict(Decimal)
+    por_mes = defaultdict(Decimal)
+    por_vehiculo_mes = defaultdict(Decimal)
+    for pk, vid, cuenta_id, inicio, fin, costo_diario, costo_total, dias_arriendo in filas:
+        tarifa = tarifa_diaria(costo_diario, costo_total, dias_arriendo)
+        if tarifa is None:
+            continue
+        inter_inicio = max(inicio, fecha_desde)
+        inter_fin = min(fin or fecha_hasta, fecha_hasta)
+        for (anio, mes), dias in _dias_por_mes(inter_inicio, inter_fin).items():
+            costo = tarifa * dias
+            total += costo
+            por_mes[(anio, mes)] += costo
+            if vid is not None:
+                por_vehiculo[vid] += costo
+                por_vehiculo_mes[(vid, anio, mes)] += costo
+            if cuenta_id is not None:
+                por_cuenta[cuenta_id] += costo
+                por_cuenta_arriendo[(cuenta_id, pk)] += costo
+
+    return {
+        'total': total,
+        'por_cuenta_arriendo': dict(por_cuenta_arriendo),
+        'por_vehiculo': dict(por_vehiculo),
+        'por_cuenta': dict(por_cuenta),
+        'por_mes': dict(por_mes),
+        'por_vehiculo_mes': dict(por_vehiculo_mes),
+    }
+
+
+def costo_por_anio(arriendo, anio_hasta):
+    """
+    {anio: costo Decimal} de un arriendo ya cargado, sin consultas; sin fecha de fin corre hasta el 31 de diciembre de anio_hasta.
+    """
+    tarifa = tarifa_diaria(arriendo.costo_diario, arriendo.costo_total, arriendo.dias_arriendo)
+    if tarifa is None or arriendo.fecha_inicio is None:
+        return {}
+    fin = arriendo.fecha_fin or date(max(anio_hasta, arriendo.fecha_inicio.year), 12, 31)
+    costos = defaultdict(Decimal)
+    for (anio, _mes), dias in _dias_por_mes(arriendo.fecha_inicio, fin).items():
+        costos[anio] += tarifa * dias
+    return dict(costos)
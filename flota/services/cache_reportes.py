@@ -0,0 +1,179 @@
+"""
+Caché versionado de las pestañas de reportes.
+
+Cada modelo de origen tiene un contador de versión en el caché que las señales incrementan al guardar o borrar. La clave de una pestaña incluye sus parámetros (anio, mes, tipo_mantencion) y las versiones de los modelos de los que depende: cualquier escritura cambia la clave y la entrada anterior queda huérfana hasta que expira. No hace falta borrar nada ni un servicio externo; funciona con LocMemCache (un proceso) y FileBasedCache (varios procesos en el mismo servidor).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+ALIAS_CACHE = 'reportes'
+PREFIJO = 'reportes'
+
+DEPENDENCIAS_TAB = {
+    'costos': ['Vehiculo', 'Mantenimiento', 'CargaCombustible', 'Arriendo', 'HojaRuta', 'Viaje', 'LecturaOdometro', 'Presupuesto'],
+    'graficos_costos': ['Vehiculo', 'Mantenimiento', 'CargaCombustible', 'Arriendo', 'HojaRuta', 'Viaje', 'LecturaOdometro'],
+    'variacion': ['Mantenimiento', 'Presupuesto', 'OrdenCompra', 'CuentaPresupuestaria'],
+    'disponibilidad': ['Vehiculo', 'Mantenimiento', 'CargaCombustible', 'HojaRuta', 'Viaje', 'LecturaOdometro', 'FallaReportada'],
+    'dashboard': ['Vehiculo', 'Mantenimiento', 'CargaCombustible', 'Arriendo', 'Alerta', 'Presupuesto'],
+}
+
+# Pestañas cuyo resultado depende de la fecha actual (mantenimientos abiertos cuentan hasta hoy)
+TABS_DEPENDIENTES_DE_HOY = {'disponibilidad', 'graficos_costos', 'dashboard'}
+
+# Vigencia en segundos por pestaña; el resto usa REPORTES_CACHE_TIMEOUT
+TIMEOUT_TAB = {'dashboard': 60}
+
+MODELOS_VERSIONADOS = sorted({m for modelos in DEPENDENCIAS_TAB.values() for m in modelos})
+
+
+def _cache():
+    return caches[ALIAS_CACHE] if ALIAS_CACHE in settings.CACHES else caches['default']
+
+
+def _timeout(tab=None):
+    if tab in TIMEOUT_TAB:
+        return TIMEOUT_TAB[tab]
+    return getattr(settings, 'REPORTES_CACHE_TIMEOUT', 3600)
+
+
+def _incrementar(clave):
+    cache = _cache()
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 0, None)
+        return cache.incr(clave)
+
+
+def _version_inicial():
+    # Si el backend expulsa un contador, se reinicia en un valor nuevo y nunca vuelve a una versión ya usada
+    return time.time_ns() // 1000
+
+
+def incrementar_version(nombre_modelo):
+    """
+    Marca que hubo una escritura en el modelo; invalida las pestañas que dependen de él.
+    """
+    cache = _cache()
+    clave = f'{PREFIJO}:version:{nombre_modelo}'
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        cache.add(clave, _version_inicial(), None)
+        return cache.get(clave)
+
+
+def invalidar_modelos(*nombres_modelos):
+    """
+    Para escrituras con QuerySet.update(), que no disparan señales: incrementa las versiones al confirmar la transacción.
+    """
+    for nombre in nombres_modelos:
+        transaction.on_commit(lambda nombre=nombre: incrementar_version(nombre))
+
+
+def versiones_modelos(nombres):
+    cache = _cache()
+    claves = {f'{PREFIJO}:version:{n}': n for n in nombres}
+    valores = cache.get_many(list(claves))
+    for clave in claves:
+        if clave not in valores:
+            cache.add(clave, _version_inicial(), None)
+            valores[clave] = cache.get(clave)
+    return {n: valores[clave] for clave, n in claves.items()}
+
+
+def firma_modelos(nombres):
+    """
+    Versiones de los modelos unidas en un string; cambia con cualquier escritura en ellos.
+    """
+    versiones = versiones_modelos(nombres)
+    return '.'.join(str(versiones[n]) for n in nombres)
+
+
+def clave_tab(tab, anio=None, mes=None, tipo_mantencion=None):
+    firma = firma_modelos(DEPENDENCIAS_TAB[tab])
+    partes = [PREFIJO, tab, anio or '-', mes or '-', tipo_mantencion or '-', firma]
+    if tab in TABS_DEPENDIENTES_DE_HOY:
+        partes.append(timezone.localdate().isoformat())
+    return ':'.join(str(p) for p in partes)
+
+
+def anios_cerrados():
+    """
+    Años con CierreAnual, cacheados bajo la versión del modelo (se invalidan al cerrar o reabrir).
+    """
+    from ..models import CierreAnual
+
+    cache = _cache()
+    clave = f"{PREFIJO}:anios_cerrados:{versiones_modelos(['CierreAnual'])['CierreAnual']}"
+    anios = cache.get(clave)
+    if anios is None:
+        anios = set(CierreAnual.objects.values_list('anio', flat=True))
+        cache.set(clave, anios, _timeout())
+    return anios
+
+
+def obtener_o_calcular(tab, calcular, anio=None, mes=None, tipo_mantencion=None):
+    """
+    Retorna el contexto de la pestaña: desde el snapshot si el año está cerrado, si no desde el caché o calculándolo con calcular(). Registra aciertos y fallos por pestaña.
+    """
+    if anio in anios_cerrados():
+        from .cierre_anual import datos_reporte_cerrado
+        datos = datos_reporte_cerrado(tab, anio, mes, tipo_mantencion)
+        if datos is not None:
+            return datos
+
+    cache = _cache()
+    clave = clave_tab(tab, anio, mes, tipo_mantencion)
+    datos = cache.get(clave)
+    if datos is not None:
+        _incrementar(f'{PREFIJO}:hits:{tab}')
+        return datos
+    _incrementar(f'{PREFIJO}:misses:{tab}')
+    datos = calcular()
+    cache.set(clave, datos, _timeout(tab))
+    return datos
+
+
+def obtener_versionado(nombre, modelos, calcular):
+    """
+    Valor pequeño que depende solo de los modelos indicados (p.ej. contadores): se guarda bajo la firma de sus versiones y se recalcula tras cualquier escritura en ellos.
+    """
+    cache = _cache()
+    clave = f'{PREFIJO}:{nombre}:{firma_modelos(modelos)}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, _timeout())
+    return datos
+
+
+def estadisticas_cache():
+    """
+    Aciertos, fallos y porcentaje de aciertos por pestaña, más las versiones actuales de cada modelo.
+    """
+    cache = _cache()
+    claves = [f'{PREFIJO}:{tipo}:{tab}' for tab in DEPENDENCIAS_TAB for tipo in ('hits', 'misses')]
+    valores = cache.get_many(claves)
+    tabs = {}
+    for tab in DEPENDENCIAS_TAB:
+        hits = valores.get(f'{PREFIJO}:hits:{tab}', 0)
+        misses = valores.get(f'{PREFIJO}:misses:{tab}', 0)
+        total = hits + misses
+        tabs[tab] = {
+            'hits': hits,
+            'misses': misses,
+            'porcentaje_hits': round(hits * 100 / total, 1) if total else None,
+        }
+    return {'tabs': tabs, 'versiones': versiones_modelos(MODELOS_VERSIONADOS)}
+
+
+def reiniciar_estadisticas():
+    _cache().delete_many(
+        [f'{PREFIJO}:{tipo}:{tab}' for tab in DEPENDENCIAS_TAB for tipo in ('hits', 'misses')]
+    )
@@ -0,0 +1,147 @@
+"""
+Cierre de años fiscales: calcula una sola vez el panel de control, las pestañas de reportes (año completo y cada mes) y la planilla de mantenimientos, y los guarda en CierreAnual. Mientras el año esté cerrado las vistas leen el snapshot; reabrir lo borra y se vuelve a calcular desde las tablas.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from django.db.models.fields.json import KeyTransform
+from django.utils import timezone
+
+TIPOS_VARIACION = ['', 'Preventivo', 'Correctivo']
+MESES_SNAPSHOT = [None] + list(range(1, 13))
+
+
+def serializar(valor):
+    """
+    Convierte un contexto a JSON conservando Decimal, date y datetime. Instancias de modelo pasan a dict con sus campos (las plantillas acceden igual: item.vehiculo.patente).
+    """
+    if isinstance(valor, Decimal):
+        return {'__decimal__': str(valor)}
+    if isinstance(valor, datetime):
+        return {'__datetime__': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'__date__': valor.isoformat()}
+    if isinstance(valor, models.Model):
+        return {f.attname: serializar(getattr(valor, f.attname)) for f in valor._meta.concrete_fields}
+    if isinstance(valor, models.QuerySet):
+        return [serializar(v) for v in valor]
+    if isinstance(valor, dict):
+        return {str(k): serializar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [serializar(v) for v in valor]
+    return valor
+
+
+def deserializar(valor):
+    if isinstance(valor, dict):
+        if len(valor) == 1:
+            if '__decimal__' in valor:
+                return Decimal(valor['__decimal__'])
+            if '__datetime__' in valor:
+                return datetime.fromisoformat(valor['__datetime__'])
+            if '__date__' in valor:
+                return date.fromisoformat(valor['__date__'])
+        return {k: deserializar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [deserializar(v) for v in valor]
+    return valor
+
+
+def clave_reporte(tab, anio, mes=None, tipo_mantencion=None):
+    return f'{tab}:{anio}:{mes or "-"}:{tipo_mantencion or "-"}'
+
+
+def obtener_cierre(anio):
+    """
+    CierreAnual del año o None. No carga el snapshot de reportes.
+    """
+    from ..models import CierreAnual
+
+    return CierreAnual.objects.filter(anio=anio).defer('reportes').first()
+
+
+def datos_reporte_cerrado(tab, anio, mes=None, tipo_mantencion=None):
+    """
+    Contexto guardado de una pestaña de reportes si el año está cerrado; None en caso contrario. Lee solo esa clave del JSON.
+    """
+    from ..models import CierreAnual
+
+    if not anio:
+        return None
+    fila = (
+        CierreAnual.objects.filter(anio=anio)
+        .annotate(dato=KeyTransform(clave_reporte(tab, anio, mes, tipo_mantencion), 'reportes'))
+        .values_list('dato', flat=True)
+        .first()
+    )
+    return deserializar(fila) if fila is not None else None
+
+
+def _snapshot_reportes(anio):
+    from ..indicadores import rango_fechas_reporte
+    from ..views.reportes.calculos import ReporteCalculos
+    from ..views.reportes.vistas import (
+        contexto_tab_costos,
+        contexto_tab_disponibilidad,
+        contexto_tab_variacion,
+    )
+
+    reportes = {}
+    for mes in MESES_SNAPSHOT:
+        reportes[clave_reporte('costos', anio, mes)] = serializar(contexto_tab_costos(anio, mes))
+        reportes[clave_reporte('graficos_costos', anio, mes)] = serializar(
+            ReporteCalculos.obtener_datos_graficos_costos(*rango_fechas_reporte(anio, mes))
+        )
+        reportes[clave_reporte('disponibilidad', anio, mes)] = serializar(contexto_tab_disponibilidad(anio, mes))
+    for tipo in TIPOS_VARIACION:
+        reportes[clave_reporte('variacion', anio, None, tipo)] = serializar(contexto_tab_variacion(anio, tipo))
+    return reportes
+
+
+def cerrar_anio(anio, usuario=None, forzar=False):
+    """
+    Genera (o regenera) el snapshot del año. Solo años ya terminados salvo forzar=True.
+    """
+    from ..models import CierreAnual
+    from ..utils import exportar_planilla_mantenimientos_excel
+    from ..views.panel_control import contexto_panel_control
+
+    anio = int(anio)
+    if anio >= timezone.localdate().year and not forzar:
+        raise ValueError(f"El año {anio} no ha terminado; no se puede cerrar.")
+
+    panel = serializar(contexto_panel_control(anio))
+    reportes = _snapshot_reportes(anio)
+    planilla = exportar_planilla_mantenimientos_excel(anio).content
+
+    with transaction.atomic():
+        cierre, _ = CierreAnual.objects.select_for_update().get_or_create(anio=anio)
+        if cierre.planilla_mantenimientos:
+            cierre.planilla_mantenimientos.delete(save=False)
+        cierre.panel_control = panel
+        cierre.reportes = reportes
+        cierre.cerrado_por = usuario
+        cierre.cerrado_en = timezone.now()
+        cierre.planilla_mantenimientos.save(
+            f'planilla_mantenimientos_{anio}.xlsx', ContentFile(planilla), save=False
+        )
+        cierre.save()
+    return cierre
+
+
+def reabrir_anio(anio):
+    """
+    Borra el snapshot del año (y su planilla). Retorna True si el año estaba cerrado.
+    """
+    from ..models import CierreAnual
+
+    cierre = CierreAnual.objects.filter(anio=anio).first()
+    if not cierre:
+        return False
+    if cierre.planilla_mantenimientos:
+        cierre.planilla_mantenimientos.delete(save=False)
+    cierre.delete()
+    return True
@@ -0,0 +1,146 @@
+"""
+Días fuera de servicio por vehículo y por mes (fuente única para panel de control, dashboard y reportes de disponibilidad).
+
+Cada mantenimiento es un intervalo semiabierto [fecha_ingreso, fecha_salida). Los que siguen en taller sin fecha de salida se extienden hasta hoy inclusive. Los intervalos se recortan al período, se fusionan por vehículo con un barrido y, cuando un preventivo y un correctivo se solapan, el día se atribuye al correctivo; así preventivo + correctivo = total y un día nunca se cuenta dos veces.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+ESTADOS_SIN_INDISPONIBILIDAD = ['Programado', 'Cancelado']
+ESTADOS_EN_TALLER = ['En taller', 'Esperando repuestos']
+
+
+def dias_en_periodo(fecha_desde, fecha_hasta):
+    """
+    Cantidad de días del período inclusivo [fecha_desde, fecha_hasta].
+    """
+    return max(0, (fecha_hasta - fecha_desde).days + 1)
+
+
+def _inicio_mes_siguiente(fecha):
+    if fecha.month == 12:
+        return date(fecha.year + 1, 1, 1)
+    return date(fecha.year, fecha.month + 1, 1)
+
+
+def _dias_por_mes(inicio, fin):
+    """
+    Reparte el segmento semiabierto [inicio, fin) en {(anio, mes): dias}.
+    """
+    out = {}
+    cursor = inicio
+    while cursor < fin:
+        corte = min(_inicio_mes_siguiente(cursor), fin)
+        out[(cursor.year, cursor.month)] = (corte - cursor).days
+        cursor = corte
+    return out
+
+
+def _vacio():
+    return {'preventivo': 0, 'correctivo': 0, 'total': 0}
+
+
+def intervalos_mantenimiento(vehiculo_ids, fecha_desde, fecha_hasta, hoy=None):
+    """
+    Intervalos [inicio, fin) recortados al período, agrupados por vehículo: {vehiculo_id: [(inicio, fin, tipo_mantencion), ...]}. Una sola consulta.
+    """
+    from ..models import Mantenimiento
+
+    vehiculo_ids = list(vehiculo_ids)
+    if not vehiculo_ids:
+        return {}
+    hoy = hoy or timezone.localdate()
+    limite_inf = fecha_desde
+    limite_sup = fecha_hasta + timedelta(days=1)
+    fin_abiertos = min(hoy + timedelta(days=1), limite_sup)
+
+    filas = (
+        Mantenimiento.objects.filter(
+            vehiculo_id__in=vehiculo_ids,
+            fecha_ingreso__lte=fecha_hasta,
+        )
+        .filter(
+            Q(fecha_salida__gt=fecha_desde)
+            | Q(fecha_salida__isnull=True, estado__in=ESTADOS_EN_TALLER)
+        )
+        .exclude(estado__in=ESTADOS_SIN_INDISPONIBILIDAD)
+        .values_list('vehiculo_id', 'tipo_mantencion', 'fecha_ingreso', 'fecha_salida')
+    )
+
+    intervalos = defaultdict(list)
+    for vid, tipo, ingreso, salida in filas:
+        inicio = max(ingreso, limite_inf)
+        fin = min(salida, limite_sup) if salida else fin_abiertos
+        if fin > inicio:
+            intervalos[vid].append((inicio, fin, tipo))
+    return intervalos
+
+
+def _barrer(intervalos):
+    """
+    Barrido sobre los intervalos de un vehículo. Genera segmentos disjuntos (inicio, fin, tipo) donde tipo es 'correctivo' si hay algún correctivo activo y 'preventivo' en caso contrario.
+    """
+    eventos = defaultdict(lambda: [0, 0])
+    for inicio, fin, tipo in intervalos:
+        idx = 1 if tipo == 'Correctivo' else 0
+        eventos[inicio][idx] += 1
+        eventos[fin][idx] -= 1
+
+    activos = [0, 0]
+    anterior = None
+    for punto in sorted(eventos):
+        if anterior is not None and (activos[0] or activos[1]):
+            yield anterior, punto, 'correctivo' if activos[1] else 'preventivo'
+        activos[0] += eventos[punto][0]
+        activos[1] += eventos[punto][1]
+        anterior = punto
+
+
+def calcular_indisponibilidad(vehiculo_ids, fecha_desde, fecha_hasta, hoy=None):
+    """
+    Días fuera de servicio en [fecha_desde, fecha_hasta], separados en preventivo/correctivo.
+
+    Returns:
+        {
+            'por_vehiculo': {vehiculo_id: {'preventivo', 'correctivo', 'total'}},
+            'por_vehiculo_mes': {vehiculo_id: {(anio, mes): {...}}},
+            'por_mes': {(anio, mes): {...}},   # suma de la flota
+            'total': {...},
+        }
+    """
+    vehiculo_ids = list(vehiculo_ids)
+    intervalos = intervalos_mantenimiento(vehiculo_ids, fecha_desde, fecha_hasta, hoy)
+
+    por_vehiculo = {vid: _vacio() for vid in vehiculo_ids}
+    por_vehiculo_mes = {vid: defaultdict(_vacio) for vid in vehiculo_ids}
+    por_mes = defaultdict(_vacio)
+    total = _vacio()
+
+    for vid, lista in intervalos.items():
+        for inicio, fin, tipo in _barrer(lista):
+            for clave_mes, dias in _dias_por_mes(inicio, fin).items():
+                for destino in (por_vehiculo[vid], por_vehiculo_mes[vid][clave_mes], por_mes[clave_mes], total):
+                    destino[tipo] += dias
+                    destino['total'] += dias
+
+    return {
+        'por_vehiculo': por_vehiculo,
+        'por_vehiculo_mes': {vid: dict(meses) for vid, meses in por_vehiculo_mes.items()},
+        'por_mes': dict(por_mes),
+        'total': total,
+    }
+
+
+def dias_fuera_por_mes_anio(indisponibilidad, anio, vehiculo_id=None):
+    """
+    Lista de 12 totales mensuales del año (flota completa o un vehículo).
+    """
+    if vehiculo_id is None:
+        fuente = indisponibilidad['por_mes']
+    else:
+        fuente = indisponibilidad['por_vehiculo_mes'].get(vehiculo_id, {})
+    return [fuente.get((anio, mes), _vacio())['total'] for mes in range(1, 13)]
@@ -0,0 +1,211 @@
+"""
+Importación de órdenes de compra desde Mercado Público, de a una (vista importar_oc) o en lote (misma vista y `manage.py importar_ocs`).
+
+Las consultas a la API van en paralelo: un pool acotado de hilos (MERCADO_PUBLICO_HILOS) comparte el cliente del proceso (services/mercado_publico: sesión, caché y reintentos de timeouts, 429 y 5xx con espera exponencial) y respeta un tope de consultas por segundo. El guardado es secuencial, en una sola transacción y dentro de presupuesto_diferido, con un resultado por código.
+La URL de la API sale de settings.MERCADO_PUBLICO_URL, así que se puede probar contra un servidor HTTP local o sin red con MERCADO_PUBLICO_MODO='reproducir'.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .mercado_publico import cliente_mercado_publico
+from .movimientos_presupuesto import presupuesto_diferido
+from .parseo_oc import parsear_oc
+from .presupuesto import PresupuestoInsuficiente
+
+# Tope de códigos por envío del formulario (la consulta corre dentro de la petición web); el comando no tiene tope
+MAXIMO_CODIGOS_FORMULARIO = 100
+
+_PATRON_CODIGO = re.compile(r'\b\d+-\d+-[A-Z0-9]+\b')
+
+
+def extraer_codigos(texto):
+    """
+    Códigos de OC (p.ej. 1057531-912-CC25) de un texto libre o CSV, en mayúsculas, sin repetir y en el orden en que aparecen.
+    """
+    return list(dict.fromkeys(_PATRON_CODIGO.findall((texto or '').upper())))
+
+
+class _Limitador:
+    """
+    Reparte turnos separados por 1/por_segundo segundos entre todos los hilos.
+    """
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1 / por_segundo if por_segundo > 0 else 0
+        self._lock = threading.Lock()
+        self._siguiente = 0.0
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def consultar_ocs(codigos, hilos=None):
+    """
+    {codigo: datos limpios} consultados en paralelo; un código que falla trae {'error': ...} como consultar_oc_mercado_publico.
+    """
+    if not codigos:
+        return {}
+    cliente = cliente_mercado_publico()
+    if not cliente.configurado:
+        return {codigo: {'error': 'Ticket no configurado.'} for codigo in codigos}
+    hilos = max(1, min(hilos or settings.MERCADO_PUBLICO_HILOS, len(codigos)))
+    limitador = _Limitador(settings.MERCADO_PUBLICO_CONSULTAS_POR_SEGUNDO)
+
+    def consultar(codigo):
+        try:
+            payload = cliente.obtener(codigo, reintentos=settings.MERCADO_PUBLICO_REINTENTOS, limitador=limitador)
+            return parsear_oc(payload, codigo)
+        except Exception as e:
+            return {'error': cliente.mensaje_error(e)}
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return dict(zip(codigos, pool.map(consultar, codigos)))
+
+
+def _normalizar_patente(patente):
+    return re.sub(r'[^A-Z0-9]', '', (patente or '').upper())
+
+
+def indice_vehiculos():
+    """
+    Vehículos por patente exacta y normalizada (sin puntos ni guiones), para asociar varias OCs con una sola consulta.
+    """
+    from ..models import Vehiculo
+
+    exactas, normalizadas = {}, {}
+    for vehiculo in Vehiculo.objects.only('id', 'patente').order_by('pk'):
+        exactas.setdefault(vehiculo.patente.upper(), vehiculo)
+        normalizadas.setdefault(_normalizar_patente(vehiculo.patente), vehiculo)
+    return exactas, normalizadas
+
+
+def _buscar_vehiculo(patentes, indice):
+    """
+    Primer vehículo cuya patente coincide tal cual con alguna de las posibles; si no, el primero que coincide sin puntos ni guiones.
+    """
+    exactas, normalizadas = indice
+    for patente in patentes:
+        if patente.upper() in exactas:
+            return exactas[patente.upper()]
+    for patente in patentes:
+        vehiculo = normalizadas.get(_normalizar_patente(patente))
+        if vehiculo:
+            return vehiculo
+    return None
+
+
+def _fecha_emision(valor):
+    if valor:
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return timezone.now().date()
+
+
+def guardar_oc_importada(datos, indice=None):
+    """
+    Crea o actualiza (por nro_oc) la OC con los datos limpios de la API, creando el proveedor si no existe y asociando vehículo y cuenta cuando se reconocen.
+    Retorna (oc, creada, avisos) con avisos [(nivel, mensaje)], nivel 'info' o 'warning'.
+    """
+    from ..models import CuentaPresupuestaria, OrdenCompra, Proveedor
+
+    avisos = []
+    proveedor, proveedor_creado = Proveedor.objects.get_or_create(
+        rut_empresa=datos['proveedor_rut'],
+        defaults={
+            'nombre_fantasia': datos['proveedor_nombre'],
+            'telefono': '',
+            'email_contacto': '',
+            'es_taller': True,
+            'es_arrendador': False,
+            'activo': True
+        }
+    )
+    if proveedor_creado:
+        avisos.append(('info', f"Proveedor {proveedor.nombre_fantasia} creado."))
+
+    vehiculo = _buscar_vehiculo(datos.get('patentes_posibles') or [], indice or indice_vehiculos())
+    cuenta = None
+    if datos.get('codigo_presupuestario'):
+        cuenta = CuentaPresupuestaria.objects.filter(codigo=datos['codigo_presupuestario']).first()
+
+    oc, creada = OrdenCompra.objects.update_or_create(
+        nro_oc=datos['codigo'],
+        defaults={
+            'descripcion': datos['descripcion'][:500],
+            'vehiculo': vehiculo,
+            'fecha_emision': _fecha_emision(datos.get('fecha_emision')),
+            'monto_neto': datos.get('monto_neto', 0),
+            'monto_total': datos.get('monto_total', 0),
+            'impuesto': datos.get('impuestos', 0),
+            'id_licitacion': datos.get('id_licitacion', ''),
+            'folio_sigfe': '',
+            'estado': datos.get('estado', 'Emitida'),
+            'proveedor': proveedor,
+            'tipo_adquisicion': datos.get('tipo_adquisicion', 'Convenio Marco'),
+            'cuenta_presupuestaria': cuenta,
+            'presupuesto': None,
+            'archivo_adjunto': None,
+        }
+    )
+
+    if vehiculo:
+        avisos.append(('info', f"Se asoció al vehículo: {vehiculo.patente}"))
+    else:
+        avisos.append(('warning', "No se pudo asociar a ningún vehículo. Verifica que la patente exista en el sistema."))
+    if cuenta:
+        avisos.append(('info', f"Se asignó la cuenta: {cuenta.codigo}"))
+    else:
+        avisos.append(('warning', "No se pudo asignar cuenta presupuestaria. Verifica que el código exista en el sistema."))
+    return oc, creada, avisos
+
+
+def importar_ocs(codigos, hilos=None):
+    """
+    Consulta los códigos en paralelo y guarda las OCs encontradas en una transacción, cada una en su propio savepoint para que un error no arrastre a las demás.
+    El presupuesto se reserva una vez al final (presupuesto_diferido): si no alcanza, se revierte el lote completo y todas las OCs quedan con ese error.
+    Retorna [{'codigo', 'ok', 'creada', 'oc_id', 'mensaje', 'avisos'}] en el orden de los códigos.
+    """
+    datos_por_codigo = consultar_ocs(codigos, hilos)
+    indice = indice_vehiculos()
+    resultados = []
+    try:
+        with transaction.atomic(), presupuesto_diferido():
+            for codigo in codigos:
+                resultado = {'codigo': codigo, 'ok': False, 'creada': False, 'oc_id': None, 'mensaje': '', 'avisos': []}
+                resultados.append(resultado)
+                datos = datos_por_codigo[codigo]
+                if 'error' in datos:
+                    resultado['mensaje'] = datos['error']
+                    continue
+                try:
+                    with transaction.atomic():
+                        oc, creada, avisos = guardar_oc_importada(datos, indice)
+                except Exception as e:
+                    resultado['mensaje'] = f"Error: {str(e)}"
+                    continue
+                resultado.update(
+                    ok=True, creada=creada, oc_id=oc.pk, avisos=avisos,
+                    mensaje=f"OC {oc.nro_oc} importada." if creada else f"OC {oc.nro_oc} actualizada.",
+                )
+    except PresupuestoInsuficiente as e:
+        for resultado in resultados:
+            if resultado['ok']:
+                resultado.update(ok=False, creada=False, oc_id=None, mensaje=f"Lote revertido: {e}")
+    return resultados
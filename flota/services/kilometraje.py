@@ -0,0 +1,184 @@
+"""
+Kilometraje de los vehículos: actualización del odómetro y km/fecha del último mantenimiento preventivo finalizado, guardados en Vehiculo para que el filtro de operativos y las alertas comparen columnas en vez de buscar el mantenimiento en cada consulta.
+"""
+
+from django.db.models import OuterRef, Subquery
+
+from .cache_reportes import invalidar_modelos
+
+
+def _tramo_alerta(vehiculo, km):
+    """
+    0 bajo el umbral preventivo, 1 entre preventivo y crítico, 2 sobre el crítico; None sin preventivo registrado.
+    """
+    if vehiculo.km_ultimo_preventivo is None:
+        return None
+    preventivo, critico = vehiculo.umbrales_km(vehiculo.tipo_carroceria)
+    recorrido = km - vehiculo.km_ultimo_preventivo
+    if recorrido >= critico:
+        return 2
+    if recorrido >= preventivo:
+        return 1
+    return 0
+
+
+def registrar_kilometraje(vehiculo, km):
+    """
+    Sube el odómetro del vehículo a km si es mayor al guardado, en un solo UPDATE condicional: nunca retrocede y dos escrituras simultáneas no se pisan (gana la mayor). La alerta de km se reevalúa solo si la lectura cruza un umbral. Retorna True si el odómetro cambió.
+    """
+    from ..models import Vehiculo
+
+    if not km:
+        return False
+    km_anterior = vehiculo.kilometraje_actual
+    actualizado = Vehiculo.objects.filter(pk=vehiculo.pk, kilometraje_actual__lt=km).update(kilometraje_actual=km)
+    if not actualizado:
+        return False
+    vehiculo.kilometraje_actual = km
+    if _tramo_alerta(vehiculo, km_anterior) != _tramo_alerta(vehiculo, km):
+        vehiculo.evaluar_alertas_km()
+    return True
+
+
+def _ultimo_preventivo():
+    from ..models import Mantenimiento
+
+    return Mantenimiento.objects.filter(
+        vehiculo=OuterRef('pk'),
+        tipo_mantencion='Preventivo',
+        estado='Finalizado'
+    ).order_by('-fecha_salida', '-id')
+
+
+def _con_ultimo_preventivo(vehiculo_ids):
+    from ..models import Vehiculo
+
+    qs = Vehiculo.objects.all()
+    if vehiculo_ids is not None:
+        qs = qs.filter(pk__in=vehiculo_ids)
+    ultimo = _ultimo_preventivo()
+    return qs.annotate(
+        km=Subquery(ultimo.values('km_al_ingreso')[:1]),
+        fecha=Subquery(ultimo.values('fecha_salida')[:1]),
+    )
+
+
+def afecta_ultimo_preventivo(mantenimiento):
+    return mantenimiento.tipo_mantencion == 'Preventivo' and mantenimiento.estado == 'Finalizado'
+
+
+def calcular_ultimo_preventivo(vehiculo_ids=None):
+    """
+    {vehiculo_id: (km, fecha)} calculado desde Mantenimiento, en una consulta. (None, None) si no tiene preventivos.
+    """
+    filas = _con_ultimo_preventivo(vehiculo_ids).values_list('pk', 'km', 'fecha')
+    return {pk: (km, fecha) for pk, km, fecha in filas}
+
+
+def actualizar_ultimo_preventivo(vehiculo_ids=None, reevaluar_alertas=True):
+    """
+    Recalcula km_ultimo_preventivo y fecha_ultimo_preventivo en un UPDATE. Con reevaluar_alertas, vuelve a evaluar la alerta de km de cada vehículo cuyo valor cambió. Retorna {vehiculo_id: (km, fecha)} de los vehículos modificados.
+    """
+    from ..models import Vehiculo
+
+    filas = _con_ultimo_preventivo(vehiculo_ids).values_list('pk', 'km_ultimo_preventivo', 'fecha_ultimo_preventivo', 'km', 'fecha')
+    cambios = {
+        pk: (km, fecha)
+        for pk, km_guardado, fecha_guardada, km, fecha in filas
+        if (km_guardado, fecha_guardada) != (km, fecha)
+    }
+    if not cambios:
+        return {}
+
+    ultimo = _ultimo_preventivo()
+    Vehiculo.objects.filter(pk__in=list(cambios)).update(
+        km_ultimo_preventivo=Subquery(ultimo.values('km_al_ingreso')[:1]),
+        fecha_ultimo_preventivo=Subquery(ultimo.values('fecha_salida')[:1]),
+    )
+    if reevaluar_alertas:
+        for vehiculo in Vehiculo.objects.filter(pk__in=list(cambios)):
+            vehiculo.evaluar_alertas_km()
+    return cambios
+
+
+def verificar_ultimo_preventivo():
+    """
+    Lista de (vehiculo, guardado, calculado) donde el valor desnormalizado no coincide con Mantenimiento.
+    """
+    from ..models import Vehiculo
+
+    calculados = calcular_ultimo_preventivo()
+    diferencias = []
+    for vehiculo in Vehiculo.objects.order_by('patente'):
+        guardado = (vehiculo.km_ultimo_preventivo, vehiculo.fecha_ultimo_preventivo)
+        if guardado != calculados[vehiculo.pk]:
+            diferencias.append((vehiculo, guardado, calculados[vehiculo.pk]))
+    return diferencias
+
+
+ORIGENES_LECTURA = {
+    'HojaRuta': 'hoja_ruta',
+    'Viaje': 'viaje',
+    'CargaCombustible': 'carga_combustible',
+}
+
+
+def lecturas_de(instance):
+    """
+    Lecturas de odómetro (sin guardar) que aporta una HojaRuta, Viaje o CargaCombustible.
+    """
+    from ..models import HojaRuta, LecturaOdometro
+
+    modelo = type(instance).__name__
+    if modelo == 'HojaRuta':
+        vehiculo_id, fecha = instance.vehiculo_id, instance.fecha
+        kms = [instance.km_inicio, instance.km_fin]
+    elif modelo == 'Viaje':
+        hoja = HojaRuta.objects.filter(pk=instance.hoja_ruta_id).values_list('vehiculo_id', 'fecha').first()
+        if not hoja:
+            return []
+        vehiculo_id, fecha = hoja
+        kms = [instance.km_salida, instance.km_llegada]
+    else:
+        vehiculo_id, fecha = instance.patente_vehiculo_id, instance.fecha
+        kms = [instance.kilometraje_al_cargar]
+    return [
+        LecturaOdometro(
+            vehiculo_id=vehiculo_id, fecha=fecha, km=km,
+            origen=ORIGENES_LECTURA[modelo], origen_id=instance.pk,
+        )
+        for km in kms
+        if km
+    ]
+
+
+def sincronizar_lecturas(instance, creado=False, borrado=False):
+    """
+    Deja las lecturas del registro de origen al día: al crearlo se agregan, al editarlo se reemplazan solo si cambiaron y al borrarlo se quitan. En una HojaRuta editada también mueve las lecturas de sus viajes a su vehículo y fecha.
+    Son escrituras masivas sin señales, así que invalida aquí el caché de los reportes que usan km.
+    """
+    from ..models import LecturaOdometro
+
+    modelo = type(instance).__name__
+    nuevas = [] if borrado else lecturas_de(instance)
+    if creado:
+        if nuevas:
+            LecturaOdometro.objects.bulk_create(nuevas)
+            invalidar_modelos('LecturaOdometro')
+        return
+    previas = LecturaOdometro.objects.filter(origen=ORIGENES_LECTURA[modelo], origen_id=instance.pk)
+    if sorted(previas.values_list('vehiculo_id', 'fecha', 'km')) != sorted(
+        (l.vehiculo_id, l.fecha, l.km) for l in nuevas
+    ):
+        previas.delete()
+        LecturaOdometro.objects.bulk_create(nuevas)
+        invalidar_modelos('LecturaOdometro')
+
+    if modelo == 'HojaRuta' and not borrado:
+        movidas = LecturaOdometro.objects.filter(
+            origen='viaje', origen_id__in=instance.viajes.values('pk')
+        ).exclude(vehiculo_id=instance.vehiculo_id, fecha=instance.fecha).update(
+            vehiculo_id=instance.vehiculo_id, fecha=instance.fecha
+        )
+        if movidas:
+            invalidar_modelos('LecturaOdometro')
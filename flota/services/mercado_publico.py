@@ -0,0 +1,197 @@
+"""
+Cliente de la API de órdenes de compra de Mercado Público.
+
+Una sola requests.Session por proceso (conexiones keep-alive, pool de MERCADO_PUBLICO_POOL conexiones) compartida por la importación de una OC y la masiva. Las respuestas con datos se guardan MERCADO_PUBLICO_CACHE_TTL segundos en el caché 'mercado_publico' (en archivos si hay MERCADO_PUBLICO_CACHE_DIR), así que volver a importar una OC recién consultada no sale a la red.
+Cada consulta deja una línea en el logger flota.services.mercado_publico con código, origen (api, cache, fixture), estado HTTP, intentos y duración.
+
+MERCADO_PUBLICO_MODO:
+  'grabar': además de consultar, guarda cada respuesta en MERCADO_PUBLICO_FIXTURES_DIR/<codigo>.json
+  'reproducir': responde solo desde esos archivos, sin red ni ticket (pruebas y benchmarks)
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+ALIAS_CACHE = 'mercado_publico'
+MODO_GRABAR = 'grabar'
+MODO_REPRODUCIR = 'reproducir'
+# Valor del parámetro ticket en una URL, para no mostrarlo en los mensajes de error
+_PATRON_TICKET = re.compile(r'(ticket=)[^&\s]+')
+# Respuestas HTTP que vale la pena reintentar
+ESTADOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json',
+}
+
+
+class ErrorMercadoPublico(Exception):
+    """
+    Consulta imposible sin llegar a la API: falta el ticket o no hay respuesta grabada en modo reproducir.
+    """
+
+
+def ticket_mercado_publico():
+    """
+    Ticket de la API configurado, o None si falta.
+    """
+    ticket = getattr(settings, 'MERCADO_PUBLICO_TICKET', None)
+    if not ticket or ticket == 'BLABLABLA':
+        return None
+    return ticket
+
+
+def _nombre_fixture(codigo):
+    return re.sub(r'[^A-Z0-9-]', '_', codigo.upper()) + '.json'
+
+
+class ClienteMercadoPublico:
+    """
+    Consulta OCs por código con sesión persistente, caché con vencimiento y modo grabar/reproducir; los parámetros omitidos salen de settings.
+    Es seguro compartirlo entre hilos (la importación masiva lo usa desde su pool).
+    """
+
+    def __init__(self, url=None, ticket=None, timeout=None, pool=None, cache_ttl=None, modo=None, dir_fixtures=None):
+        self.url = url or settings.MERCADO_PUBLICO_URL
+        self.ticket = ticket or ticket_mercado_publico()
+        self.timeout = timeout or settings.MERCADO_PUBLICO_TIMEOUT
+        self.cache_ttl = settings.MERCADO_PUBLICO_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.modo = settings.MERCADO_PUBLICO_MODO if modo is None else modo
+        self.dir_fixtures = Path(dir_fixtures or settings.MERCADO_PUBLICO_FIXTURES_DIR)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # pool_block: con más hilos que conexiones, esperan una libre en vez de abrir conexiones que se descartan
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=pool or settings.MERCADO_PUBLICO_POOL, pool_block=True)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+
+    @property
+    def configurado(self):
+        return self.modo == MODO_REPRODUCIR or bool(self.ticket)
+
+    def cerrar(self):
+        self.session.close()
+
+    def obtener(self, codigo, reintentos=0, limitador=None):
+        """
+        Respuesta JSON de la API para un código. Reintenta hasta `reintentos` veces timeouts, errores de conexión, 429 y 5xx con espera exponencial (respetando Retry-After, con tope MERCADO_PUBLICO_ESPERA_MAXIMA); limitador.esperar() se llama antes de cada consulta real a la red.
+        Lanza requests.RequestException si la consulta falla y ErrorMercadoPublico si no se puede consultar.
+        """
+        inicio = time.perf_counter()
+        origen, estado, intentos = 'api', None, 0
+        try:
+            if self.modo == MODO_REPRODUCIR:
+                origen = 'fixture'
+                return self._leer_fixture(codigo)
+            payload = self._cache().get(self._clave(codigo)) if self.cache_ttl else None
+            if payload is not None:
+                origen = 'cache'
+                return payload
+            if not self.ticket:
+                raise ErrorMercadoPublico('Ticket no configurado.')
+            for intentos in range(1, reintentos + 2):
+                if limitador is not None:
+                    limitador.esperar()
+                try:
+                    response = self.session.get(
+                        self.url, params={'codigo': codigo, 'ticket': self.ticket}, timeout=self.timeout,
+                    )
+                    estado = response.status_code
+                    response.raise_for_status()
+                    break
+                except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                    respuesta = getattr(e, 'response', None)
+                    transitorio = respuesta is None or respuesta.status_code in ESTADOS_TRANSITORIOS
+                    if not transitorio or intentos > reintentos:
+                        raise
+                    time.sleep(self._espera_reintento(intentos, respuesta))
+            payload = response.json()
+            if payload.get('Cantidad', 0) and self.cache_ttl:
+                self._cache().set(self._clave(codigo), payload, self.cache_ttl)
+            if self.modo == MODO_GRABAR:
+                self._grabar_fixture(codigo, payload)
+            return payload
+        except Exception as e:
+            estado = estado or type(e).__name__
+            raise
+        finally:
+            logger.info(
+                'consulta_oc codigo=%s origen=%s estado=%s intentos=%d duracion_ms=%.1f',
+                codigo, origen, estado, intentos, (time.perf_counter() - inicio) * 1000,
+                extra={
+                    'codigo_oc': codigo, 'origen': origen, 'estado': estado, 'intentos': intentos,
+                    'duracion_ms': (time.perf_counter() - inicio) * 1000,
+                },
+            )
+
+    def _espera_reintento(self, intento, respuesta=None):
+        espera = settings.MERCADO_PUBLICO_ESPERA * 2 ** (intento - 1)
+        retry_after = respuesta.headers.get('Retry-After', '') if respuesta is not None else ''
+        if retry_after.isdigit():
+            espera = max(espera, int(retry_after))
+        # Un Retry-After enorme no debe dejar colgada la petición web ni un hilo del pool
+        return min(espera, settings.MERCADO_PUBLICO_ESPERA_MAXIMA)
+
+    def mensaje_error(self, error):
+        """
+        Mensaje para mostrar de un error de obtener(), sin el ticket (los errores de requests incluyen la URL consultada).
+        """
+        return _PATRON_TICKET.sub(r'\1***', f'Error: {error}')
+
+    def _cache(self):
+        return caches[ALIAS_CACHE] if ALIAS_CACHE in settings.CACHES else caches['default']
+
+    def _clave(self, codigo):
+        return f'mercado_publico:oc:{codigo.upper()}'
+
+    def _leer_fixture(self, codigo):
+        ruta = self.dir_fixtures / _nombre_fixture(codigo)
+        try:
+            return json.loads(ruta.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            raise ErrorMercadoPublico(f'No hay respuesta grabada para {codigo} en {self.dir_fixtures}.')
+
+    def _grabar_fixture(self, codigo, payload):
+        self.dir_fixtures.mkdir(parents=True, exist_ok=True)
+        ruta = self.dir_fixtures / _nombre_fixture(codigo)
+        ruta.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding='utf-8')
+
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+
+def cliente_mercado_publico():
+    """
+    Cliente compartido del proceso (una sola sesión y pool de conexiones).
+    """
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteMercadoPublico()
+        return _cliente
+
+
+@receiver(setting_changed)
+def _reiniciar_cliente(sender, setting, **kwargs):
+    # override_settings en pruebas: el próximo uso crea un cliente con la configuración nueva
+    global _cliente
+    if setting.startswith('MERCADO_PUBLICO'):
+        with _lock_cliente:
+            if _cliente is not None:
+                _cliente.cerrar()
+            _cliente = None
@@ -0,0 +1,222 @@
+"""
+Motor de alertas: evalúa las reglas para toda la flota (o un subconjunto de vehículos) con consultas agrupadas y abre, actualiza o resuelve alertas en bloque.
+
+Cada regla calcula las alertas que deberían estar vigentes, identificadas por (regla, vehiculo_id, referencia_id), y el motor las compara con las guardadas. Pensado para correr periódicamente (`manage.py evaluar_alertas`) y para las escrituras que cambian el estado de un vehículo; las vistas solo leen alertas.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache_reportes import invalidar_modelos
+
+# Días de anticipación con que un mantenimiento programado genera alerta
+DIAS_AVISO_PROGRAMADO = 7
+# Antigüedad máxima de una falla sin resolver para abrirle alerta
+DIAS_AVISO_FALLA = 30
+
+REGLAS_MOTOR = ('km', 'mantenimiento_programado', 'falla')
+
+
+def _vehiculos(vehiculo_ids):
+    from ..models import Vehiculo
+
+    qs = Vehiculo.objects.all()
+    if vehiculo_ids is not None:
+        qs = qs.filter(pk__in=vehiculo_ids)
+    return qs
+
+
+def _regla_km(vehiculo_ids, hoy):
+    """
+    Alerta preventiva sobre el primer umbral de km desde el último preventivo y crítica sobre el segundo; la crítica bloquea el vehículo.
+    """
+    from ..models import Vehiculo
+
+    filas = (
+        _vehiculos(vehiculo_ids)
+        .filter(km_ultimo_preventivo__isnull=False)
+        .annotate(
+            recorrido=F('kilometraje_actual') - F('km_ultimo_preventivo'),
+            umbral_preventivo=Vehiculo.expresion_umbral_km(),
+            umbral_critico=Vehiculo.expresion_umbral_km(critico=True),
+        )
+        .filter(recorrido__gte=F('umbral_preventivo'))
+        .values_list('pk', 'estado', 'recorrido', 'umbral_preventivo', 'umbral_critico')
+    )
+    deseadas = {}
+    bloquear = []
+    for pk, estado, recorrido, preventivo, critico in filas:
+        if recorrido >= critico:
+            deseadas[('km_critico', pk, None)] = (
+                f'ALERTA CRÍTICA: {recorrido} km desde última mantención '
+                f'(supera los {critico} km). Vehículo bloqueado para operación.',
+                critico,
+            )
+            if estado not in ('Fuera de servicio', 'Baja'):
+                bloquear.append(pk)
+        else:
+            deseadas[('km_preventivo', pk, None)] = (
+                f'Alerta por kilometraje: {recorrido} km desde última mantención '
+                f'(umbral {preventivo} km). Programar mantenimiento.',
+                preventivo,
+            )
+    return {
+        'reglas': ['km_preventivo', 'km_critico'],
+        'deseadas': deseadas,
+        'mantener': set(),
+        'reabrir': True,
+        'bloquear': bloquear,
+    }
+
+
+def _regla_mantenimiento_programado(vehiculo_ids, hoy):
+    """
+    Mantenimientos programados con fecha dentro de DIAS_AVISO_PROGRAMADO (o vencida); se resuelve cuando deja de estar programado.
+    """
+    from ..models import Mantenimiento
+
+    tipos = dict(Mantenimiento._meta.get_field('tipo_mantencion').choices)
+    qs = Mantenimiento.objects.filter(
+        estado='Programado',
+        fecha_programada__isnull=False,
+        fecha_programada__lte=hoy + timedelta(days=DIAS_AVISO_PROGRAMADO),
+    )
+    if vehiculo_ids is not None:
+        qs = qs.filter(vehiculo_id__in=vehiculo_ids)
+    deseadas = {
+        ('mantenimiento_programado', vid, pk): (
+            f'Mantenimiento programado {fecha} ({tipos.get(tipo, tipo)})',
+            km or 0,
+        )
+        for pk, vid, fecha, tipo, km in qs.values_list(
+            'pk', 'vehiculo_id', 'fecha_programada', 'tipo_mantencion', 'km_al_ingreso'
+        )
+    }
+    return {
+        'reglas': ['mantenimiento_programado'],
+        'deseadas': deseadas,
+        'mantener': set(),
+        'reabrir': False,
+        'bloquear': [],
+    }
+
+
+def _regla_falla(vehiculo_ids, hoy):
+    """
+    Fallas recientes de vehículos que superan su umbral de mantención; la alerta se resuelve cuando el mantenimiento asociado finaliza.
+    """
+    from ..models import FallaReportada
+
+    abiertas = FallaReportada.objects.exclude(mantenimiento__estado='Finalizado')
+    if vehiculo_ids is not None:
+        abiertas = abiertas.filter(vehiculo_id__in=vehiculo_ids)
+    filas = abiertas.values_list(
+        'pk', 'vehiculo_id', 'fecha_reporte', 'descripcion',
+        'vehiculo__kilometraje_actual', 'vehiculo__umbral_mantencion',
+    )
+    desde = hoy - timedelta(days=DIAS_AVISO_FALLA)
+    deseadas = {}
+    mantener = set()
+    for pk, vid, fecha, descripcion, km, umbral in filas:
+        clave = ('falla', vid, pk)
+        mantener.add(clave)
+        if fecha >= desde and umbral > 0 and km >= umbral:
+            deseadas[clave] = (f'Falla reportada: {descripcion}', km)
+    return {
+        'reglas': ['falla'],
+        'deseadas': deseadas,
+        'mantener': mantener,
+        'reabrir': False,
+        'bloquear': [],
+    }
+
+
+REGLAS = {
+    'km': _regla_km,
+    'mantenimiento_programado': _regla_mantenimiento_programado,
+    'falla': _regla_falla,
+}
+
+
+def _aplicar(resultado_regla, vehiculo_ids, ahora):
+    """
+    Compara las alertas deseadas de una regla con las guardadas: crea las que faltan, actualiza texto y umbral de las vigentes y resuelve las que sobran.
+    Las reglas de estado (reabrir) vuelven a abrir una alerta resuelta a mano si la condición sigue; las de evento abren una sola vez por registro.
+    """
+    from ..models import Alerta
+
+    deseadas = resultado_regla['deseadas']
+    existentes = Alerta.objects.filter(regla__in=resultado_regla['reglas'])
+    if vehiculo_ids is not None:
+        existentes = existentes.filter(vehiculo_id__in=vehiculo_ids)
+    if resultado_regla['reabrir']:
+        existentes = existentes.filter(vigente=True)
+
+    vigentes = {}
+    conocidas = set()
+    resolver = []
+    for alerta in existentes.only('id', 'regla', 'vehiculo_id', 'referencia_id', 'descripcion', 'valor_umbral', 'vigente'):
+        clave = (alerta.regla, alerta.vehiculo_id, alerta.referencia_id)
+        conocidas.add(clave)
+        if not alerta.vigente:
+            continue
+        if clave in vigentes or (clave not in deseadas and clave not in resultado_regla['mantener']):
+            resolver.append(alerta.id)
+        else:
+            vigentes[clave] = alerta
+
+    actualizar = []
+    for clave, alerta in vigentes.items():
+        if clave in deseadas and (alerta.descripcion, alerta.valor_umbral) != deseadas[clave]:
+            alerta.descripcion, alerta.valor_umbral = deseadas[clave]
+            actualizar.append(alerta)
+
+    crear = [
+        Alerta(
+            regla=regla, vehiculo_id=vid, referencia_id=referencia,
+            descripcion=descripcion, valor_umbral=valor_umbral,
+        )
+        for (regla, vid, referencia), (descripcion, valor_umbral) in deseadas.items()
+        if (regla, vid, referencia) not in conocidas
+    ]
+
+    if resolver:
+        Alerta.objects.filter(pk__in=resolver).update(vigente=False, resuelta_en=ahora)
+    if actualizar:
+        Alerta.objects.bulk_update(actualizar, ['descripcion', 'valor_umbral'])
+    if crear:
+        Alerta.objects.bulk_create(crear)
+    return len(crear), len(actualizar), len(resolver)
+
+
+def evaluar_alertas(vehiculo_ids=None, reglas=None, hoy=None):
+    """
+    Evalúa las reglas indicadas (todas por defecto) para los vehículos indicados (toda la flota por defecto).
+    Retorna {'abiertas', 'actualizadas', 'resueltas', 'bloqueados'}; bloqueados es el conjunto de vehículos que pasaron a Fuera de servicio.
+    """
+    from ..models import Vehiculo
+
+    hoy = hoy or timezone.localdate()
+    ahora = timezone.now()
+    if vehiculo_ids is not None:
+        vehiculo_ids = list(vehiculo_ids)
+    resultado = {'abiertas': 0, 'actualizadas': 0, 'resueltas': 0, 'bloqueados': set()}
+    with transaction.atomic():
+        for nombre in reglas or REGLAS_MOTOR:
+            resultado_regla = REGLAS[nombre](vehiculo_ids, hoy)
+            abiertas, actualizadas, resueltas = _aplicar(resultado_regla, vehiculo_ids, ahora)
+            resultado['abiertas'] += abiertas
+            resultado['actualizadas'] += actualizadas
+            resultado['resueltas'] += resueltas
+            if resultado_regla['bloquear']:
+                Vehiculo.objects.filter(pk__in=resultado_regla['bloquear']).update(estado='Fuera de servicio')
+                resultado['bloqueados'].update(resultado_regla['bloquear'])
+        # bulk_create y update() no disparan las señales que versionan el caché
+        if resultado['abiertas'] or resultado['actualizadas'] or resultado['resueltas']:
+            invalidar_modelos('Alerta')
+        if resultado['bloqueados']:
+            invalidar_modelos('Vehiculo')
+    return resultado
@@ -0,0 +1,392 @@
+"""
+Libro de movimientos presupuestarios (MovimientoPresupuestario).
+
+Cada escritura de una OC, mantenimiento, carga de combustible o arriendo compara lo que el registro aporta ahora a cada (cuenta, año) con lo que ya tiene anotado en el libro, agrega una fila por cada diferencia y la suma a Presupuesto.monto_ejecutado con un UPDATE atómico. Así un cambio de año o de cuenta descuenta del presupuesto anterior y carga al nuevo, sin recalcular todo.
+
+Para escrituras masivas (cargas, importaciones, acciones del admin), `with presupuesto_diferido():` anota qué registros se tocaron y sincroniza el libro una sola vez al salir, con un UPDATE por (cuenta, año).
+
+Los aportes siguen las mismas reglas que el recálculo completo (services/presupuesto.calcular_ejecutado_anio), que queda como referencia para `manage.py conciliar_presupuestos` y `manage.py recalcular_presupuestos`.
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from .arriendos import costo_por_anio
+from .cache_reportes import invalidar_modelos
+from .presupuesto import calcular_ejecutado_anio, reservar_presupuesto
+
+# Origen y tipo de movimiento por modelo fuente
+ORIGENES = {
+    'OrdenCompra': ('orden_compra', 'compromiso'),
+    'Mantenimiento': ('mantenimiento', 'ejecucion'),
+    'CargaCombustible': ('carga_combustible', 'ejecucion'),
+    'Arriendo': ('arriendo', 'ejecucion'),
+}
+# Orígenes cuyos aumentos deben caber en el saldo (OCs y cierres de mantenimiento); combustible y arriendos se registran siempre
+ORIGENES_CON_RESERVA = {'orden_compra', 'mantenimiento'}
+
+# Registros pendientes de sincronizar dentro de presupuesto_diferido, por hilo: {(modelo, pk)}
+_diferido = threading.local()
+
+
+def _aporte_orden_compra(oc):
+    """
+    Monto de la OC no anulada en su cuenta y año de emisión, salvo que un mantenimiento finalizado de la misma cuenta y año ya la contabilice con su costo real.
+    """
+    from ..models import Mantenimiento
+
+    if not oc.cuenta_presupuestaria_id or oc.estado == 'Anulada' or not oc.monto_total:
+        return {}
+    anio = oc.fecha_emision.year
+    contabilizada = Mantenimiento.objects.filter(
+        orden_compra_id=oc.pk,
+        estado='Finalizado',
+        cuenta_presupuestaria_id=oc.cuenta_presupuestaria_id,
+        fecha_ingreso__year=anio,
+    ).exists()
+    if contabilizada:
+        return {}
+    return {(oc.cuenta_presupuestaria_id, anio): oc.monto_total}
+
+
+def _aporte_mantenimiento(mantenimiento):
+    if (
+        mantenimiento.estado != 'Finalizado'
+        or not mantenimiento.cuenta_presupuestaria_id
+        or not mantenimiento.costo_total_real
+    ):
+        return {}
+    return {(mantenimiento.cuenta_presupuestaria_id, mantenimiento.fecha_ingreso.year): mantenimiento.costo_total_real}
+
+
+def _aporte_carga_combustible(carga):
+    if not carga.cuenta_presupuestaria_id or not carga.costo_total:
+        return {}
+    return {(carga.cuenta_presupuestaria_id, carga.fecha.year): carga.costo_total}
+
+
+def _anio_hasta_arriendos(cuenta_id):
+    """
+    Último año al que se cargan los arriendos sin fecha de fin: el actual o el del presupuesto más lejano de la cuenta.
+    """
+    from ..models import Presupuesto
+
+    ultimo = Presupuesto.objects.filter(cuenta_id=cuenta_id).aggregate(anio=Max('anio'))['anio']
+    return max(timezone.localdate().year, ultimo or 0)
+
+
+def _aporte_arriendo(arriendo):
+    """
+    Costo prorrateado del contrato por año, redondeado por año como en el recálculo completo.
+    """
+    cuenta_id = arriendo.cuenta_presupuestaria_id
+    if not cuenta_id:
+        return {}
+    anio_hasta = _anio_hasta_arriendos(cuenta_id) if arriendo.fecha_fin is None else 0
+    aportes = {}
+    for anio, costo in costo_por_anio(arriendo, anio_hasta).items():
+        monto = int(round(costo))
+        if monto:
+            aportes[(cuenta_id, anio)] = monto
+    return aportes
+
+
+APORTES = {
+    'orden_compra': _aporte_orden_compra,
+    'mantenimiento': _aporte_mantenimiento,
+    'carga_combustible': _aporte_carga_combustible,
+    'arriendo': _aporte_arriendo,
+}
+
+
+def saldos_libro(filtro=None):
+    """
+    {(cuenta_id, anio): suma del libro}, opcionalmente filtrado (dict de kwargs para filter()).
+    """
+    from ..models import MovimientoPresupuestario
+
+    qs = MovimientoPresupuestario.objects.filter(**(filtro or {}))
+    return {
+        (cuenta_id, anio): total
+        for cuenta_id, anio, total in qs.values('cuenta_id', 'anio')
+        .annotate(total=Sum('monto'))
+        .values_list('cuenta_id', 'anio', 'total')
+    }
+
+
+def aplicar_movimientos(movimientos, reservar=False):
+    """
+    Suma los movimientos a los presupuestos de cada (cuenta, año), un UPDATE por par en orden fijo para no bloquearse con otra escritura, y los inserta en el libro.
+    Con reservar, el aumento neto de los pares con movimientos de OCs o mantenimientos pasa por reservar_presupuesto y un saldo insuficiente aborta todo con PresupuestoInsuficiente.
+    """
+    from ..models import MovimientoPresupuestario, Presupuesto
+
+    if not movimientos:
+        return
+    por_par = defaultdict(int)
+    con_reserva = set()
+    for movimiento in movimientos:
+        par = (movimiento.cuenta_id, movimiento.anio)
+        por_par[par] += movimiento.monto
+        if reservar and movimiento.origen in ORIGENES_CON_RESERVA:
+            con_reserva.add(par)
+    with transaction.atomic():
+        actualizados = 0
+        for (cuenta_id, anio), delta in sorted(por_par.items()):
+            if delta > 0 and (cuenta_id, anio) in con_reserva:
+                actualizados += reservar_presupuesto(cuenta_id, anio, delta)
+            elif delta:
+                actualizados += Presupuesto.objects.filter(cuenta_id=cuenta_id, anio=anio).sumar_ejecutado(delta)
+        MovimientoPresupuestario.objects.bulk_create(movimientos)
+        # update() no dispara las señales que versionan el caché
+        if actualizados:
+            invalidar_modelos('Presupuesto')
+
+
+def _movimientos_diferencia(nombre_modelo, origen_id, nuevo, anotado):
+    """
+    Movimientos que llevan lo anotado en el libro para un registro ({(cuenta_id, anio): monto}) a su aporte actual.
+    """
+    from ..models import MovimientoPresupuestario
+
+    origen, tipo = ORIGENES[nombre_modelo]
+    movimientos = []
+    for cuenta_id, anio in sorted(set(nuevo) | set(anotado)):
+        delta = nuevo.get((cuenta_id, anio), 0) - anotado.get((cuenta_id, anio), 0)
+        if delta:
+            movimientos.append(MovimientoPresupuestario(
+                cuenta_id=cuenta_id, anio=anio, monto=delta,
+                tipo=tipo, origen=origen, origen_id=origen_id,
+            ))
+    return movimientos
+
+
+def sincronizar_movimientos(instancia, borrado=False, reservar=True):
+    """
+    Registra la diferencia entre el aporte actual del registro y lo anotado en el libro para su origen. Idempotente: si nada cambió no escribe.
+    Los aumentos de OCs y mantenimientos se reservan contra el saldo (ver aplicar_movimientos) salvo reservar=False, para reparaciones.
+    Dentro de presupuesto_diferido solo anota el registro y retorna {}; las reparaciones (reservar=False) se aplican igual de inmediato.
+    Retorna {(cuenta_id, anio): delta} de lo registrado.
+    """
+    nombre = type(instancia).__name__
+    pendientes = getattr(_diferido, 'pendientes', None)
+    if pendientes is not None and reservar:
+        pendientes.add((nombre, instancia.pk))
+        return {}
+    origen, _tipo = ORIGENES[nombre]
+    nuevo = {} if borrado else APORTES[origen](instancia)
+    anotado = saldos_libro({'origen': origen, 'origen_id': instancia.pk})
+    movimientos = _movimientos_diferencia(nombre, instancia.pk, nuevo, anotado)
+    aplicar_movimientos(movimientos, reservar=reservar and not borrado)
+    return {(movimiento.cuenta_id, movimiento.anio): movimiento.monto for movimiento in movimientos}
+
+
+def sincronizar_ordenes_compra(ids):
+    """
+    Resincroniza OCs cuyo aporte depende de un mantenimiento editado (la OC deja de contar cuando el mantenimiento finalizado la absorbe).
+    """
+    from ..models import OrdenCompra
+
+    ids = {pk for pk in ids if pk}
+    pendientes = getattr(_diferido, 'pendientes', None)
+    if pendientes is not None:
+        pendientes.update(('OrdenCompra', pk) for pk in ids)
+        return
+    for oc in OrdenCompra.objects.filter(pk__in=ids):
+        sincronizar_movimientos(oc)
+
+
+def sincronizar_arriendos_abiertos(cuenta_id):
+    """
+    Extiende los arriendos sin fecha de fin de la cuenta a un presupuesto de año posterior recién creado (o a un año nuevo).
+    """
+    from ..models import Arriendo
+
+    for arriendo in Arriendo.objects.filter(cuenta_presupuestaria_id=cuenta_id, fecha_fin__isnull=True):
+        sincronizar_movimientos(arriendo)
+
+
+def _sincronizar_pendientes(pendientes):
+    """
+    Sincroniza de una vez los registros anotados por presupuesto_diferido: los relee de la base (los que ya no existen se dan por borrados), lee lo anotado en el libro para todos en una consulta y aplica todos los movimientos juntos.
+    """
+    from ..models import Arriendo, CargaCombustible, Mantenimiento, MovimientoPresupuestario, OrdenCompra
+
+    modelos = {modelo.__name__: modelo for modelo in (OrdenCompra, Mantenimiento, CargaCombustible, Arriendo)}
+    ids_por_modelo = defaultdict(set)
+    for nombre, pk in pendientes:
+        ids_por_modelo[nombre].add(pk)
+
+    filtro = Q()
+    for nombre, ids in ids_por_modelo.items():
+        filtro |= Q(origen=ORIGENES[nombre][0], origen_id__in=ids)
+    anotado = defaultdict(dict)
+    filas = (
+        MovimientoPresupuestario.objects.filter(filtro)
+        .values('origen', 'origen_id', 'cuenta_id', 'anio')
+        .annotate(total=Sum('monto'))
+        .values_list('origen', 'origen_id', 'cuenta_id', 'anio', 'total')
+    )
+    for origen, origen_id, cuenta_id, anio, total in filas:
+        anotado[(origen, origen_id)][(cuenta_id, anio)] = total
+
+    movimientos = []
+    for nombre, ids in sorted(ids_por_modelo.items()):
+        origen = ORIGENES[nombre][0]
+        vigentes = modelos[nombre].objects.in_bulk(ids)
+        for pk in sorted(ids):
+            instancia = vigentes.get(pk)
+            nuevo = APORTES[origen](instancia) if instancia else {}
+            movimientos.extend(_movimientos_diferencia(nombre, pk, nuevo, anotado.get((origen, pk), {})))
+    aplicar_movimientos(movimientos, reservar=True)
+
+
+@contextmanager
+def presupuesto_diferido():
+    """
+    Difiere la sincronización del libro en escrituras masivas: cada registro tocado se anota una vez y al salir se aplican sus diferencias con un UPDATE por (cuenta, año) afectado.
+    Un saldo insuficiente se detecta al salir (PresupuestoInsuficiente) y no deja movimientos a medias; conviene envolver el bloque en transaction.atomic para que deshaga también los registros.
+    Los bloques anidados se sincronizan con el más externo. Solo se sincroniza si el bloque termina sin error: si lanza una excepción, esa es la que se propaga y lo anotado se descarta (fuera de una transacción, `conciliar_presupuestos --corregir` repara lo que haya quedado guardado).
+    """
+    if getattr(_diferido, 'pendientes', None) is not None:
+        yield
+        return
+    _diferido.pendientes = set()
+    try:
+        yield
+    finally:
+        pendientes = _diferido.pendientes
+        _diferido.pendientes = None
+    if pendientes and not transaction.get_connection().needs_rollback:
+        _sincronizar_pendientes(pendientes)
+
+
+def ejecutado_segun_libro(cuenta_id, anio):
+    return saldos_libro({'cuenta_id': cuenta_id, 'anio': anio}).get((cuenta_id, anio), 0)
+
+
+def conciliar(anio=None):
+    """
+    Compara, por presupuesto, monto_ejecutado con la suma del libro y con el recálculo completo (agrupado por año).
+    Retorna [(presupuesto, ejecutado, libro, recalculado)] solo de los que difieren en algo.
+    """
+    from ..models import Presupuesto
+
+    presupuestos = Presupuesto.objects.select_related('cuenta').order_by('anio', 'cuenta__codigo')
+    if anio is not None:
+        presupuestos = presupuestos.filter(anio=anio)
+    libro = saldos_libro({'anio': anio} if anio is not None else None)
+    recalculo = {}
+    diferencias = []
+    for presupuesto in presupuestos:
+        if presupuesto.anio not in recalculo:
+            recalculo[presupuesto.anio] = calcular_ejecutado_anio(presupuesto.anio)
+        en_libro = libro.get((presupuesto.cuenta_id, presupuesto.anio), 0)
+        recalculado = recalculo[presupuesto.anio].get(presupuesto.cuenta_id, 0)
+        if not (presupuesto.monto_ejecutado == en_libro == recalculado):
+            diferencias.append((presupuesto, presupuesto.monto_ejecutado, en_libro, recalculado))
+    return diferencias
+
+
+def recalcular_presupuestos_anio(anio, aplicar=True):
+    """
+    Lleva monto_ejecutado de todos los presupuestos del año al recálculo completo con un bulk_update, y asienta en el libro un ajuste por cada (cuenta, año) cuya suma difiera, para que los tres valores cuadren.
+    Retorna [(presupuesto, antes, despues)] de los que cambian; con aplicar=False no escribe nada.
+    """
+    from ..models import MovimientoPresupuestario, Presupuesto
+
+    recalculo = calcular_ejecutado_anio(anio)
+    cambios = []
+    for presupuesto in Presupuesto.objects.filter(anio=anio).select_related('cuenta').order_by('cuenta__codigo'):
+        nuevo = recalculo.get(presupuesto.cuenta_id, 0)
+        if presupuesto.monto_ejecutado != nuevo:
+            cambios.append((presupuesto, presupuesto.monto_ejecutado, nuevo))
+    if not aplicar:
+        return cambios
+
+    libro = saldos_libro({'anio': anio})
+    ajustes = [
+        MovimientoPresupuestario(
+            cuenta_id=cuenta_id, anio=anio, monto=recalculo.get(cuenta_id, 0) - libro.get((cuenta_id, anio), 0),
+            tipo=MovimientoPresupuestario.TIPO_AJUSTE, origen='conciliacion',
+        )
+        for cuenta_id in set(recalculo) | {cuenta_id for cuenta_id, _ in libro}
+        if recalculo.get(cuenta_id, 0) != libro.get((cuenta_id, anio), 0)
+    ]
+    for presupuesto, _antes, nuevo in cambios:
+        presupuesto.monto_ejecutado = nuevo
+        presupuesto.actualizar_estado_ejecucion()
+    with transaction.atomic():
+        MovimientoPresupuestario.objects.bulk_create(ajustes)
+        Presupuesto.objects.bulk_update([p for p, _, _ in cambios], Presupuesto.CAMPOS_EJECUCION)
+    if cambios:
+        invalidar_modelos('Presupuesto')
+    return cambios
+
+
+def _fuentes_par(cuenta_id, anio):
+    """
+    Registros que aportan hoy a (cuenta, año) o que tienen movimientos anotados en él; los que ya no existen se devuelven sin guardar, para descontarlos.
+    """
+    from ..models import Arriendo, CargaCombustible, Mantenimiento, MovimientoPresupuestario, OrdenCompra
+
+    modelos = {
+        'orden_compra': OrdenCompra,
+        'mantenimiento': Mantenimiento,
+        'carga_combustible': CargaCombustible,
+        'arriendo': Arriendo,
+    }
+    vigentes = {
+        'orden_compra': OrdenCompra.objects.filter(cuenta_presupuestaria_id=cuenta_id, fecha_emision__year=anio),
+        'mantenimiento': Mantenimiento.objects.filter(cuenta_presupuestaria_id=cuenta_id, fecha_ingreso__year=anio),
+        'carga_combustible': CargaCombustible.objects.filter(cuenta_presupuestaria_id=cuenta_id, fecha__year=anio),
+        'arriendo': Arriendo.objects.filter(cuenta_presupuestaria_id=cuenta_id, fecha_inicio__year__lte=anio).filter(
+            Q(fecha_fin__isnull=True) | Q(fecha_fin__year__gte=anio)
+        ),
+    }
+    anotados = defaultdict(set)
+    for origen, origen_id in (
+        MovimientoPresupuestario.objects.filter(cuenta_id=cuenta_id, anio=anio, origen__in=modelos)
+        .values_list('origen', 'origen_id')
+        .distinct()
+    ):
+        anotados[origen].add(origen_id)
+    for origen, modelo in modelos.items():
+        encontrados = set()
+        for instancia in vigentes[origen] | modelo.objects.filter(pk__in=anotados[origen]):
+            encontrados.add(instancia.pk)
+            yield instancia, False
+        for pk in anotados[origen] - encontrados:
+            yield modelo(pk=pk), True
+
+
+def corregir(diferencias):
+    """
+    Resincroniza cada registro que toca los presupuestos con diferencias (escrituras que no pasaron por señales, p.ej. un update() masivo), asienta un ajuste por lo que aún difiera del recálculo y deja monto_ejecutado igual al libro.
+    """
+    from ..models import MovimientoPresupuestario, Presupuesto
+
+    with transaction.atomic():
+        for presupuesto, _ejecutado, _en_libro, _recalculado in diferencias:
+            cuenta_id, anio = presupuesto.cuenta_id, presupuesto.anio
+            for instancia, borrado in _fuentes_par(cuenta_id, anio):
+                sincronizar_movimientos(instancia, borrado=borrado, reservar=False)
+            recalculado = calcular_ejecutado_anio(anio, [cuenta_id]).get(cuenta_id, 0)
+            residuo = recalculado - ejecutado_segun_libro(cuenta_id, anio)
+            if residuo:
+                aplicar_movimientos([
+                    MovimientoPresupuestario(
+                        cuenta_id=cuenta_id, anio=anio, monto=residuo,
+                        tipo=MovimientoPresupuestario.TIPO_AJUSTE, origen='conciliacion',
+                    )
+                ])
+            ejecutado = Presupuesto.objects.values_list('monto_ejecutado', flat=True).get(pk=presupuesto.pk)
+            desfase = ejecutado_segun_libro(cuenta_id, anio) - ejecutado
+            if desfase:
+                Presupuesto.objects.filter(pk=presupuesto.pk).sumar_ejecutado(desfase)
+        invalidar_modelos('Presupuesto')
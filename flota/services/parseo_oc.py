@@ -0,0 +1,108 @@
+"""
+Parseo de respuestas de la API de órdenes de compra de Mercado Público: función pura, sin red ni base de datos.
+
+Los patrones están precompilados y los formatos de patente se buscan en una sola pasada sobre el texto (descripción + ítems) con una expresión combinada, en vez de una pasada por formato. `manage.py benchmark_parseo_oc` mide el parseo sobre las respuestas grabadas (MERCADO_PUBLICO_FIXTURES_DIR).
+"""
+
+import re
+
+# Código presupuestario 22.06.002.002; si no aparece, el formato corto 22-06-002
+_PATRON_CUENTA = re.compile(r'\d{2}\.\d{2}\.\d{3}\.\d{3}')
+_PATRON_CUENTA_CORTO = re.compile(r'\d{2}-\d{2}-\d{3}')
+
+# Formatos de patente XX.XX-NN, XX-XX-NN, XX.XXNN, XXXXNN y XXNNNN en una sola pasada; ninguno puede empezar dentro de otro
+_PATRON_PATENTES = re.compile(
+    r'\b(?:[A-Z]{2}\.[A-Z]{2}-\d{2}|[A-Z]{2}-[A-Z]{2}-\d{2}|[A-Z]{2}\.[A-Z]{2}\d{2}|[A-Z]{4}\d{2}|[A-Z]{2}\d{4})\b'
+)
+# Lo que siga a "PATENTE VEHÍCULO", tal cual; solo se busca si la frase aparece
+_FRASE_PATENTE = 'PATENTE VEHÍCULO'
+_PATRON_FRASE_PATENTE = re.compile(_FRASE_PATENTE + r'\s+([A-Z0-9.\-]+)')
+# Si ningún formato calza, cualquier cosa que parezca patente chilena
+_PATRON_PATENTE_GENERAL = re.compile(r'\b([A-Z]{2}[.\-]?[A-Z]{2}[.\-]?\d{2,3})\b')
+_PATRON_COMPACTA = re.compile(r'[A-Z]{4}\d{2}')
+
+_TIPOS_ADQUISICION = (
+    (('CONVENIO',), 'Convenio Marco'),
+    (('LICITACIÓN', 'LICITACION'), 'Licitación Pública'),
+    (('TRATO DIRECTO',), 'Trato Directo'),
+    (('COMPRA ÁGIL', 'COMPRA AGIL'), 'Compra Ágil'),
+)
+
+
+def _items(oc_data):
+    items = oc_data.get('Items', {})
+    if 'Listado' not in items:
+        return ''
+    lista = items['Listado']
+    if isinstance(lista, dict):
+        lista = [lista]
+    return '\n'.join(f"{item.get('Producto', '')} - {item.get('EspecificacionComprador', '')}" for item in lista)
+
+
+def _tipo_adquisicion(oc_data):
+    if 'TipoAdquisicion' not in oc_data:
+        return 'Convenio Marco'
+    original = oc_data['TipoAdquisicion']
+    mayusculas = original.upper()
+    for claves, tipo in _TIPOS_ADQUISICION:
+        if any(clave in mayusculas for clave in claves):
+            return tipo
+    return original
+
+
+def extraer_codigo_presupuestario(texto):
+    """
+    Primer código de cuenta del texto en mayúsculas, o None.
+    """
+    encontrado = _PATRON_CUENTA.search(texto)
+    if encontrado:
+        return encontrado.group()
+    encontrado = _PATRON_CUENTA_CORTO.search(texto)
+    return encontrado.group().replace('-', '.') if encontrado else None
+
+
+def extraer_patentes(texto):
+    """
+    Patentes posibles del texto en mayúsculas, sin repetir y en el orden en que aparecen; las compactas (HRPG25) se devuelven como HR.PG-25.
+    """
+    encontradas = _PATRON_PATENTES.findall(texto)
+    if _FRASE_PATENTE in texto:
+        encontradas += _PATRON_FRASE_PATENTE.findall(texto)
+    if not encontradas:
+        encontradas = _PATRON_PATENTE_GENERAL.findall(texto)
+    return list(dict.fromkeys(
+        f'{patente[:2]}.{patente[2:4]}-{patente[4:]}' if _PATRON_COMPACTA.fullmatch(patente) else patente
+        for patente in encontradas
+    ))
+
+
+def parsear_oc(payload, codigo_oc=''):
+    """
+    Datos limpios de una respuesta de la API (o {'error': ...} si no trae la OC). codigo_oc solo se usa si la respuesta no trae el código.
+    """
+    if payload.get('Cantidad', 0) == 0:
+        return {'error': f'No se encontró la orden de compra {codigo_oc}.'}
+    if not payload.get('Listado'):
+        return {'error': 'La API no devolvió datos en el formato esperado.'}
+
+    oc_data = payload['Listado'][0]
+    items_str = _items(oc_data)
+    proveedor = oc_data.get('Proveedor', {})
+    descripcion = oc_data.get('Descripcion', oc_data.get('Nombre', f'Orden de compra {codigo_oc}'))[:500]
+    texto = f'{descripcion} {items_str}'.upper()
+    return {
+        'codigo': oc_data.get('Codigo', codigo_oc),
+        'estado_original': oc_data.get('Estado', 'Emitida'),
+        'fecha_emision': oc_data.get('Fechas', {}).get('FechaCreacion', '').split('T')[0],
+        'descripcion': descripcion,
+        'monto_neto': oc_data.get('TotalNeto', 0),
+        'monto_total': oc_data.get('Total', 0),
+        'impuestos': oc_data.get('Impuestos', 0),
+        'proveedor_rut': proveedor.get('RutSucursal', ''),
+        'proveedor_nombre': proveedor.get('Nombre', 'Proveedor Desconocido'),
+        'id_licitacion': oc_data.get('CodigoLicitacion', ''),
+        'items_str': items_str,
+        'tipo_adquisicion': _tipo_adquisicion(oc_data),
+        'codigo_presupuestario': extraer_codigo_presupuestario(texto),
+        'patentes_posibles': extraer_patentes(texto),
+    }
@@ -1,9 +1,41 @@
 """
-Validación y consulta de presupuesto (fuente única para forms, API, señales y vistas).
+Validación, consulta y reserva de presupuesto (fuente única para forms, API, señales y vistas).
+
+validar_presupuesto_disponible solo informa (formularios, API); el consumo real pasa por reservar_presupuesto, que verifica y descuenta el saldo en un único UPDATE condicional para que dos escrituras simultáneas no puedan sobregirar la misma cuenta.
 """
 
+import time
+from collections import defaultdict
+from datetime import date
 from decimal import Decimal
 
+from django.db import OperationalError, transaction
+from django.db.models import Exists, F, OuterRef, Sum
+
+from .cache_reportes import firma_modelos, obtener_versionado
+
+# Modelos de los que depende la foto de presupuestos de un año (ETag y caché)
+MODELOS_ESTADO_PRESUPUESTOS = ['Presupuesto', 'CuentaPresupuestaria']
+CAMPOS_ESTADO_PRESUPUESTOS = ['asignado', 'ejecutado', 'disponible', 'activo']
+
+# Reintentos ante bloqueo mutuo o fallo de serialización al reservar (solo fuera de una transacción, ver reservar_presupuesto)
+INTENTOS_RESERVA = 3
+ESPERA_REINTENTO = 0.05
+
+
+class PresupuestoInsuficiente(ValueError):
+    """
+    La reserva no cabe en el saldo del presupuesto activo de la cuenta y año.
+    """
+
+    def __init__(self, presupuesto, monto):
+        self.presupuesto = presupuesto
+        self.monto = monto
+        super().__init__(
+            f"Presupuesto insuficiente. Disponible: ${presupuesto.disponible:.0f}, "
+            f"Requerido: ${monto:.0f}"
+        )
+
 
 def obtener_presupuesto_activo(cuenta, anio):
     from ..models import Presupuesto
@@ -44,5 +76,103 @@ def validar_presupuesto_disponible(cuenta, anio, monto_requerido=0):
     return True, None, presupuesto
 
 
+def reservar_presupuesto(cuenta_id, anio, monto):
+    """
+    Suma monto a la ejecución del presupuesto de (cuenta, año) solo si cabe en el saldo, en un UPDATE condicional: la fila queda bloqueada hasta el fin de la transacción y una reserva concurrente reevalúa la condición con el saldo ya descontado.
+    El saldo se controla también en presupuestos inactivos (uno agotado se desactiva solo); sin presupuesto para el par no hay nada que controlar.
+    Lanza PresupuestoInsuficiente si no cabe. Retorna la cantidad de presupuestos actualizados (0 o 1).
+    Un bloqueo mutuo o fallo de serialización (OperationalError) se reintenta solo si se llama fuera de una transacción: dentro de una, la transacción externa conserva sus bloqueos y el reintento volvería a chocar, así que el error se propaga para que quien abrió la transacción la repita completa. Es el caso de las señales de OrdenCompra y Mantenimiento, que reservan dentro del atomic de su save().
+    Es el paso de bajo nivel de services/movimientos_presupuesto.aplicar_movimientos: llamada directamente, la reserva no queda en el libro y conciliar_presupuestos la reporta.
+    """
+    from ..models import Presupuesto
+
+    presupuestos = Presupuesto.objects.filter(cuenta_id=cuenta_id, anio=anio)
+    intentos = 1 if transaction.get_connection().in_atomic_block else INTENTOS_RESERVA
+    for intento in range(1, intentos + 1):
+        try:
+            with transaction.atomic():
+                reservados = (
+                    presupuestos.alias(saldo=F('monto_asignado') - F('monto_ejecutado'))
+                    .filter(saldo__gte=monto)
+                    .sumar_ejecutado(monto)
+                )
+                if not reservados:
+                    presupuesto = presupuestos.first()
+                    if presupuesto is not None:
+                        raise PresupuestoInsuficiente(presupuesto, monto)
+                return reservados
+        except OperationalError:
+            if intento == intentos:
+                raise
+            time.sleep(ESPERA_REINTENTO * intento)
+
+
+def calcular_ejecutado_anio(anio, cuenta_ids=None):
+    """
+    Recálculo completo de la ejecución de un año por cuenta, en consultas agrupadas: mantenimientos finalizados, combustible, arriendos prorrateados (redondeados por contrato, como en el libro) y OCs no anuladas que ningún mantenimiento finalizado de la misma cuenta y año ya contabiliza.
+    Retorna {cuenta_id: monto}; las cuentas sin gasto no aparecen.
+    """
+    from ..models import CargaCombustible, Mantenimiento, OrdenCompra
+    from .arriendos import prorratear_arriendos
+
+    totales = defaultdict(int)
+
+    def sumar(qs, campo_cuenta, campo_monto):
+        if cuenta_ids is not None:
+            qs = qs.filter(**{f'{campo_cuenta}__in': cuenta_ids})
+        filas = qs.filter(**{f'{campo_cuenta}__isnull': False}).values(campo_cuenta).annotate(total=Sum(campo_monto))
+        for fila in filas:
+            totales[fila[campo_cuenta]] += fila['total'] or 0
+
+    finalizados = Mantenimiento.objects.filter(estado='Finalizado', fecha_ingreso__year=anio)
+    sumar(finalizados, 'cuenta_presupuestaria_id', 'costo_total_real')
+    sumar(CargaCombustible.objects.filter(fecha__year=anio), 'cuenta_presupuestaria_id', 'costo_total')
+    sumar(
+        OrdenCompra.objects.filter(fecha_emision__year=anio)
+        .exclude(estado='Anulada')
+        .exclude(Exists(finalizados.filter(
+            orden_compra_id=OuterRef('pk'),
+            cuenta_presupuestaria_id=OuterRef('cuenta_presupuestaria_id'),
+        ))),
+        'cuenta_presupuestaria_id', 'monto_total',
+    )
+    arriendos = prorratear_arriendos(date(anio, 1, 1), date(anio, 12, 31), cuenta_ids=cuenta_ids)
+    for (cuenta_id, _arriendo_id), costo in arriendos['por_cuenta_arriendo'].items():
+        totales[cuenta_id] += int(round(costo))
+    return dict(totales)
+
+
+def estado_presupuestos_anio(anio):
+    """
+    Foto compacta de los presupuestos de un año para validar montos en el navegador: {'anio', 'campos', 'cuentas': {cuenta_id: [asignado, ejecutado, disponible, activo]}}.
+    """
+    from ..models import Presupuesto
+
+    filas = Presupuesto.objects.filter(anio=anio).values_list(
+        'cuenta_id', 'monto_asignado', 'monto_ejecutado', 'activo'
+    )
+    return {
+        'anio': anio,
+        'campos': CAMPOS_ESTADO_PRESUPUESTOS,
+        'cuentas': {
+            str(cuenta_id): [asignado, ejecutado, asignado - ejecutado, activo]
+            for cuenta_id, asignado, ejecutado, activo in filas
+        },
+    }
+
+
+def version_estado_presupuestos(anio):
+    return f'{anio}:{firma_modelos(MODELOS_ESTADO_PRESUPUESTOS)}'
+
+
+def estado_presupuestos_cacheado(anio):
+    """
+    estado_presupuestos_anio() desde el caché; cualquier escritura en presupuestos (incluidos los UPDATE del libro de movimientos) lo invalida.
+    """
+    return obtener_versionado(
+        f'estado_presupuestos_{anio}', MODELOS_ESTADO_PRESUPUESTOS, lambda: estado_presupuestos_anio(anio)
+    )
+
+
 def mensaje_presupuesto_disponible(presupuesto):
     return f"Presupuesto disponible: ${presupuesto.disponible:.0f}"
@@ -0,0 +1,438 @@
+"""
+Tabla de hechos mensual por vehículo (ResumenMensualVehiculo): cálculo agrupado, actualización incremental desde señales y lectura para reportes.
+
+Reglas (las mismas de los reportes): costos de mantenimiento por mes de fecha_ingreso, combustible por fecha de carga, arriendos prorrateados por días de intersección con el mes, km desde LecturaOdometro (última lectura del mes menos la última anterior) e indisponibilidad desde services.disponibilidad.
+"""
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .arriendos import prorratear_arriendos
+from .disponibilidad import ESTADOS_EN_TALLER, calcular_indisponibilidad
+
+CAMPOS_RESUMEN = [
+    'km_recorridos',
+    'litros',
+    'costo_combustible',
+    'costo_preventivo',
+    'costo_correctivo',
+    'costo_arriendo',
+    'dias_fuera_preventivo',
+    'dias_fuera_correctivo',
+    'dias_fuera_servicio',
+    'hojas_ruta',
+    'viajes',
+]
+
+
+def usar_resumen_mensual(usar_resumen=None):
+    """
+    Resuelve la opción de lectura: el argumento explícito manda; si es None se usa settings.USAR_RESUMEN_MENSUAL.
+    """
+    if usar_resumen is None:
+        return getattr(settings, 'USAR_RESUMEN_MENSUAL', False)
+    return bool(usar_resumen)
+
+
+def es_periodo_mensual(fecha_desde, fecha_hasta):
+    """
+    True si el período empieza el día 1 de un mes y termina el último día de un mes (se puede responder desde el resumen).
+    """
+    if not fecha_desde or not fecha_hasta or fecha_desde > fecha_hasta:
+        return False
+    return fecha_desde.day == 1 and fecha_hasta.day == monthrange(fecha_hasta.year, fecha_hasta.month)[1]
+
+
+def meses_entre(fecha_desde, fecha_hasta):
+    """
+    Lista de (anio, mes) que tocan el período inclusivo.
+    """
+    meses = []
+    anio, mes = fecha_desde.year, fecha_desde.month
+    while (anio, mes) <= (fecha_hasta.year, fecha_hasta.month):
+        meses.append((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return meses
+
+
+def _limites_mes(anio, mes):
+    return date(anio, mes, 1), date(anio, mes, monthrange(anio, mes)[1])
+
+
+def _fila_vacia():
+    fila = {campo: 0 for campo in CAMPOS_RESUMEN}
+    fila['litros'] = Decimal('0')
+    return fila
+
+
+def _fila_tiene_datos(fila):
+    return any(fila[campo] for campo in CAMPOS_RESUMEN)
+
+
+def calcular_resumenes(vehiculo_ids, fecha_desde, fecha_hasta, hoy=None):
+    """
+    Calcula desde las tablas de origen los hechos de cada (vehiculo_id, anio, mes) del período con un número fijo de consultas agrupadas.
+    Solo retorna meses con actividad: {(vehiculo_id, anio, mes): {campo: valor}}.
+    """
+    from ..models import CargaCombustible, HojaRuta, Mantenimiento, Viaje
+
+    vehiculo_ids = list(vehiculo_ids)
+    if not vehiculo_ids:
+        return {}
+    fecha_desde = _limites_mes(fecha_desde.year, fecha_desde.month)[0]
+    fecha_hasta = _limites_mes(fecha_hasta.year, fecha_hasta.month)[1]
+    filas = defaultdict(_fila_vacia)
+
+    # 1. Gasto de mantenimiento por tipo
+    mant_rows = (
+        Mantenimiento.objects.filter(
+            vehiculo_id__in=vehiculo_ids,
+            fecha_ingreso__gte=fecha_desde,
+            fecha_ingreso__lte=fecha_hasta,
+        )
+        .annotate(anio=ExtractYear('fecha_ingreso'), mes=ExtractMonth('fecha_ingreso'))
+        .values('vehiculo_id', 'anio', 'mes')
+        .annotate(
+            preventivo=Sum('costo_total_real', filter=Q(tipo_mantencion='Preventivo')),
+            correctivo=Sum('costo_total_real', filter=Q(tipo_mantencion='Correctivo')),
+        )
+        .order_by()
+    )
+    for row in mant_rows:
+        fila = filas[(row['vehiculo_id'], row['anio'], row['mes'])]
+        fila['costo_preventivo'] = row['preventivo'] or 0
+        fila['costo_correctivo'] = row['correctivo'] or 0
+
+    # 2. Combustible
+    comb_rows = (
+        CargaCombustible.objects.filter(
+            patente_vehiculo_id__in=vehiculo_ids,
+            fecha__gte=fecha_desde,
+            fecha__lte=fecha_hasta,
+        )
+        .annotate(anio=ExtractYear('fecha'), mes=ExtractMonth('fecha'))
+        .values('patente_vehiculo_id', 'anio', 'mes')
+        .annotate(litros_total=Sum('litros'), costo=Sum('costo_total'))
+        .order_by()
+    )
+    for row in comb_rows:
+        fila = filas[(row['patente_vehiculo_id'], row['anio'], row['mes'])]
+        fila['litros'] = row['litros_total'] or Decimal('0')
+        fila['costo_combustible'] = row['costo'] or 0
+
+    # 3. Hojas de ruta (cantidad) y km desde las lecturas de odómetro
+    hoja_rows = (
+        HojaRuta.objects.filter(
+            vehiculo_id__in=vehiculo_ids,
+            fecha__gte=fecha_desde,
+            fecha__lte=fecha_hasta,
+        )
+        .annotate(anio=ExtractYear('fecha'), mes=ExtractMonth('fecha'))
+        .values('vehiculo_id', 'anio', 'mes')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for row in hoja_rows:
+        filas[(row['vehiculo_id'], row['anio'], row['mes'])]['hojas_ruta'] = row['n']
+
+    for clave, km in km_mensual_lecturas(vehiculo_ids, fecha_desde, fecha_hasta).items():
+        filas[clave]['km_recorridos'] = km
+
+    # 4. Viajes (por fecha de la hoja de ruta)
+    viaje_rows = (
+        Viaje.objects.filter(
+            hoja_ruta__vehiculo_id__in=vehiculo_ids,
+            hoja_ruta__fecha__gte=fecha_desde,
+            hoja_ruta__fecha__lte=fecha_hasta,
+        )
+        .annotate(anio=ExtractYear('hoja_ruta__fecha'), mes=ExtractMonth('hoja_ruta__fecha'))
+        .values('hoja_ruta__vehiculo_id', 'anio', 'mes')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for row in viaje_rows:
+        filas[(row['hoja_ruta__vehiculo_id'], row['anio'], row['mes'])]['viajes'] = row['n']
+
+    # 5. Arriendos del vehículo reemplazado, prorrateados por mes
+    arriendos = prorratear_arriendos(fecha_desde, fecha_hasta, vehiculo_ids=vehiculo_ids)
+    for clave, costo in arriendos['por_vehiculo_mes'].items():
+        filas[clave]['costo_arriendo'] = int(round(costo))
+
+    # 6. Indisponibilidad
+    indisponibilidad = calcular_indisponibilidad(vehiculo_ids, fecha_desde, fecha_hasta, hoy=hoy)
+    for vid, meses in indisponibilidad['por_vehiculo_mes'].items():
+        for (anio, mes), dias in meses.items():
+            fila = filas[(vid, anio, mes)]
+            fila['dias_fuera_preventivo'] = dias['preventivo']
+            fila['dias_fuera_correctivo'] = dias['correctivo']
+            fila['dias_fuera_servicio'] = dias['total']
+
+    return {clave: fila for clave, fila in filas.items() if _fila_tiene_datos(fila)}
+
+
+def km_mensual_lecturas(vehiculo_ids, fecha_desde, fecha_hasta):
+    """
+    {(vehiculo_id, anio, mes): km} con la misma regla que indicadores.km_recorridos_desde_lecturas aplicada mes a mes, así la suma de los meses coincide con el período completo.
+    """
+    from ..models import LecturaOdometro, Vehiculo
+
+    anteriores = dict(
+        Vehiculo.objects.filter(pk__in=vehiculo_ids).annotate(
+            km_anterior=Subquery(
+                LecturaOdometro.objects.filter(vehiculo=OuterRef('pk'), fecha__lt=fecha_desde)
+                .order_by('-fecha', '-km').values('km')[:1]
+            )
+        ).values_list('pk', 'km_anterior')
+    )
+    lecturas = LecturaOdometro.objects.filter(
+        vehiculo_id__in=vehiculo_ids,
+        fecha__gte=fecha_desde,
+        fecha__lte=fecha_hasta,
+    ).order_by('vehiculo_id', 'fecha', 'km').values_list('vehiculo_id', 'fecha', 'km')
+
+    primera, ultima = {}, {}
+    for vid, fecha, km in lecturas:
+        clave = (vid, fecha.year, fecha.month)
+        primera.setdefault(clave, km)
+        ultima[clave] = km
+
+    out = {}
+    base = {}
+    for clave in sorted(ultima):
+        vid = clave[0]
+        if vid not in base:
+            base[vid] = anteriores.get(vid)
+        inicio = base[vid] if base[vid] is not None else primera[clave]
+        out[clave] = max(0, ultima[clave] - inicio)
+        base[vid] = ultima[clave]
+    return out
+
+
+def actualizar_resumenes(claves):
+    """
+    Recalcula y guarda las filas (vehiculo_id, anio, mes) indicadas; borra las que quedaron sin actividad.
+    """
+    from ..models import ResumenMensualVehiculo
+
+    claves = {c for c in claves if c[0]}
+    if not claves:
+        return
+    vehiculo_ids = {vid for vid, _, _ in claves}
+    meses = sorted((anio, mes) for _, anio, mes in claves)
+    fecha_desde = _limites_mes(*meses[0])[0]
+    fecha_hasta = _limites_mes(*meses[-1])[1]
+    calculados = calcular_resumenes(vehiculo_ids, fecha_desde, fecha_hasta)
+
+    # Upsert en una sola sentencia: dos procesos que recalculan el mismo mes nuevo no chocan con la restricción única
+    # (select_for_update no puede bloquear una fila que todavía no existe)
+    ahora = timezone.now()
+    guardar, borrar = [], Q()
+    for clave in sorted(claves):
+        valores = calculados.get(clave)
+        vid, anio, mes = clave
+        if valores is None:
+            borrar |= Q(vehiculo_id=vid, anio=anio, mes=mes)
+        else:
+            guardar.append(ResumenMensualVehiculo(vehiculo_id=vid, anio=anio, mes=mes, actualizado_en=ahora, **valores))
+    with transaction.atomic():
+        if borrar:
+            ResumenMensualVehiculo.objects.filter(borrar).delete()
+        if guardar:
+            ResumenMensualVehiculo.objects.bulk_create(
+                guardar,
+                update_conflicts=True,
+                unique_fields=['vehiculo', 'anio', 'mes'],
+                update_fields=CAMPOS_RESUMEN + ['actualizado_en'],
+            )
+
+
+def refrescar_abiertos(hoy=None):
+    """
+    Recalcula los meses de mantenimientos en taller sin fecha de salida y arriendos sin fecha de fin: sus días fuera y costo siguen creciendo aunque nadie los edite. Pensado para correr a diario (`manage.py resumen_mensual --abiertos`).
+    """
+    from ..models import Arriendo, Mantenimiento
+
+    hoy = hoy or timezone.localdate()
+    claves = set()
+    for mantenimiento in Mantenimiento.objects.filter(fecha_salida__isnull=True, estado__in=ESTADOS_EN_TALLER).only(
+        'id', 'vehiculo_id', 'fecha_ingreso', 'fecha_salida'
+    ):
+        claves |= claves_resumen(mantenimiento, hoy)
+    for arriendo in Arriendo.objects.filter(fecha_fin__isnull=True).only(
+        'id', 'vehiculo_reemplazado_id', 'fecha_inicio', 'fecha_fin'
+    ):
+        claves |= claves_resumen(arriendo, hoy)
+    actualizar_resumenes(claves)
+    return len(claves)
+
+
+def _rango_datos_origen():
+    """
+    Primer y último día con datos de origen (o None si no hay datos).
+    """
+    from ..models import Arriendo, CargaCombustible, HojaRuta, Mantenimiento
+
+    fechas = []
+    for qs, campo in (
+        (Mantenimiento.objects.all(), 'fecha_ingreso'),
+        (CargaCombustible.objects.all(), 'fecha'),
+        (HojaRuta.objects.all(), 'fecha'),
+        (Arriendo.objects.all(), 'fecha_inicio'),
+    ):
+        minimo = qs.aggregate(m=Min(campo))['m']
+        if minimo:
+            fechas.append(minimo)
+    if not fechas:
+        return None
+    return min(fechas), timezone.localdate()
+
+
+def reconstruir_resumenes(fecha_desde=None, fecha_hasta=None):
+    """
+    Borra y vuelve a generar el resumen del período (por defecto, toda la historia). Retorna la cantidad de filas creadas.
+    """
+    from ..models import ResumenMensualVehiculo, Vehiculo
+
+    if fecha_desde is None or fecha_hasta is None:
+        rango = _rango_datos_origen()
+        if rango is None:
+            ResumenMensualVehiculo.objects.all().delete()
+            return 0
+        fecha_desde = fecha_desde or rango[0]
+        fecha_hasta = fecha_hasta or rango[1]
+
+    vehiculo_ids = list(Vehiculo.objects.values_list('id', flat=True))
+    calculados = calcular_resumenes(vehiculo_ids, fecha_desde, fecha_hasta)
+    with transaction.atomic():
+        _filtro_meses(ResumenMensualVehiculo.objects.all(), fecha_desde, fecha_hasta).delete()
+        ResumenMensualVehiculo.objects.bulk_create(
+            [
+                ResumenMensualVehiculo(vehiculo_id=vid, anio=anio, mes=mes, **valores)
+                for (vid, anio, mes), valores in sorted(calculados.items())
+            ],
+            batch_size=500,
+        )
+    return len(calculados)
+
+
+def verificar_resumenes(fecha_desde=None, fecha_hasta=None):
+    """
+    Compara el resumen guardado con un recálculo completo. Retorna [(clave, campo, guardado, calculado)].
+    """
+    from ..models import ResumenMensualVehiculo, Vehiculo
+
+    if fecha_desde is None or fecha_hasta is None:
+        rango = _rango_datos_origen()
+        if rango is None:
+            return []
+        fecha_desde = fecha_desde or rango[0]
+        fecha_hasta = fecha_hasta or rango[1]
+
+    vehiculo_ids = list(Vehiculo.objects.values_list('id', flat=True))
+    calculados = calcular_resumenes(vehiculo_ids, fecha_desde, fecha_hasta)
+    guardados = {
+        (row['vehiculo_id'], row['anio'], row['mes']): row
+        for row in _filtro_meses(ResumenMensualVehiculo.objects.all(), fecha_desde, fecha_hasta).values(
+            'vehiculo_id', 'anio', 'mes', *CAMPOS_RESUMEN
+        )
+    }
+    diferencias = []
+    for clave in sorted(set(calculados) | set(guardados)):
+        esperado = calculados.get(clave, _fila_vacia())
+        actual = guardados.get(clave, _fila_vacia())
+        for campo in CAMPOS_RESUMEN:
+            if Decimal(actual[campo]) != Decimal(esperado[campo]):
+                diferencias.append((clave, campo, actual[campo], esperado[campo]))
+    return diferencias
+
+
+def _filtro_meses(qs, fecha_desde, fecha_hasta):
+    a0, m0 = fecha_desde.year, fecha_desde.month
+    a1, m1 = fecha_hasta.year, fecha_hasta.month
+    return qs.filter(
+        Q(anio__gt=a0) | Q(anio=a0, mes__gte=m0)
+    ).filter(
+        Q(anio__lt=a1) | Q(anio=a1, mes__lte=m1)
+    )
+
+
+def leer_resumenes(vehiculo_ids, fecha_desde, fecha_hasta):
+    """
+    Suma las filas guardadas de los meses del período por vehículo: {vehiculo_id: {campo: total}}. Vehículos sin filas quedan en cero.
+    """
+    from ..models import ResumenMensualVehiculo
+
+    vehiculo_ids = list(vehiculo_ids)
+    out = {vid: _fila_vacia() for vid in vehiculo_ids}
+    if not vehiculo_ids:
+        return out
+    rows = (
+        _filtro_meses(
+            ResumenMensualVehiculo.objects.filter(vehiculo_id__in=vehiculo_ids),
+            fecha_desde,
+            fecha_hasta,
+        )
+        .values('vehiculo_id')
+        .annotate(**{campo: Sum(campo) for campo in CAMPOS_RESUMEN})
+        .order_by()
+    )
+    for row in rows:
+        out[row['vehiculo_id']] = {campo: row[campo] or 0 for campo in CAMPOS_RESUMEN}
+    return out
+
+
+def claves_resumen(instance, hoy=None):
+    """
+    Filas del resumen que dependen de un registro de origen: {(vehiculo_id, anio, mes)}.
+    """
+    from ..models import Arriendo, CargaCombustible, HojaRuta, Mantenimiento, Viaje
+
+    hoy = hoy or timezone.localdate()
+    if isinstance(instance, Mantenimiento):
+        if not instance.vehiculo_id or not instance.fecha_ingreso:
+            return set()
+        fin = instance.fecha_salida or max(instance.fecha_ingreso, hoy)
+        return {(instance.vehiculo_id, a, m) for a, m in meses_entre(instance.fecha_ingreso, fin)}
+    if isinstance(instance, CargaCombustible):
+        if not instance.fecha:
+            return set()
+        return _claves_odometro(instance.patente_vehiculo_id, instance.fecha)
+    if isinstance(instance, HojaRuta):
+        if not instance.fecha:
+            return set()
+        return _claves_odometro(instance.vehiculo_id, instance.fecha)
+    if isinstance(instance, Viaje):
+        hoja = HojaRuta.objects.filter(pk=instance.hoja_ruta_id).values_list('vehiculo_id', 'fecha').first()
+        if not hoja:
+            return set()
+        return _claves_odometro(*hoja)
+    if isinstance(instance, Arriendo):
+        if not instance.vehiculo_reemplazado_id or not instance.fecha_inicio:
+            return set()
+        fin = instance.fecha_fin or max(instance.fecha_inicio, hoy)
+        return {(instance.vehiculo_reemplazado_id, a, m) for a, m in meses_entre(instance.fecha_inicio, fin)}
+    return set()
+
+
+def _claves_odometro(vehiculo_id, fecha):
+    """
+    Mes de la lectura y el siguiente mes con lecturas del vehículo: su km parte de la última lectura de este.
+    """
+    from ..models import LecturaOdometro
+
+    claves = {(vehiculo_id, fecha.year, fecha.month)}
+    siguiente = (
+        LecturaOdometro.objects.filter(vehiculo_id=vehiculo_id, fecha__gt=_limites_mes(fecha.year, fecha.month)[1])
+        .order_by('fecha').values_list('fecha', flat=True).first()
+    )
+    if siguiente:
+        claves.add((vehiculo_id, siguiente.year, siguiente.month))
+    return claves
@@ -1,14 +1,30 @@
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.db.models import Sum, Q
-from decimal import Decimal
-from .models import Mantenimiento, Presupuesto, CargaCombustible, Arriendo, OrdenCompra
+from django.db import transaction
+from .models import (
+    Mantenimiento, Presupuesto, CargaCombustible, Arriendo, OrdenCompra, HojaRuta, Viaje,
+    Vehiculo, FallaReportada, CuentaPresupuestaria, CierreAnual, Alerta,
+)
+from .services.motor_alertas import evaluar_alertas
+from .services.movimientos_presupuesto import (
+    ejecutado_segun_libro,
+    sincronizar_arriendos_abiertos,
+    sincronizar_movimientos,
+    sincronizar_ordenes_compra,
+)
 from .services.presupuesto import validar_presupuesto_disponible
+from .services.resumen_mensual import actualizar_resumenes, claves_resumen
+from .services.cache_reportes import incrementar_version
+from .services.kilometraje import (
+    actualizar_ultimo_preventivo,
+    afecta_ultimo_preventivo,
+    sincronizar_lecturas,
+)
 
 @receiver(pre_save, sender=Mantenimiento)
 def validar_cierre_administrativo_mantenimiento(sender, instance, **kwargs):
     """
-    Valida condiciones de cierre administrativo: Finalizado requiere OC y presupuesto suficiente. La ejecución presupuestaria se hace solo vía Mantenimiento.ejecutar_cierre_presupuestario().
+    Valida condiciones de cierre administrativo: Finalizado requiere OC, costos reales y presupuesto activo; el saldo se verifica y descuenta al guardar (libro de movimientos).
     """
     if instance.estado != 'Finalizado':
         return
@@ -23,101 +39,154 @@ def validar_cierre_administrativo_mantenimiento(sender, instance, **kwargs):
         )
     if not instance.cuenta_presupuestaria or not instance.vehiculo:
         return
+    # El saldo se reserva en post_save (reservar_presupuesto); aquí solo se exige que exista presupuesto activo
     ok, mensaje, presupuesto = validar_presupuesto_disponible(
         instance.cuenta_presupuestaria,
         instance.fecha_ingreso.year,
-        instance.costo_total_real,
     )
     if not ok:
         raise ValueError(mensaje)
 
+
+@receiver(post_save, sender=OrdenCompra)
+@receiver(post_save, sender=Mantenimiento)
+@receiver(post_save, sender=CargaCombustible)
+@receiver(post_save, sender=Arriendo)
+def registrar_movimientos_presupuesto(sender, instance, **kwargs):
+    """
+    Anota en el libro la diferencia de lo que el registro aporta a cada (cuenta, año) y la suma a los presupuestos; un cambio de año o cuenta descuenta del presupuesto anterior.
+    """
+    sincronizar_movimientos(instance)
+    if sender is Mantenimiento:
+        # Al finalizar, el costo real reemplaza al monto de su OC (y al revés si deja de estar finalizado)
+        sincronizar_ordenes_compra({instance.orden_compra_id, getattr(instance, '_orden_compra_previa', None)})
+
+
+@receiver(post_delete, sender=OrdenCompra)
 @receiver(post_delete, sender=Mantenimiento)
-def actualizar_presupuesto_al_borrar_mantenimiento(sender, instance, **kwargs):
+@receiver(post_delete, sender=CargaCombustible)
+@receiver(post_delete, sender=Arriendo)
+def revertir_movimientos_presupuesto(sender, instance, **kwargs):
+    sincronizar_movimientos(instance, borrado=True)
+    if sender is Mantenimiento:
+        sincronizar_ordenes_compra({instance.orden_compra_id})
+
+
+@receiver(pre_save, sender=Presupuesto)
+def inicializar_ejecucion_presupuesto(sender, instance, **kwargs):
     """
-    Al borrar un mantenimiento finalizado, recalcular presupuesto afectado. La ejecución en guardado se hace solo vía Mantenimiento.ejecutar_cierre_presupuestario().
+    Un presupuesto nuevo (o que cambia de cuenta o año) parte con la ejecución que el libro ya tiene para ese par.
     """
-    if instance.estado != 'Finalizado' or not instance.cuenta_presupuestaria:
+    previo = None
+    if instance.pk:
+        previo = sender.objects.filter(pk=instance.pk).values_list('cuenta_id', 'anio').first()
+    if previo == (instance.cuenta_id, instance.anio):
         return
-    anio = instance.fecha_ingreso.year
-    presupuestos = Presupuesto.objects.filter(
-        cuenta=instance.cuenta_presupuestaria,
-        anio=anio,
-        activo=True
-    )
-    for p in presupuestos:
-        recalcular_monto_ejecutado(p)
-
-def recalcular_monto_ejecutado(presupuesto):
-    """
-    Recalcula el total gastado para un presupuesto específico sumando Mantenimientos, Combustible y Arriendos asociados.
-    """
-    anio = presupuesto.anio
-    cuenta = presupuesto.cuenta
-    total = Decimal(0)
-
-    # 1. Mantenimientos finalizados
-    total += Mantenimiento.objects.filter(
-        cuenta_presupuestaria=cuenta,
-        fecha_ingreso__year=anio,
-        estado='Finalizado'
-    ).aggregate(total=Sum('costo_total_real'))['total'] or Decimal(0)
-    
-    # 2. Combustible
-    total += CargaCombustible.objects.filter(
-        cuenta_presupuestaria=cuenta,
-        fecha__year=anio
-    ).aggregate(total=Sum('costo_total'))['total'] or Decimal(0)
-    
-    # 3. Arriendos
-    total += Arriendo.objects.filter(
-        cuenta_presupuestaria=cuenta,
-        fecha_inicio__year=anio,
-        estado='Activo'
-    ).aggregate(total=Sum('costo_total'))['total'] or Decimal(0)
-    
-    # 4. Órdenes de compra no anuladas (que no estén ya en mantenimientos)
-    ids_oc_contabilizadas = set(
-        Mantenimiento.objects.filter(
-            estado='Finalizado',
-            cuenta_presupuestaria=cuenta,
-            fecha_ingreso__year=anio,
-            orden_compra_id__isnull=False
-        ).values_list('orden_compra_id', flat=True)
-    )
-    
-    ocs = OrdenCompra.objects.filter(
-        cuenta_presupuestaria=cuenta,
-        fecha_emision__year=anio
-    ).exclude(estado='Anulada')
-    
-    if ids_oc_contabilizadas:
-        ocs = ocs.exclude(id__in=ids_oc_contabilizadas)
-    
-    total += ocs.aggregate(total=Sum('monto_total'))['total'] or Decimal(0)
-    
-    presupuesto.monto_ejecutado = total
-    presupuesto.save(update_fields=['monto_ejecutado', 'activo'])
+    # Si es un año posterior a los ya presupuestados, los arriendos sin fin de la cuenta empiezan a cargarse en él
+    instance._arriendos_abiertos_pendientes = True
+    instance.monto_ejecutado = ejecutado_segun_libro(instance.cuenta_id, instance.anio)
 
 
-@receiver(post_save, sender=OrdenCompra)
-@receiver(post_delete, sender=OrdenCompra)
-def actualizar_presupuesto_orden_compra(sender, instance, **kwargs):
+@receiver(post_save, sender=Presupuesto)
+def extender_arriendos_abiertos(sender, instance, **kwargs):
+    if getattr(instance, '_arriendos_abiertos_pendientes', False):
+        instance._arriendos_abiertos_pendientes = False
+        sincronizar_arriendos_abiertos(instance.cuenta_id)
+
+
+@receiver(post_save, sender=HojaRuta)
+@receiver(post_save, sender=Viaje)
+@receiver(post_save, sender=CargaCombustible)
+def registrar_lecturas_odometro(sender, instance, created, **kwargs):
+    """
+    Agrega (o reemplaza, si se editó) las lecturas de odómetro del registro en LecturaOdometro. Se conecta antes que actualizar_resumen_mensual, que calcula el km del mes desde estas lecturas.
+    """
+    sincronizar_lecturas(instance, creado=created)
+
+
+@receiver(post_delete, sender=HojaRuta)
+@receiver(post_delete, sender=Viaje)
+@receiver(post_delete, sender=CargaCombustible)
+def borrar_lecturas_odometro(sender, instance, **kwargs):
+    sincronizar_lecturas(instance, borrado=True)
+
+
+@receiver(pre_save, sender=Mantenimiento)
+@receiver(pre_save, sender=CargaCombustible)
+@receiver(pre_save, sender=HojaRuta)
+@receiver(pre_save, sender=Viaje)
+@receiver(pre_save, sender=Arriendo)
+def registrar_meses_previos_resumen(sender, instance, **kwargs):
     """
-    Cuando se guarda/borra una OC, recalcular el presupuesto asociado. Las OCs representan compromisos presupuestarios.
+    Guarda los meses del resumen que afectaba el registro antes de editarlo (si cambia la fecha o el vehículo, el mes anterior también se recalcula).
     """
-    if not instance.cuenta_presupuestaria:
+    previo = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._claves_resumen_previas = claves_resumen(previo) if previo else set()
+    if sender is Mantenimiento:
+        instance._orden_compra_previa = previo.orden_compra_id if previo else None
+        instance._vehiculo_preventivo_previo = (
+            previo.vehiculo_id if previo and afecta_ultimo_preventivo(previo) else None
+        )
+
+
+@receiver(post_save, sender=Mantenimiento)
+@receiver(post_save, sender=CargaCombustible)
+@receiver(post_save, sender=HojaRuta)
+@receiver(post_save, sender=Viaje)
+@receiver(post_save, sender=Arriendo)
+@receiver(post_delete, sender=Mantenimiento)
+@receiver(post_delete, sender=CargaCombustible)
+@receiver(post_delete, sender=HojaRuta)
+@receiver(post_delete, sender=Viaje)
+@receiver(post_delete, sender=Arriendo)
+def actualizar_resumen_mensual(sender, instance, **kwargs):
+    """
+    Recalcula solo las filas (vehículo, mes) de ResumenMensualVehiculo que toca el registro guardado/borrado.
+    """
+    claves = claves_resumen(instance) | getattr(instance, '_claves_resumen_previas', set())
+    actualizar_resumenes(claves)
+
+
+@receiver(post_save, sender=Mantenimiento)
+@receiver(post_delete, sender=Mantenimiento)
+def actualizar_ultimo_preventivo_vehiculo(sender, instance, **kwargs):
+    """
+    Mantiene Vehiculo.km_ultimo_preventivo/fecha_ultimo_preventivo cuando se finaliza, edita o borra un preventivo (incluye el vehículo anterior si cambió).
+    """
+    ids = {getattr(instance, '_vehiculo_preventivo_previo', None)}
+    if afecta_ultimo_preventivo(instance):
+        ids.add(instance.vehiculo_id)
+    ids.discard(None)
+    if not ids:
         return
-    
-    anio = instance.fecha_emision.year
-    
-    # Buscar presupuestos afectados
-    presupuestos = Presupuesto.objects.filter(
-        cuenta=instance.cuenta_presupuestaria,
-        anio=anio,
-        activo=True
-    )
-    
-    for p in presupuestos:
-        recalcular_monto_ejecutado(p)
+    cambios = actualizar_ultimo_preventivo(ids)
+    # La instancia de vehículo ya cargada (p.ej. mant.vehiculo en finalizar_mantenimiento) queda al día
+    vehiculo = instance._state.fields_cache.get('vehiculo')
+    if vehiculo is not None and vehiculo.pk in cambios:
+        vehiculo.km_ultimo_preventivo, vehiculo.fecha_ultimo_preventivo = cambios[vehiculo.pk]
+
+
+@receiver(post_save, sender=Mantenimiento)
+@receiver(post_delete, sender=Mantenimiento)
+@receiver(post_save, sender=FallaReportada)
+@receiver(post_delete, sender=FallaReportada)
+def evaluar_alertas_vehiculo(sender, instance, **kwargs):
+    """
+    Aplica las reglas de mantenimiento programado y fallas del motor de alertas al vehículo del registro; la evaluación periódica cubre el resto.
+    """
+    evaluar_alertas([instance.vehiculo_id], reglas=['mantenimiento_programado', 'falla'])
+
+
+def invalidar_cache_reportes(sender, **kwargs):
+    """
+    Incrementa el contador de versión del modelo al confirmar la transacción; las pestañas de reportes que dependen de él se recalculan en la próxima visita.
+    """
+    transaction.on_commit(lambda: incrementar_version(sender.__name__))
+
 
-    
\ No newline at end of file
+for _modelo in (
+    Mantenimiento, CargaCombustible, Arriendo, HojaRuta, Viaje, Presupuesto, OrdenCompra,
+    Vehiculo, FallaReportada, CuentaPresupuestaria, CierreAnual, Alerta,
+):
+    post_save.connect(invalidar_cache_reportes, sender=_modelo, dispatch_uid=f'cache_reportes_save_{_modelo.__name__}')
+    post_delete.connect(invalidar_cache_reportes, sender=_modelo, dispatch_uid=f'cache_reportes_delete_{_modelo.__name__}')
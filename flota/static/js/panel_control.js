@@ -621,9 +621,37 @@ document.addEventListener('DOMContentLoaded', function() {
             } catch (error) {
                 console.error('Error al inicializar gráficos de finanzas:', error);
             }
+            refrescarFinanzas();
         });
     }
 
+    // ------------------------------------------------------------------
+    // Refrescar datos financieros desde la API sin recargar la página
+    // ------------------------------------------------------------------
+    function refrescarFinanzas() {
+        const url = modalFinanzas.dataset.apiUrl;
+        if (!url) return;
+        fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => {
+                const nuevos = {
+                    'data-finance': data.finance,
+                    'data-comparativa': data.comparativa,
+                    'data-vehicle': data.gasto_vehiculo,
+                };
+                let cambio = false;
+                for (const [id, valor] of Object.entries(nuevos)) {
+                    const texto = JSON.stringify(valor);
+                    if (JSON.stringify(getJSON(id)) !== texto) {
+                        document.getElementById(id).textContent = texto;
+                        cambio = true;
+                    }
+                }
+                if (cambio) initFinanceCharts();
+            })
+            .catch(error => console.error('Error al refrescar datos financieros:', error));
+    }
+
     // ------------------------------------------------------------------
     // Gráfico de KILÓMETROS (siempre visible, se crea una sola vez)
     // ------------------------------------------------------------------
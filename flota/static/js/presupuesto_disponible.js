@@ -0,0 +1,146 @@
+/**
+ * Validación de saldo presupuestario en el navegador.
+ *
+ * Se activa en formularios con data-presupuesto-url (URL de api_presupuestos_anio con año 0, se reemplaza por el año elegido).
+ * Descarga una vez la foto de presupuestos del año (todas las cuentas) y valida el monto localmente al editar; al enviar
+ * la vuelve a pedir (el navegador revalida con ETag y recibe 304 si nada cambió) y bloquea el envío si no alcanza.
+ * El servidor sigue siendo quien reserva el saldo: esto solo evita enviar formularios que se rechazarían.
+ *
+ * Atributos del formulario:
+ *   data-campo-cuenta / data-campo-fecha: nombre de los campos (o data-cuenta / data-anio si son fijos)
+ *   data-campos-monto: nombres separados por coma; el monto es su suma
+ *   data-monto-previo, data-cuenta-previa, data-anio-previo: al editar, lo que el registro ya consume
+ *   data-presupuesto-obligatorio: exige presupuesto activo (cierres de mantenimiento)
+ */
+(function () {
+    const fotos = {};
+
+    function formatearPesos(valor) {
+        return '$' + Math.round(valor).toLocaleString('es-CL');
+    }
+
+    function obtenerFoto(form, anio, revalidar) {
+        if (!revalidar && fotos[anio]) {
+            return fotos[anio];
+        }
+        const url = form.dataset.presupuestoUrl.replace(/\/0\/$/, `/${anio}/`);
+        fotos[anio] = fetch(url, {
+            cache: 'no-cache',
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        }).then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        }).catch(error => {
+            delete fotos[anio];
+            throw error;
+        });
+        return fotos[anio];
+    }
+
+    function campo(form, nombre) {
+        return nombre ? form.querySelector(`[name="${nombre}"]`) : null;
+    }
+
+    function leerDatos(form) {
+        const cuentaCampo = campo(form, form.dataset.campoCuenta);
+        const fechaCampo = campo(form, form.dataset.campoFecha);
+        const cuenta = cuentaCampo ? cuentaCampo.value : (form.dataset.cuenta || '');
+        const anio = fechaCampo ? parseInt((fechaCampo.value || '').slice(0, 4), 10) : parseInt(form.dataset.anio, 10);
+        const monto = (form.dataset.camposMonto || '').split(',').reduce((total, nombre) => {
+            const input = campo(form, nombre.trim());
+            return total + (input ? parseFloat(input.value) || 0 : 0);
+        }, 0);
+        let etiqueta = cuenta;
+        if (cuentaCampo && cuentaCampo.selectedIndex >= 0) {
+            etiqueta = cuentaCampo.options[cuentaCampo.selectedIndex].text;
+        }
+        return { cuenta, anio, monto, etiqueta };
+    }
+
+    /**
+     * Mismas reglas que el servidor: sin presupuesto no hay saldo que controlar (salvo que sea obligatorio)
+     * y al editar solo se exige el aumento sobre lo que el registro ya consumía en la misma cuenta y año.
+     */
+    function evaluar(form, foto, datos) {
+        const fila = foto.cuentas[datos.cuenta];
+        const obligatorio = 'presupuestoObligatorio' in form.dataset;
+        if (!fila || (obligatorio && !fila[3])) {
+            return {
+                ok: !obligatorio,
+                mensaje: `No hay presupuesto asignado para la cuenta ${datos.etiqueta} en el año ${datos.anio}.`,
+            };
+        }
+        const disponible = fila[2];
+        let requerido = datos.monto;
+        if (form.dataset.cuentaPrevia === datos.cuenta && parseInt(form.dataset.anioPrevio, 10) === datos.anio) {
+            requerido -= parseFloat(form.dataset.montoPrevio) || 0;
+        }
+        if (requerido > 0 && requerido > disponible) {
+            return {
+                ok: false,
+                mensaje: `Presupuesto insuficiente. Disponible: ${formatearPesos(disponible)}, Requerido: ${formatearPesos(requerido)}`,
+            };
+        }
+        return { ok: true, mensaje: `Presupuesto disponible: ${formatearPesos(disponible)}` };
+    }
+
+    function mostrar(form, resultado) {
+        const destino = form.querySelector('.estado-presupuesto');
+        if (!destino) {
+            return;
+        }
+        destino.textContent = resultado ? resultado.mensaje : '';
+        destino.classList.toggle('text-danger', Boolean(resultado && !resultado.ok));
+        destino.classList.toggle('text-success', Boolean(resultado && resultado.ok));
+    }
+
+    function validar(form, revalidar) {
+        const datos = leerDatos(form);
+        if (!datos.cuenta || !datos.anio) {
+            mostrar(form, null);
+            return Promise.resolve(true);
+        }
+        return obtenerFoto(form, datos.anio, revalidar).then(foto => {
+            const resultado = evaluar(form, foto, datos);
+            mostrar(form, resultado);
+            return resultado.ok;
+        });
+    }
+
+    function inicializar(form) {
+        const nombres = [form.dataset.campoCuenta, form.dataset.campoFecha]
+            .concat((form.dataset.camposMonto || '').split(','))
+            .map(nombre => (nombre || '').trim())
+            .filter(Boolean);
+        nombres.forEach(nombre => {
+            const input = campo(form, nombre);
+            if (input) {
+                input.addEventListener('input', () => validar(form, false).catch(() => mostrar(form, null)));
+                input.addEventListener('change', () => validar(form, false).catch(() => mostrar(form, null)));
+            }
+        });
+
+        form.addEventListener('submit', function (event) {
+            if (form.dataset.presupuestoVerificado === '1') {
+                return;
+            }
+            event.preventDefault();
+            validar(form, true)
+                .catch(() => true)  // Sin respuesta se deja decidir al servidor
+                .then(ok => {
+                    if (ok) {
+                        form.dataset.presupuestoVerificado = '1';
+                        form.requestSubmit ? form.requestSubmit(event.submitter) : form.submit();
+                    }
+                });
+        });
+
+        validar(form, false).catch(() => mostrar(form, null));
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('form[data-presupuesto-url]').forEach(inicializar);
+    });
+})();
@@ -0,0 +1,138 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+
+from flota.models import CuentaPresupuestaria, MovimientoPresupuestario, OrdenCompra, Presupuesto, Vehiculo
+from flota.services.importacion_oc import importar_ocs
+from flota.services.movimientos_presupuesto import conciliar
+
+TICKET = 'ticket-de-prueba'
+
+
+def respuesta_oc(codigo, monto):
+    return {
+        'Cantidad': 1,
+        'Listado': [{
+            'Codigo': codigo,
+            'Estado': 'Aceptada',
+            'Descripcion': f'Mantención ambulancia patente vehículo AB.CD-10 cuenta 22.06.002.001 ({codigo})',
+            'Fechas': {'FechaCreacion': '2025-03-01T10:00:00'},
+            'TotalNeto': monto,
+            'Total': monto,
+            'Impuestos': 0,
+            'Proveedor': {'RutSucursal': '76.000.000-0', 'Nombre': 'Taller Central'},
+            'CodigoLicitacion': '',
+            'TipoAdquisicion': 'Convenio Marco',
+            'Items': {'Listado': [{'Producto': 'Servicio de mantención', 'EspecificacionComprador': 'Preventivo'}]},
+        }],
+    }
+
+
+class _ApiFalsa(BaseHTTPRequestHandler):
+    """
+    API de Mercado Público mínima: responde según el código lo que diga `respuestas` del servidor.
+    Un valor (estado, payload) se usa siempre; una lista se consume de a una respuesta por consulta.
+    """
+
+    def do_GET(self):
+        codigo = parse_qs(urlparse(self.path).query)['codigo'][0]
+        self.server.consultas[codigo] += 1
+        respuesta = self.server.respuestas[codigo]
+        estado, payload = respuesta.pop(0) if isinstance(respuesta, list) else respuesta
+        cuerpo = json.dumps(payload).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class ImportacionOCTests(TestCase):
+    """
+    Importación masiva contra un servidor HTTP local que imita la API.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ApiFalsa)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        configuracion = override_settings(
+            MERCADO_PUBLICO_URL=f'http://127.0.0.1:{cls.servidor.server_port}/ordenesdecompra.json',
+            MERCADO_PUBLICO_TICKET=TICKET,
+            MERCADO_PUBLICO_ESPERA=0,
+            MERCADO_PUBLICO_CACHE_TTL=0,
+            MERCADO_PUBLICO_CONSULTAS_POR_SEGUNDO=0,
+            MERCADO_PUBLICO_MODO='',
+        )
+        configuracion.enable()
+        cls.addClassCleanup(configuracion.disable)
+        cls.addClassCleanup(cls.servidor.server_close)
+        cls.addClassCleanup(cls.servidor.shutdown)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cuenta = CuentaPresupuestaria.objects.create(codigo='22.06.002.001', nombre='Mantenimiento')
+        cls.presupuesto = Presupuesto.objects.create(anio=2025, cuenta=cls.cuenta, monto_asignado=1_000_000)
+        cls.vehiculo = Vehiculo.objects.create(
+            patente='AB.CD-10', marca='Mercedes', modelo='Sprinter', anio_adquisicion=2020, tipo_carroceria='Ambulancia',
+        )
+
+    def setUp(self):
+        self.servidor.respuestas = {}
+        self.servidor.consultas = Counter()
+
+    def _por_codigo(self, resultados):
+        return {resultado['codigo']: resultado for resultado in resultados}
+
+    def test_importa_y_reporta_cada_codigo(self):
+        self.servidor.respuestas = {
+            '1-1-SE25': (200, respuesta_oc('1-1-SE25', 300_000)),
+            '1-2-SE25': [(503, {}), (200, respuesta_oc('1-2-SE25', 200_000))],
+            '1-3-SE25': (404, {}),
+            '1-4-SE25': (200, {'Cantidad': 0, 'Listado': []}),
+        }
+        resultados = self._por_codigo(importar_ocs(list(self.servidor.respuestas)))
+
+        self.assertTrue(resultados['1-1-SE25']['ok'])
+        self.assertTrue(resultados['1-1-SE25']['creada'])
+        # El 503 se reintenta y la segunda consulta trae la OC
+        self.assertTrue(resultados['1-2-SE25']['ok'])
+        self.assertEqual(self.servidor.consultas['1-2-SE25'], 2)
+        # El 404 no es transitorio: un solo intento y el error sin el ticket
+        self.assertFalse(resultados['1-3-SE25']['ok'])
+        self.assertEqual(self.servidor.consultas['1-3-SE25'], 1)
+        self.assertIn('404 Client Error', resultados['1-3-SE25']['mensaje'])
+        self.assertIn('ticket=***', resultados['1-3-SE25']['mensaje'])
+        self.assertNotIn(TICKET, resultados['1-3-SE25']['mensaje'])
+        self.assertFalse(resultados['1-4-SE25']['ok'])
+        self.assertEqual(resultados['1-4-SE25']['mensaje'], 'No se encontró la orden de compra 1-4-SE25.')
+
+        ocs = OrdenCompra.objects.filter(nro_oc__in=['1-1-SE25', '1-2-SE25'])
+        self.assertEqual(ocs.count(), 2)
+        self.assertTrue(all(oc.vehiculo_id == self.vehiculo.pk and oc.cuenta_presupuestaria_id == self.cuenta.pk for oc in ocs))
+        self.presupuesto.refresh_from_db()
+        self.assertEqual(self.presupuesto.monto_ejecutado, 500_000)
+        self.assertEqual(conciliar(2025), [])
+
+    def test_lote_sin_presupuesto_se_revierte_completo(self):
+        self.servidor.respuestas = {
+            '2-1-SE25': (200, respuesta_oc('2-1-SE25', 700_000)),
+            '2-2-SE25': (200, respuesta_oc('2-2-SE25', 700_000)),
+        }
+        resultados = importar_ocs(list(self.servidor.respuestas))
+
+        self.assertTrue(all(not resultado['ok'] for resultado in resultados))
+        self.assertTrue(all(resultado['mensaje'].startswith('Lote revertido:') for resultado in resultados))
+        self.assertFalse(OrdenCompra.objects.exists())
+        self.assertFalse(MovimientoPresupuestario.objects.exists())
+        self.presupuesto.refresh_from_db()
+        self.assertEqual(self.presupuesto.monto_ejecutado, 0)
+        self.assertEqual(conciliar(2025), [])
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from threading import Barrier
+from unittest import mock, skipUnless
+
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TransactionTestCase
+
+from flota.models import CuentaPresupuestaria, OrdenCompra, Presupuesto, Proveedor
+from flota.models.presupuesto import PresupuestoQuerySet
+from flota.services.presupuesto import PresupuestoInsuficiente, reservar_presupuesto
+
+HILOS = 8
+
+
+class ReintentoReservaTests(TransactionTestCase):
+    """
+    Un bloqueo mutuo se reintenta solo fuera de una transacción.
+    """
+
+    def setUp(self):
+        self.cuenta = CuentaPresupuestaria.objects.create(codigo='22.06.002.001', nombre='Mantenimiento')
+        Presupuesto.objects.create(anio=2025, cuenta=self.cuenta, monto_asignado=1_000_000)
+
+    def _reservar_con_bloqueo(self, fallas):
+        original = PresupuestoQuerySet.sumar_ejecutado
+        llamadas = []
+
+        def sumar_ejecutado(qs, monto):
+            llamadas.append(monto)
+            if len(llamadas) <= fallas:
+                raise OperationalError('deadlock detected')
+            return original(qs, monto)
+
+        with mock.patch.object(PresupuestoQuerySet, 'sumar_ejecutado', sumar_ejecutado), \
+                mock.patch('flota.services.presupuesto.time.sleep'):
+            reservar_presupuesto(self.cuenta.pk, 2025, 300_000)
+        return llamadas
+
+    def test_fuera_de_transaccion_reintenta(self):
+        self.assertEqual(len(self._reservar_con_bloqueo(fallas=1)), 2)
+        self.assertEqual(Presupuesto.objects.get().monto_ejecutado, 300_000)
+
+    def test_dentro_de_transaccion_propaga_el_error(self):
+        with self.assertRaises(OperationalError), transaction.atomic():
+            self._reservar_con_bloqueo(fallas=1)
+        self.assertEqual(Presupuesto.objects.get().monto_ejecutado, 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere bloqueos de fila reales entre conexiones (PostgreSQL)')
+class ReservaConcurrenteTests(TransactionTestCase):
+    """
+    Reservas simultáneas sobre un mismo presupuesto: nunca se ejecuta más de lo asignado.
+    """
+
+    def setUp(self):
+        self.cuenta = CuentaPresupuestaria.objects.create(codigo='22.06.002.001', nombre='Mantenimiento')
+        self.presupuesto = Presupuesto.objects.create(anio=2025, cuenta=self.cuenta, monto_asignado=1_000_000)
+        self.proveedor = Proveedor.objects.create(rut_empresa='76000000-0', nombre_fantasia='Taller', es_taller=True)
+
+    def _en_paralelo(self, funcion):
+        """
+        Corre funcion(i) en HILOS hilos que arrancan a la vez, cada uno con su conexión; retorna las excepciones lanzadas.
+        """
+        barrera = Barrier(HILOS)
+
+        def correr(i):
+            try:
+                barrera.wait()
+                funcion(i)
+            except Exception as e:
+                return e
+            finally:
+                connections.close_all()
+            return None
+
+        with ThreadPoolExecutor(max_workers=HILOS) as pool:
+            return [e for e in pool.map(correr, range(HILOS)) if e is not None]
+
+    def _assert_resultado(self, errores, exitosas):
+        self.assertTrue(all(isinstance(e, PresupuestoInsuficiente) for e in errores), errores)
+        self.assertEqual(len(errores), HILOS - exitosas)
+        self.presupuesto.refresh_from_db()
+        self.assertLessEqual(self.presupuesto.monto_ejecutado, self.presupuesto.monto_asignado)
+        self.assertEqual(self.presupuesto.monto_ejecutado, exitosas * 300_000)
+
+    def test_reservas_simultaneas_no_exceden_lo_asignado(self):
+        def reservar(i):
+            with transaction.atomic():
+                reservar_presupuesto(self.cuenta.pk, 2025, 300_000)
+
+        self._assert_resultado(self._en_paralelo(reservar), exitosas=3)
+
+    def test_ordenes_de_compra_simultaneas_no_exceden_lo_asignado(self):
+        # Camino real: la reserva corre desde la señal, anidada en el atomic de OrdenCompra.save()
+        def registrar(i):
+            OrdenCompra.objects.create(
+                nro_oc=f'OC-{i}', fecha_emision=date(2025, 3, 1), monto_neto=300_000, monto_total=300_000,
+                proveedor=self.proveedor, cuenta_presupuestaria=self.cuenta,
+            )
+
+        self._assert_resultado(self._en_paralelo(registrar), exitosas=3)
+        self.assertEqual(OrdenCompra.objects.count(), 3)
@@ -0,0 +1,176 @@
+from collections import Counter
+from datetime import date, time
+from unittest import skipUnless
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from flota.indicadores import IndicadoresPeriodo
+from flota.models import (
+    Arriendo, CargaCombustible, CuentaPresupuestaria, HojaRuta, Mantenimiento, OrdenCompra, Presupuesto,
+    Proveedor, Usuario, Vehiculo, Viaje,
+)
+from flota.services.cache_reportes import ALIAS_CACHE
+
+INDICADORES = [
+    'km', 'combustible', 'correctivos', 'incidentes', 'promedio_indisponibilidad', 'tiempos_hbo',
+    'costos_combustible', 'frecuencia_fallas',
+]
+
+
+# Los indicadores usan agregados de PostgreSQL (percentiles de tiempos HBO), como en producción
+solo_postgresql = skipUnless(connection.vendor == 'postgresql', 'Los reportes usan funciones de PostgreSQL')
+
+
+class DatosReportesMixin:
+    """
+    Flota chica con mantenimientos, cargas, arriendo, hoja de ruta y viajes en 2025.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            '11111111-1', 'admin@flota.cl', nombre='Ana', apellido='Pérez', rol='Administrador'
+        )
+        proveedor = Proveedor.objects.create(
+            rut_empresa='76000000-0', nombre_fantasia='Taller', es_taller=True, es_arrendador=True
+        )
+        cuenta = CuentaPresupuestaria.objects.create(codigo='22.06.002.001', nombre='Mantenimiento')
+        combustible = CuentaPresupuestaria.objects.create(codigo='22.03.001', nombre='Combustible')
+        for c in (cuenta, combustible):
+            Presupuesto.objects.create(anio=2025, cuenta=c, monto_asignado=10_000_000)
+        cls.vehiculos = [
+            Vehiculo.objects.create(
+                patente=f'AB.CD-1{i}', marca='Mercedes', modelo='Sprinter', anio_adquisicion=2020,
+                tipo_carroceria='Ambulancia', criticidad='Crítico', kilometraje_actual=10000 + i * 5000,
+            )
+            for i in range(3)
+        ]
+        arrendado = Vehiculo.objects.create(
+            patente='ZZ.ZZ-99', marca='Renault', modelo='Master', anio_adquisicion=2022,
+            tipo_carroceria='Ambulancia', tipo_propiedad='Arrendado',
+        )
+        for i, (tipo, ingreso, salida) in enumerate([
+            ('Preventivo', date(2025, 1, 10), date(2025, 1, 15)),
+            ('Correctivo', date(2025, 3, 28), date(2025, 4, 3)),
+        ]):
+            oc = OrdenCompra.objects.create(
+                nro_oc=f'OC-{i}', fecha_emision=ingreso, monto_neto=300_000, monto_total=300_000,
+                proveedor=proveedor, cuenta_presupuestaria=cuenta,
+            )
+            Mantenimiento.objects.create(
+                vehiculo=cls.vehiculos[i], tipo_mantencion=tipo, fecha_ingreso=ingreso, fecha_salida=salida,
+                km_al_ingreso=9000, descripcion_trabajo='Revisión', estado='Finalizado', proveedor=proveedor,
+                cuenta_presupuestaria=cuenta, orden_compra=oc, costo_mano_obra=300_000,
+            )
+        for fecha, litros, costo, km in [(date(2025, 2, 1), 40, 50_000, 10100), (date(2025, 3, 1), 30, 36_000, 10500)]:
+            CargaCombustible.objects.create(
+                fecha=fecha, litros=litros, costo_total=costo, kilometraje_al_cargar=km,
+                patente_vehiculo=cls.vehiculos[0], cuenta_presupuestaria=combustible,
+            )
+        Arriendo.objects.create(
+            vehiculo_arrendado=arrendado, vehiculo_reemplazado=cls.vehiculos[1], fecha_inicio=date(2025, 3, 28),
+            fecha_fin=date(2025, 4, 3), costo_diario=10_000, motivo='Taller', proveedor=proveedor,
+            cuenta_presupuestaria=combustible, estado='Finalizado',
+        )
+        hoja = HojaRuta.objects.create(
+            vehiculo=cls.vehiculos[0], conductor=cls.usuario, fecha=date(2025, 2, 3), turno='20-08',
+            km_inicio=10100, km_fin=10300, abierta=False,
+        )
+        Viaje.objects.create(
+            hoja_ruta=hoja, hora_salida=time(21), km_salida=10100, km_llegada=10200,
+            hora_salida_hbo=time(23, 30), hora_llegada_hbo=time(0, 30),
+        )
+
+    def assertSinConsultasRepetidas(self, contexto):
+        repetidas = [sql for sql, veces in Counter(q['sql'] for q in contexto.captured_queries).items() if veces > 1]
+        self.assertEqual(repetidas, [])
+
+
+@solo_postgresql
+class IndicadoresPeriodoTests(DatosReportesMixin, TestCase):
+    """
+    Cada agregado de IndicadoresPeriodo se consulta una sola vez por objeto.
+    """
+
+    def setUp(self):
+        self.indicadores = IndicadoresPeriodo(
+            [v.pk for v in self.vehiculos], date(2025, 1, 1), date(2025, 12, 31), usar_resumen=False
+        )
+
+    def test_cada_indicador_se_consulta_una_vez(self):
+        with CaptureQueriesContext(connection) as contexto:
+            for nombre in INDICADORES:
+                getattr(self.indicadores, nombre)
+        self.assertSinConsultasRepetidas(contexto)
+        with self.assertNumQueries(0):
+            for nombre in INDICADORES:
+                getattr(self.indicadores, nombre)
+
+    def test_indicadores_derivados_reutilizan_los_agregados(self):
+        self.indicadores.km
+        self.indicadores.combustible
+        self.indicadores.correctivos
+        # Derivados de km, combustible y correctivos: no vuelven a consultarlos
+        with self.assertNumQueries(0):
+            self.indicadores.costos_combustible
+        with self.assertNumQueries(0):
+            self.indicadores.frecuencia_fallas
+
+
+# (vista, pestaña): consultas de la petición sin caché; incluyen la sesión, el usuario y los años disponibles
+CONSULTAS_PESTANAS = {
+    ('reportes_datos_tab', 'costos'): 11,
+    ('reportes_datos_tab', 'variacion'): 9,
+    ('reportes_datos_tab', 'disponibilidad'): 13,
+    ('reportes_graficos', 'costos'): 13,
+    ('reportes_graficos', 'disponibilidad'): 13,
+}
+# Con la pestaña en caché solo quedan la sesión, el usuario y los años disponibles
+CONSULTAS_CON_CACHE = 5
+
+
+@solo_postgresql
+@override_settings(USAR_RESUMEN_MENSUAL=False)
+class ConsultasReportesTests(DatosReportesMixin, TestCase):
+    """
+    Consultas por petición de cada pestaña de reportes: ninguna se repite y su cantidad no depende del tamaño de la flota.
+    """
+
+    def setUp(self):
+        caches[ALIAS_CACHE].clear()
+        self.client.force_login(self.usuario)
+
+    def _consultar(self, nombre, tab, consultas):
+        url = reverse(nombre, args=[tab]) + '?anio=2025&anio_costos=2025&anio_disp=2025'
+        with CaptureQueriesContext(connection) as contexto:
+            with self.assertNumQueries(consultas):
+                respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertSinConsultasRepetidas(contexto)
+
+    def test_cada_pestana_sin_consultas_repetidas(self):
+        for (nombre, tab), consultas in CONSULTAS_PESTANAS.items():
+            with self.subTest(vista=nombre, tab=tab):
+                caches[ALIAS_CACHE].clear()
+                self._consultar(nombre, tab, consultas)
+
+    def test_consultas_no_crecen_con_la_flota(self):
+        for i in range(5):
+            Vehiculo.objects.create(
+                patente=f'CD.EF-2{i}', marca='Ford', modelo='Transit', anio_adquisicion=2021, tipo_carroceria='Ambulancia',
+            )
+        for (nombre, tab), consultas in CONSULTAS_PESTANAS.items():
+            with self.subTest(vista=nombre, tab=tab):
+                caches[ALIAS_CACHE].clear()
+                self._consultar(nombre, tab, consultas)
+
+    def test_pestana_en_cache_no_recalcula(self):
+        for nombre, tab in CONSULTAS_PESTANAS:
+            with self.subTest(vista=nombre, tab=tab):
+                caches[ALIAS_CACHE].clear()
+                self.client.get(reverse(nombre, args=[tab]) + '?anio=2025&anio_costos=2025&anio_disp=2025')
+                self._consultar(nombre, tab, CONSULTAS_CON_CACHE)
@@ -68,6 +68,8 @@ urlpatterns = [
     
     # Reportes y Panel de control
     path('reportes/', views.reportes, name='reportes'),
+    path('reportes/datos/<str:tab>/', views.reportes_datos_tab, name='reportes_datos_tab'),
+    path('reportes/graficos/<str:tab>/', views.reportes_graficos, name='reportes_graficos'),
     path('reportes/disponibilidad/', views.reporte_disponibilidad, name='reporte_disponibilidad'),
     path('reportes/historial/<str:patente>/', views.reporte_historial_unidad, name='reporte_historial_unidad'),
     
@@ -89,6 +91,7 @@ urlpatterns = [
     
     # Órdenes de compra
     path('ordenes-compra/importar/', views.importar_orden_compra, name='importar_oc'),
+    path('ordenes-compra/importar/lote/', views.importar_ordenes_compra_lote, name='importar_ocs_lote'),
     path('ordenes-compra/registrar/', views.registrar_orden_compra, name='registrar_orden_compra'),
     path('ordenes-compra/listar/', views.listar_ordenes_compra, name='listar_ordenes_compra'),
     # Con parámetros
@@ -113,6 +116,8 @@ urlpatterns = [
     # APIs
     path('api/vehiculos-kilometraje/', views.api_vehiculos_kilometraje, name='api_vehiculos_kilometraje'),
     path('api/alertas-count/', views.api_alertas_count, name='api_alertas_count'),
+    path('api/panel-control/<int:anio>/', views.api_panel_control, name='api_panel_control'),
+    path('api/presupuestos/<int:anio>/', views.api_presupuestos_anio, name='api_presupuestos_anio'),
     path('api/verificar-presupuesto/', views.api_verificar_presupuesto, name='api_verificar_presupuesto'),
     path('api/mantenimientos/', views.api_mantenimientos, name='api_mantenimientos'),
 ]
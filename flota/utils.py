@@ -1,17 +1,16 @@
 """
 Utilidades para exportación y generación de reportes
 """
-import requests
-import re
 from datetime import datetime
 from calendar import monthrange
 from collections import defaultdict
 from django.http import HttpResponse
-from django.conf import settings
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from .models import normalizar_estado_oc, normalizar_estado_visual, Vehiculo, Mantenimiento, OrdenCompra, Proveedor, CuentaPresupuestaria, Presupuesto
+from .services.mercado_publico import cliente_mercado_publico
+from .services.parseo_oc import parsear_oc
+from .models import Vehiculo, Mantenimiento, OrdenCompra, Proveedor, CuentaPresupuestaria, Presupuesto
 
 
 MESES = [
@@ -46,163 +45,14 @@ def consultar_oc_mercado_publico(codigo_oc):
     """
     Consulta la API de Mercado Público y retorna un diccionario con datos limpios
     """
+    cliente = cliente_mercado_publico()
+    if not cliente.configurado:
+        return {'error': 'Ticket no configurado.'}
     try:
-        ticket = getattr(settings, 'MERCADO_PUBLICO_TICKET', None)
-
-        if not ticket or ticket == 'BLABLABLA':
-            return {'error': 'Ticket no configurado.'}
-        
-        url = f"https://api.mercadopublico.cl/servicios/v1/publico/ordenesdecompra.json?codigo={codigo_oc}&ticket={ticket}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/json',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=30, verify=True)
-        response.raise_for_status()
-        
-        data = response.json()
-
-        # PARA DEPURACIÓN
-        print("=== RESPUESTA API ===")
-        print(data)
-        print("====================")
-        
-        if data.get('Cantidad', 0) == 0:
-            return {'error': f'No se encontró la orden de compra {codigo_oc}.'}
-
-        if 'Listado' not in data or not data['Listado']:
-            return {'error': 'La API no devolvió datos en el formato esperado.'}
-
-        oc_data = data['Listado'][0]
-
-        # Extraer items
-        items_str = ""
-        if 'Listado' in oc_data.get('Items', {}):
-            items = []
-            lista = oc_data['Items']['Listado']
-            if isinstance(lista, dict):
-                lista = [lista]
-                
-            for item in lista:
-                nombre = item.get('Producto', '')
-                espec = item.get('EspecificacionComprador', '')
-                items.append(f"{nombre} - {espec}")
-            
-            items_str = "\n".join(items)
-
-        # Datos básicos
-        estado_original = oc_data.get('Estado', 'Emitida')
-        
-        estado_normalizado = normalizar_estado_oc(estado_original)
-        estado_visual = normalizar_estado_visual(estado_normalizado)
-
-        # Datos básicos
-        info_limpia = {
-            'codigo': oc_data.get('Codigo', codigo_oc),
-            'estado_original': estado_original,
-            'fecha_emision': oc_data.get('Fechas', {}).get('FechaCreacion', '').split('T')[0],
-            'descripcion': oc_data.get('Descripcion', oc_data.get('Nombre', f'Orden de compra {codigo_oc}'))[:500],
-            'monto_neto': oc_data.get('TotalNeto', 0),
-            'monto_total': oc_data.get('Total', 0),
-            'impuestos': oc_data.get('Impuestos', 0),
-            'proveedor_rut': oc_data.get('Proveedor', {}).get('RutSucursal', ''),
-            'proveedor_nombre': oc_data.get('Proveedor', {}).get('Nombre', 'Proveedor Desconocido'),
-            'id_licitacion': oc_data.get('CodigoLicitacion', ''),
-            'items_str': items_str
-        }
-
-        # Extraer tipo de adquisición
-        tipo_adquisicion = 'Convenio Marco'  # valor por defecto
-        if 'TipoAdquisicion' in oc_data:
-            raw_tipo = oc_data['TipoAdquisicion']
-            # Normalizar a las opciones del modelo
-            if 'CONVENIO' in raw_tipo.upper():
-                tipo_adquisicion = 'Convenio Marco'
-            elif 'LICITACIÓN' in raw_tipo.upper() or 'LICITACION' in raw_tipo.upper():
-                tipo_adquisicion = 'Licitación Pública'
-            elif 'TRATO DIRECTO' in raw_tipo.upper():
-                tipo_adquisicion = 'Trato Directo'
-            elif 'COMPRA ÁGIL' in raw_tipo.upper() or 'COMPRA AGIL' in raw_tipo.upper():
-                tipo_adquisicion = 'Compra Ágil'
-            else:
-                tipo_adquisicion = raw_tipo  # mantener original si no coincide
-
-        info_limpia['tipo_adquisicion'] = tipo_adquisicion
-        
-        # ========== EXTRACCIÓN DE DATOS CLAVE ==========
-        texto_completo = f"{info_limpia['descripcion']} {items_str}".upper()
-        
-        # 1. Buscar CÓDIGO PRESUPUESTARIO (22.06.002.002)
-        import re
-        codigo_match = re.search(r'(\d{2}\.\d{2}\.\d{3}\.\d{3})', texto_completo)
-        if codigo_match:
-            info_limpia['codigo_presupuestario'] = codigo_match.group(1)
-        else:
-            # Intentar con formato 22-06-002
-            codigo_match = re.search(r'(\d{2}-\d{2}-\d{3})', texto_completo)
-            if codigo_match:
-                info_limpia['codigo_presupuestario'] = codigo_match.group(1).replace('-', '.')
-            else:
-                info_limpia['codigo_presupuestario'] = None
-
-        # 2. Buscar PATENTES con patrones mejorados
-        patentes_encontradas = []
-
-        # Nuevos patrones para capturar formatos específicos
-        patrones_patentes = [
-            r'\b(HR\.PG-25)\b',  # Patente específica de este caso
-            r'\b([A-Z]{2}\.[A-Z]{2}-\d{2})\b',  # Formato XX.XX-XX (HR.PG-25)
-            r'\b([A-Z]{2}-[A-Z]{2}-\d{2})\b',   # Formato XX-XX-XX (LX-FG-16)
-            r'\b([A-Z]{2}\.[A-Z]{2}\d{2})\b',   # Formato XX.XXXX (HR.PG25)
-            r'\b([A-Z]{4}\d{2})\b',             # Formato XXXXNN (HRPG25)
-            r'\b([A-Z]{2}\d{4})\b',             # Formato XXNNNN
-            r'Patente Vehículo\s+([A-Z0-9\.\-]+)',  # Buscar específicamente después de "Patente Vehículo"
-        ]
-
-        for patron in patrones_patentes:
-            matches = re.findall(patron, texto_completo, re.IGNORECASE)
-            if matches:
-                print(f"Patrón '{patron}' encontró: {matches}")
-                patentes_encontradas.extend(matches)
-
-        # También buscar en todo el texto sin patrones específicos
-        # Buscar cualquier cosa que parezca patente chilena
-        if not patentes_encontradas:
-            # Patrón general para patentes chilenas
-            patron_general = r'\b([A-Z]{2}[\.\-]?[A-Z]{2}[\.\-]?\d{2,3})\b'
-            matches_general = re.findall(patron_general, texto_completo, re.IGNORECASE)
-            if matches_general:
-                print(f"Patrón general encontró: {matches_general}")
-                patentes_encontradas.extend(matches_general)
-
-        # Limpiar y normalizar
-        patentes_limpias = []
-        for patente in set(patentes_encontradas):
-            # Convertir a mayúsculas
-            patente = patente.upper()
-            
-            # Si ya tiene formato con punto y guión (HR.PG-25), mantenerlo
-            if re.match(r'^[A-Z]{2}\.[A-Z]{2}-\d{2}$', patente):
-                patentes_limpias.append(patente)
-            # Si tiene formato con guión (LX-FG-16), mantenerlo
-            elif re.match(r'^[A-Z]{2}-[A-Z]{2}-\d{2}$', patente):
-                patentes_limpias.append(patente)
-            # Si tiene formato compacto (HRPG25), formatearlo
-            elif re.match(r'^[A-Z]{4}\d{2}$', patente):
-                patente_formateada = f"{patente[:2]}.{patente[2:4]}-{patente[4:]}"
-                patentes_limpias.append(patente_formateada)
-            else:
-                # Mantener cualquier otro formato
-                patentes_limpias.append(patente)
-
-        info_limpia['patentes_posibles'] = patentes_limpias
-        
-        return info_limpia
-
+        return parsear_oc(cliente.obtener(codigo_oc), codigo_oc)
     except Exception as e:
-        return {'error': f'Error: {str(e)}'}
+        return {'error': cliente.mensaje_error(e)}
+
 
 def exportar_reporte_excel(titulo, datos, columnas, nombre_archivo=None):
     """
@@ -66,6 +66,8 @@ from .presupuesto import (
 )
 from .reportes import (
     reportes,
+    reportes_datos_tab,
+    reportes_graficos,
     reporte_disponibilidad,
     reporte_historial_unidad,
 )
@@ -87,6 +89,7 @@ from .proveedores import (
 )
 from .ordenes import (
     importar_orden_compra,
+    importar_ordenes_compra_lote,
     registrar_orden_compra,
     listar_ordenes_compra,
     modificar_orden_compra,
@@ -102,6 +105,8 @@ from .ordenes import (
 from .api import (
     api_vehiculos_kilometraje,
     api_alertas_count,
+    api_panel_control,
+    api_presupuestos_anio,
     api_verificar_presupuesto,
 )
 
@@ -160,6 +165,8 @@ __all__ = [
     'deshabilitar_presupuesto',
     'listar_presupuestos',
     'reportes',
+    'reportes_datos_tab',
+    'reportes_graficos',
     'reporte_disponibilidad',
     'reporte_historial_unidad',
     'registrar_arriendo',
@@ -175,6 +182,7 @@ __all__ = [
     'habilitar_proveedor',
     'deshabilitar_proveedor',
     'importar_orden_compra',
+    'importar_ordenes_compra_lote',
     'registrar_orden_compra',
     'listar_ordenes_compra',
     'modificar_orden_compra',
@@ -188,5 +196,7 @@ __all__ = [
     'api_orden_trabajo',
     'api_vehiculos_kilometraje',
     'api_alertas_count',
+    'api_panel_control',
+    'api_presupuestos_anio',
     'api_verificar_presupuesto',
 ]
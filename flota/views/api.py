@@ -1,10 +1,18 @@
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from decimal import Decimal
+import json
 from ..models import Vehiculo, CuentaPresupuestaria
-from ..services.alertas import contar_alertas_vigentes
-from ..services.presupuesto import validar_presupuesto_disponible
+from ..services.alertas import conteo_alertas_cacheado, version_conteo_alertas
+from ..services.cierre_anual import obtener_cierre
+from ..services.presupuesto import (
+    estado_presupuestos_cacheado,
+    validar_presupuesto_disponible,
+    version_estado_presupuestos,
+)
 
 # API para obtener el kilometraje de los vehículos
 @login_required
@@ -16,12 +24,65 @@ def api_vehiculos_kilometraje(request):
     return JsonResponse(data)
 
 
+def _etag_alertas_count(request):
+    return version_conteo_alertas()
+
+
 @login_required
+@condition(etag_func=_etag_alertas_count)
 def api_alertas_count(request):
     """
     API para obtener el conteo de alertas activas (mantenimiento no pausadas + presupuesto >= 80%).
+    El conteo sale del caché y el ETag son las versiones de los modelos de origen: si no hubo escrituras responde 304.
+    """
+    response = JsonResponse(conteo_alertas_cacheado())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def api_panel_control(request, anio):
+    """
+    Datos de los gráficos del panel de control para un año, para refrescarlos sin recargar la página.
+    Los años cerrados se sirven desde su snapshot.
+    """
+    from .panel_control import contexto_panel_control
+
+    cierre = obtener_cierre(anio)
+    context = cierre.contexto_panel_control() if cierre else contexto_panel_control(anio)
+    return JsonResponse({
+        'anio': anio,
+        'cerrado': bool(cierre),
+        'presupuesto': {
+            'total': int(context['presupuesto_total']),
+            'ejecutado': int(context['presupuesto_ejecutado']),
+            'pct': round(float(context['presupuesto_pct']), 1),
+        },
+        'cumplimiento_pct': context['cumplimiento_pct'],
+        'disponibilidad_pct': context['disponibilidad_pct'],
+        'monthly_split': json.loads(context['json_monthly_split']),
+        'gasto_vehiculo': json.loads(context['json_gasto_vehiculo_detalle']),
+        'comparativa': json.loads(context['json_comparativa_global']),
+        'finance': json.loads(context['json_finance']),
+        'km': json.loads(context['json_km_barras']),
+        'disponibilidad': json.loads(context['disponibilidad_json']),
+    })
+
+
+def _etag_presupuestos_anio(request, anio):
+    return version_estado_presupuestos(anio)
+
+
+@login_required
+@condition(etag_func=_etag_presupuestos_anio)
+def api_presupuestos_anio(request, anio):
+    """
+    Asignado, ejecutado, disponible y activo de todas las cuentas del año en una respuesta, para que los formularios validen montos en el navegador (static/js/presupuesto_disponible.js).
+    El ETag son las versiones de Presupuesto y CuentaPresupuestaria: al reabrir el formulario o enviarlo, el navegador revalida y recibe 304 si nada cambió.
     """
-    return JsonResponse(contar_alertas_vigentes())
+    response = JsonResponse(estado_presupuestos_cacheado(anio))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # API para verificar presupuesto desde JavaScript
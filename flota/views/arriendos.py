@@ -154,7 +154,7 @@ def finalizar_arriendo(request, id):
 
         vehiculo_arrendado = arriendo.vehiculo_arrendado
         vehiculo_arrendado.estado = 'Fuera de servicio'
-        vehiculo_arrendado.save()
+        vehiculo_arrendado.save(update_fields=['estado'])
         messages.info(request, f'Vehículo arrendado {vehiculo_arrendado.patente} marcado como Fuera de servicio.')
 
         if arriendo.vehiculo_reemplazado:
@@ -171,7 +171,7 @@ def finalizar_arriendo(request, id):
                 vehiculo.estado = 'Disponible'
                 messages.success(request, f'Vehículo {vehiculo.patente} reactivado y disponible.')
             
-            vehiculo.save()
+            vehiculo.save(update_fields=['estado'])
 
         messages.success(request, f'Arriendo {arriendo.vehiculo_arrendado.patente} finalizado.')
         return redirect('listar_arriendos')
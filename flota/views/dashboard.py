@@ -1,68 +1,58 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
 from decimal import Decimal
 from ..models import Vehiculo, Mantenimiento, CargaCombustible, Arriendo
+from ..indicadores import rango_fechas_reporte
 from ..services.alertas import alertas_mantenimiento_vigentes, presupuestos_con_alerta
+from ..services.cache_reportes import obtener_o_calcular
+from ..services.disponibilidad import calcular_indisponibilidad
 from .utilidades import puede_escribir
 
-@login_required
-def dashboard(request):
-    if request.user.rol == 'Conductor':
-        return redirect('registrar_bitacora')
-
-    total_vehiculos = Vehiculo.objects.count()
-    vehiculos_disponibles = Vehiculo.objetos_operativos().filter(estado='Disponible').count()
-    vehiculos_mantenimiento = Vehiculo.objects.filter(estado='En mantenimiento').count()
+def contexto_dashboard():
+    """
+    Indicadores del dashboard con un número fijo de consultas agrupadas (no depende del tamaño de la flota).
+    """
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+    inicio_mes, fin_mes = rango_fechas_reporte(hoy.year, hoy.month)
 
-    mes_actual = timezone.now().month
-    anio_actual = timezone.now().year
-    
-    mantenimientos_mes = Mantenimiento.objects.filter(
-        fecha_ingreso__month=mes_actual,
-        fecha_ingreso__year=anio_actual
+    operativos = Vehiculo.objetos_operativos().filter(estado='Disponible').values('pk')
+    conteos = Vehiculo.objects.aggregate(
+        total=Count('id'),
+        disponibles=Count('id', filter=Q(pk__in=operativos)),
+        en_mantenimiento=Count('id', filter=Q(estado='En mantenimiento')),
     )
-    costo_mantenimientos_mes = mantenimientos_mes.aggregate(
-        total=Sum('costo_total_real')
-    )['total'] or Decimal('0')
-    
-    cargas_mes = CargaCombustible.objects.filter(
-        fecha__month=mes_actual,
-        fecha__year=anio_actual
-    )
-    costo_combustible_mes = cargas_mes.aggregate(
-        total=Sum('costo_total')
-    )['total'] or Decimal('0')
-    
-    costo_mensual_total = costo_mantenimientos_mes + costo_combustible_mes
 
-    vehiculos = Vehiculo.objects.all()
-    vehiculos_con_disponibilidad = []
-    
-    for vehiculo in vehiculos:
-        mantenimientos_vehiculo = Mantenimiento.objects.filter(
-            vehiculo=vehiculo,
-            fecha_ingreso__month=mes_actual,
-            fecha_ingreso__year=anio_actual
-        )
-        
-        dias_fuera = 0
-        for m in mantenimientos_vehiculo:
-            if m.fecha_salida:
-                delta = (m.fecha_salida - m.fecha_ingreso).days
-                dias_fuera += max(0, delta)
-            
-        vehiculos_con_disponibilidad.append({
+    costo_mantenimientos_mes = Mantenimiento.objects.filter(
+        fecha_ingreso__gte=inicio_mes,
+        fecha_ingreso__lte=fin_mes,
+    ).aggregate(total=Sum('costo_total_real'))['total'] or Decimal('0')
+    costo_combustible_mes = CargaCombustible.objects.filter(
+        fecha__gte=inicio_mes,
+        fecha__lte=fin_mes,
+    ).aggregate(total=Sum('costo_total'))['total'] or Decimal('0')
+
+    vehiculos = list(Vehiculo.objects.order_by('id'))
+    indisponibilidad = calcular_indisponibilidad(
+        [v.id for v in vehiculos], inicio_mes, fin_mes, hoy=hoy
+    )
+    vehiculos_con_disponibilidad = [
+        {
             'vehiculo': vehiculo,
-            'dias_fuera': dias_fuera,
-        })
+            'dias_fuera': indisponibilidad['por_vehiculo'][vehiculo.id]['total'],
+        }
+        for vehiculo in vehiculos
+    ]
 
-    proximos_mantenimientos = Mantenimiento.objects.filter(
-        estado='Programado'
-    ).order_by('fecha_ingreso')[:5]
+    proximos_mantenimientos = list(
+        Mantenimiento.objects.filter(estado='Programado')
+        .select_related('vehiculo')
+        .order_by('fecha_ingreso')[:5]
+    )
 
-    alertas_operativas = alertas_mantenimiento_vigentes()
+    alertas_operativas = list(alertas_mantenimiento_vigentes())
     presupuestos_en_riesgo = presupuestos_con_alerta()
 
     alertas_activas = []
@@ -79,7 +69,6 @@ def dashboard(request):
             'icono': 'bi-car-front',
         })
 
-    ahora = timezone.now()
     for presupuesto in presupuestos_en_riesgo:
         alertas_activas.append({
             'id': presupuesto.id,
@@ -97,25 +86,36 @@ def dashboard(request):
 
     alertas_activas = sorted(alertas_activas, key=lambda a: a['fecha'], reverse=True)[:5]
 
-    alertas_operativas_vigentes = alertas_operativas.count()
+    alertas_operativas_vigentes = len(alertas_operativas)
     presupuestos_alerta = len(presupuestos_en_riesgo)
-    alertas_vigentes = alertas_operativas_vigentes + presupuestos_alerta
 
-    arriendos_activos = Arriendo.objects.filter(estado='Activo').select_related(
-        'vehiculo_arrendado', 'vehiculo_reemplazado', 'proveedor'
-    ).order_by('-fecha_inicio')
-    
-    return render(request, 'flota/dashboard.html', {
-        'total_vehiculos': total_vehiculos,
-        'vehiculos_disponibles': vehiculos_disponibles,
-        'vehiculos_mantenimiento': vehiculos_mantenimiento,
-        'costo_mensual_total': costo_mensual_total,
+    arriendos_activos = list(
+        Arriendo.objects.filter(estado='Activo').select_related(
+            'vehiculo_arrendado', 'vehiculo_reemplazado', 'proveedor'
+        ).order_by('-fecha_inicio')
+    )
+
+    return {
+        'total_vehiculos': conteos['total'],
+        'vehiculos_disponibles': conteos['disponibles'],
+        'vehiculos_mantenimiento': conteos['en_mantenimiento'],
+        'costo_mensual_total': costo_mantenimientos_mes + costo_combustible_mes,
         'vehiculos_con_disponibilidad': vehiculos_con_disponibilidad,
         'proximos_mantenimientos': proximos_mantenimientos,
         'alertas_activas': alertas_activas,
-        'alertas_vigentes': alertas_vigentes,
+        'alertas_vigentes': alertas_operativas_vigentes + presupuestos_alerta,
         'alertas_operativas_vigentes': alertas_operativas_vigentes,
         'presupuestos_alerta': presupuestos_alerta,
         'arriendos_activos': arriendos_activos,
-        'puede_eliminar_alertas': puede_escribir(request.user),
-    })
+    }
+
+
+@login_required
+def dashboard(request):
+    if request.user.rol == 'Conductor':
+        return redirect('registrar_bitacora')
+
+    # Snapshot compartido de 60 s; cualquier escritura en los modelos de origen cambia la clave
+    contexto = dict(obtener_o_calcular('dashboard', contexto_dashboard))
+    contexto['puede_eliminar_alertas'] = puede_escribir(request.user)
+    return render(request, 'flota/dashboard.html', contexto)
@@ -2,7 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse
 from django.utils import timezone
 from django.db.models import Sum
 from django.core.exceptions import ValidationError
@@ -14,6 +14,7 @@ from ..models import Mantenimiento, Vehiculo, Proveedor, Presupuesto, Alerta, Cu
 from ..forms import MantenimientoForm, ProgramarMantenimientoForm, FinalizarMantenimientoForm
 from .utilidades import es_administrador
 from ..utils import exportar_planilla_mantenimientos_excel
+from ..services.cierre_anual import obtener_cierre
 
 @login_required
 @user_passes_test(es_administrador)
@@ -66,7 +67,7 @@ def programar_mantenimiento(request):
         mantenimiento.save()
         vehiculo = mantenimiento.vehiculo
         vehiculo.estado = 'En mantenimiento'
-        vehiculo.save()
+        vehiculo.save(update_fields=['estado'])
         if tipo == 'Preventivo':
             messages.success(request, 'Mantenimiento preventivo programado exitosamente.')
         else:
@@ -86,6 +87,13 @@ def listar_mantenimientos(request):
             anio = int(anio)
         except (ValueError, TypeError):
             anio = timezone.now().year
+        cierre = obtener_cierre(anio)
+        if cierre and cierre.planilla_mantenimientos:
+            return FileResponse(
+                cierre.planilla_mantenimientos.open('rb'),
+                as_attachment=True,
+                filename=f'PLANILLA_MANTENIMIENTO_VEHICULOS_{anio}_CIERRE.xlsx',
+            )
         return exportar_planilla_mantenimientos_excel(anio)
     
     mantenimientos = Mantenimiento.objects.all()
@@ -174,7 +182,7 @@ def cambiar_estado_mantenimiento(request, id):
             vehiculo = mantenimiento.vehiculo
             if nuevo_estado in ['En taller', 'Esperando repuestos']:
                 vehiculo.estado = 'En mantenimiento'
-                vehiculo.save()
+                vehiculo.save(update_fields=['estado'])
             
             return JsonResponse({'success': True})
         else:
@@ -248,7 +256,7 @@ def finalizar_mantenimiento(request, id):
 
             vehiculo = mant.vehiculo
             vehiculo.estado = 'Disponible'
-            vehiculo.save()
+            vehiculo.save(update_fields=['estado'])
 
             messages.success(request, 'Mantenimiento finalizado y presupuesto actualizado.')
             return redirect('listar_mantenimientos')
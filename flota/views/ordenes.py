@@ -2,12 +2,15 @@ from django.urls import reverse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.utils import timezone
+from django.db import transaction
 from django.http import JsonResponse
-from datetime import datetime, date
-import re
 from ..models import OrdenCompra, OrdenTrabajo, Proveedor, Vehiculo, Mantenimiento, CuentaPresupuestaria
 from ..forms import OrdenCompraForm, OrdenTrabajoForm
+from ..services.presupuesto import PresupuestoInsuficiente
+from ..services.movimientos_presupuesto import presupuesto_diferido
+from ..services.importacion_oc import (
+    MAXIMO_CODIGOS_FORMULARIO, extraer_codigos, guardar_oc_importada, importar_ocs,
+)
 from .utilidades import es_administrador
 from ..utils import consultar_oc_mercado_publico
 
@@ -28,118 +31,21 @@ def importar_orden_compra(request):
             messages.error(request, datos['error'])
         else:
             try:
-                proveedor, created_prov = Proveedor.objects.get_or_create(
-                    rut_empresa=datos['proveedor_rut'],
-                    defaults={
-                        'nombre_fantasia': datos['proveedor_nombre'],
-                        'telefono': '',
-                        'email_contacto': '',
-                        'es_taller': True,
-                        'es_arrendador': False,
-                        'activo': True
-                    }
-                )
-                
-                if created_prov:
-                    messages.info(request, f"Proveedor {proveedor.nombre_fantasia} creado.")
-
-                fecha_emision = None
-                if datos.get('fecha_emision'):
-                    try:
-                        fecha_emision = datetime.strptime(datos['fecha_emision'], '%Y-%m-%d').date()
-                    except ValueError:
-                        fecha_emision = timezone.now().date()
-                else:
-                    fecha_emision = timezone.now().date()
-
-                vehiculo_asociado = None
-
-                def normalizar_patente_busqueda(patente):
-                    if not patente:
-                        return ""
-                    return re.sub(r'[^A-Z0-9]', '', patente.upper())
-
-                def formatear_patente_como_bd(patente):
-                    patente_limpia = normalizar_patente_busqueda(patente)
-                    if len(patente_limpia) == 6 and patente_limpia[:4].isalpha() and patente_limpia[4:].isdigit():
-                        return f"{patente_limpia[:2]}.{patente_limpia[2:4]}-{patente_limpia[4:]}"
-                    elif len(patente_limpia) == 7 and patente_limpia[:4].isalpha() and patente_limpia[4:].isdigit():
-                        return f"{patente_limpia[:2]}.{patente_limpia[2:4]}-{patente_limpia[4:]}"
-                    return patente
-
-                if datos.get('patentes_posibles'):
-                    for patente_buscada in datos['patentes_posibles']:
-                        vehiculo = Vehiculo.objects.filter(patente__iexact=patente_buscada).first()
-                        if vehiculo:
-                            vehiculo_asociado = vehiculo
-                            break
-
-                    if not vehiculo_asociado:
-                        for patente_buscada in datos['patentes_posibles']:
-                            patente_buscada_norm = normalizar_patente_busqueda(patente_buscada)
-                            for vehiculo in Vehiculo.objects.all():
-                                patente_vehiculo_norm = normalizar_patente_busqueda(vehiculo.patente)
-                                if patente_vehiculo_norm == patente_buscada_norm:
-                                    vehiculo_asociado = vehiculo
-                                    break
-                            if vehiculo_asociado:
-                                break
-
-                    if not vehiculo_asociado:
-                        for patente_buscada in datos['patentes_posibles']:
-                            patente_formateada = formatear_patente_como_bd(patente_buscada)
-                            if patente_formateada != patente_buscada:
-                                vehiculo = Vehiculo.objects.filter(patente__iexact=patente_formateada).first()
-                                if vehiculo:
-                                    vehiculo_asociado = vehiculo
-                                    break
-
-                cuenta_presupuestaria = None
-                if datos.get('codigo_presupuestario'):
-                    try:
-                        cuenta_presupuestaria = CuentaPresupuestaria.objects.get(
-                            codigo=datos['codigo_presupuestario']
-                        )
-                    except CuentaPresupuestaria.DoesNotExist:
-                        pass
-
-                oc, created_oc = OrdenCompra.objects.update_or_create(
-                    nro_oc=datos['codigo'],
-                    defaults={
-                        'descripcion': datos['descripcion'][:500],
-                        'vehiculo': vehiculo_asociado,
-                        'fecha_emision': fecha_emision,
-                        'monto_neto': datos.get('monto_neto', 0),
-                        'monto_total': datos.get('monto_total', 0),
-                        'impuesto': datos.get('impuestos', 0),
-                        'id_licitacion': datos.get('id_licitacion', ''),
-                        'folio_sigfe': '',
-                        'estado': datos.get('estado', 'Emitida'),
-                        'proveedor': proveedor,
-                        'tipo_adquisicion': datos.get('tipo_adquisicion', 'Convenio Marco'),
-                        'cuenta_presupuestaria': cuenta_presupuestaria,
-                        'presupuesto': None,
-                        'archivo_adjunto': None,
-                    }
-                )
+                # La reserva del compromiso se hace al salir; sin saldo se deshace la importación completa
+                with transaction.atomic(), presupuesto_diferido():
+                    oc, created_oc, avisos = guardar_oc_importada(datos)
 
                 if created_oc:
                     messages.success(request, f"OC {oc.nro_oc} importada exitosamente.")
                 else:
                     messages.success(request, f"OC {oc.nro_oc} actualizada.")
-                
-                if vehiculo_asociado:
-                    messages.info(request, f"Se asoció al vehículo: {vehiculo_asociado.patente}")
-                else:
-                    messages.warning(request, "No se pudo asociar a ningún vehículo. Verifica que la patente exista en el sistema.")
-                
-                if cuenta_presupuestaria:
-                    messages.info(request, f"Se asignó la cuenta: {cuenta_presupuestaria.codigo}")
-                else:
-                    messages.warning(request, "No se pudo asignar cuenta presupuestaria. Verifica que el código exista en el sistema.")
+                for nivel, aviso in avisos:
+                    getattr(messages, nivel)(request, aviso)
 
                 return redirect('detalle_orden_compra', id=oc.id)
 
+            except PresupuestoInsuficiente as e:
+                messages.error(request, f"No se pudo importar la OC {codigo_oc}: {e}")
             except Exception as e:
                 messages.error(request, f"Error: {str(e)}")
 
@@ -147,15 +53,54 @@ def importar_orden_compra(request):
 
     return render(request, 'flota/importar_oc.html')
 
+
+@login_required
+@user_passes_test(es_administrador)
+def importar_ordenes_compra_lote(request):
+    """
+    Importa varias OCs pegadas en el formulario o en un archivo CSV/texto; muestra el resultado de cada código.
+    """
+    if request.method != 'POST':
+        return redirect('importar_oc')
+
+    texto = request.POST.get('codigos_oc', '')
+    archivo = request.FILES.get('archivo_codigos')
+    if archivo:
+        texto += '\n' + archivo.read().decode('utf-8-sig', errors='ignore')
+    codigos = extraer_codigos(texto)
+
+    if not codigos:
+        messages.error(request, "No se encontraron códigos de Orden de Compra.")
+        return redirect('importar_oc')
+    if len(codigos) > MAXIMO_CODIGOS_FORMULARIO:
+        messages.error(
+            request,
+            f"Se pueden importar hasta {MAXIMO_CODIGOS_FORMULARIO} OCs por envío ({len(codigos)} recibidas). "
+            "Para más, use manage.py importar_ocs."
+        )
+        return redirect('importar_oc')
+
+    resultados = importar_ocs(codigos)
+    importadas = sum(1 for resultado in resultados if resultado['ok'])
+    if importadas == len(resultados):
+        messages.success(request, f"{importadas} OCs importadas.")
+    else:
+        messages.warning(request, f"{importadas} de {len(resultados)} OCs importadas.")
+    return render(request, 'flota/importar_oc.html', {'resultados': resultados})
+
 @login_required
 @user_passes_test(es_administrador)
 def registrar_orden_compra(request):
     if request.method == 'POST':
         form = OrdenCompraForm(request.POST, request.FILES)
         if form.is_valid():
-            orden_compra = form.save()
-            messages.success(request, f'Orden de Compra {orden_compra.nro_oc} registrada exitosamente.')
-            return redirect('listar_ordenes_compra')
+            try:
+                orden_compra = form.save()
+            except PresupuestoInsuficiente as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f'Orden de Compra {orden_compra.nro_oc} registrada exitosamente.')
+                return redirect('listar_ordenes_compra')
         else:
             for field, errors in form.errors.items():
                 for error in errors:
@@ -246,9 +191,13 @@ def modificar_orden_compra(request, id):
     if request.method == 'POST':
         form = OrdenCompraForm(request.POST, request.FILES, instance=orden)
         if form.is_valid():
-            orden = form.save()
-            messages.success(request, f'Orden de Compra {orden.nro_oc} modificada exitosamente.')
-            return redirect('listar_ordenes_compra')
+            try:
+                orden = form.save()
+            except PresupuestoInsuficiente as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f'Orden de Compra {orden.nro_oc} modificada exitosamente.')
+                return redirect('listar_ordenes_compra')
     else:
         form = OrdenCompraForm(instance=orden)
     
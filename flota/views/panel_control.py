@@ -1,22 +1,21 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q
+from django.db.models import Case, CharField, Q, Sum, Value, When
+from django.db.models.functions import ExtractMonth
 from django.utils import timezone
 import json
 import logging
 from datetime import date
-from ..models import Vehiculo, Mantenimiento, Presupuesto, CuentaPresupuestaria
-from ..constants import (
-    PREVENTIVE_ACCOUNT_CODES,
-    CORRECTIVE_ACCOUNT_CODES,
-    CUENTA_PREVENTIVO_CRITICO,
-    CUENTA_CORRECTIVO_CRITICO,
-    CUENTA_PREVENTIVO_NO_CRITICO,
-    CUENTA_CORRECTIVO_NO_CRITICO,
-)
+from ..models import Vehiculo, Mantenimiento, Presupuesto
+from ..services.disponibilidad import calcular_indisponibilidad, dias_en_periodo
+from ..services.resumen_mensual import es_periodo_mensual, leer_resumenes, usar_resumen_mensual
+from ..services.cierre_anual import obtener_cierre
+from ..constants import PREVENTIVE_ACCOUNT_CODES, CORRECTIVE_ACCOUNT_CODES
 
 logger = logging.getLogger(__name__)
 
+MESES_LABELS = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+
 @login_required
 def panel_control(request):
     hoy = timezone.now().date()
@@ -36,6 +35,104 @@ def panel_control(request):
         anio_seleccionado = hoy.year
         anio_filter = str(anio_seleccionado)
 
+    # Año cerrado: servir el snapshot guardado por `manage.py cerrar_anio`
+    cierre = obtener_cierre(anio_seleccionado)
+    if cierre:
+        context = cierre.contexto_panel_control()
+    else:
+        context = contexto_panel_control(anio_seleccionado, hoy)
+    context.update({
+        'years_disponibles': years_disponibles,
+        'anio_filter': anio_filter,
+        'cierre': cierre,
+    })
+    return render(request, 'flota/panel_control.html', context)
+
+
+def datos_financieros_panel(anio):
+    """
+    Gasto de mantenimientos finalizados del año y presupuesto programado, en dos consultas:
+    una agrupada por (patente, mes de salida, clase de cuenta) y otra con los montos asignados.
+    Totales, gasto por vehículo y drill-down mensual se derivan en Python de ese resultado.
+    """
+    clase_cuenta = Case(
+        When(cuenta_presupuestaria__codigo__in=PREVENTIVE_ACCOUNT_CODES, then=Value('preventivo')),
+        When(cuenta_presupuestaria__codigo__in=CORRECTIVE_ACCOUNT_CODES, then=Value('correctivo')),
+        default=Value('otro'),
+        output_field=CharField(),
+    )
+    filas = (
+        Mantenimiento.objects.filter(
+            fecha_salida__year=anio,
+            estado='Finalizado',
+            cuenta_presupuestaria__isnull=False
+        )
+        .annotate(mes=ExtractMonth('fecha_salida'), clase=clase_cuenta)
+        .values('vehiculo__patente', 'mes', 'clase')
+        .annotate(total=Sum('costo_total_real'))
+        .order_by('mes', 'vehiculo__patente')
+    )
+
+    mensual = {'preventivo': [0] * 12, 'correctivo': [0] * 12}
+    monthly_totals = [0] * 12
+    por_vehiculo = {}
+    por_mes = [{} for _ in range(12)]
+    for fila in filas:
+        i = fila['mes'] - 1
+        pat = fila['vehiculo__patente']
+        clase = fila['clase']
+        total = int(fila['total'] or 0)
+        monthly_totals[i] += total
+        # Cuentas fuera de preventivo/correctivo suman al total del mes pero no al desglose
+        vehiculo_mes = por_mes[i].setdefault(pat, {'preventivo': 0, 'correctivo': 0})
+        if clase == 'otro':
+            continue
+        mensual[clase][i] += total
+        vehiculo_mes[clase] += total
+        gasto = por_vehiculo.setdefault(pat, {'preventivo': 0, 'correctivo': 0, 'total': 0})
+        gasto[clase] += total
+        gasto['total'] += total
+
+    drilldown = []
+    for vehiculos_mes in por_mes:
+        drill_list = [
+            {
+                'patente': pat or '',
+                'preventivo': montos['preventivo'],
+                'correctivo': montos['correctivo'],
+                'total': montos['preventivo'] + montos['correctivo'],
+            }
+            for pat, montos in vehiculos_mes.items()
+        ]
+        drill_list.sort(key=lambda x: x['total'], reverse=True)
+        drilldown.append(drill_list)
+
+    programado = Presupuesto.objects.filter(anio=anio).aggregate(
+        total=Sum('monto_asignado'),
+        preventivo=Sum('monto_asignado', filter=Q(cuenta__codigo__in=PREVENTIVE_ACCOUNT_CODES)),
+        correctivo=Sum('monto_asignado', filter=Q(cuenta__codigo__in=CORRECTIVE_ACCOUNT_CODES)),
+    )
+
+    return {
+        'labels': MESES_LABELS,
+        'preventivo': mensual['preventivo'],
+        'correctivo': mensual['correctivo'],
+        'monthly_totals': monthly_totals,
+        'total_preventivo': sum(mensual['preventivo']),
+        'total_correctivo': sum(mensual['correctivo']),
+        'por_vehiculo': por_vehiculo,
+        'drilldown': drilldown,
+        'total_asignado': programado['total'] or 0,
+        'programado_preventivo': programado['preventivo'] or 0,
+        'programado_correctivo': programado['correctivo'] or 0,
+    }
+
+
+def contexto_panel_control(anio_seleccionado, hoy=None):
+    """
+    Contexto del panel de control para un año (sin los filtros de la página).
+    """
+    hoy = hoy or timezone.now().date()
     inicio_anio = date(anio_seleccionado, 1, 1)
     fin_anio = date(anio_seleccionado, 12, 31)
 
@@ -45,83 +142,48 @@ def panel_control(request):
     else:
         fin_calculo = fin_anio
 
-    dias_del_periodo = (fin_calculo - inicio_anio).days + 1
-
-    presupuestos_todos = Presupuesto.objects.filter(anio=anio_seleccionado)
-    total_asignado = presupuestos_todos.aggregate(Sum('monto_asignado'))['monto_asignado__sum'] or 0
+    dias_del_periodo = dias_en_periodo(inicio_anio, fin_calculo)
 
-    mantenimientos_anio = Mantenimiento.objects.filter(
-        fecha_salida__year=anio_seleccionado,
-        estado='Finalizado',
-        cuenta_presupuestaria__isnull=False
-    )
-
-    preventive_codes = PREVENTIVE_ACCOUNT_CODES
-    corrective_codes = CORRECTIVE_ACCOUNT_CODES
-
-    # --- Gasto mensual desglosado (preventivo vs correctivo) ---
-    meses_labels = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
-    monthly_prev = [0]*12
-    monthly_corr = [0]*12
-    for m in mantenimientos_anio:
-        if m.fecha_salida:
-            month = m.fecha_salida.month - 1
-            codigo = m.cuenta_presupuestaria.codigo
-            if codigo in preventive_codes:
-                monthly_prev[month] += m.costo_total_real
-            elif codigo in corrective_codes:
-                monthly_corr[month] += m.costo_total_real
-    monthly_prev = [int(x) for x in monthly_prev]
-    monthly_corr = [int(x) for x in monthly_corr]
-
-    # --- Totales anuales por tipo (según cuenta) ---
-    total_preventivo = mantenimientos_anio.filter(cuenta_presupuestaria__codigo__in=preventive_codes).aggregate(Sum('costo_total_real'))['costo_total_real__sum'] or 0
-    total_correctivo = mantenimientos_anio.filter(cuenta_presupuestaria__codigo__in=corrective_codes).aggregate(Sum('costo_total_real'))['costo_total_real__sum'] or 0
+    finanzas = datos_financieros_panel(anio_seleccionado)
+    meses_labels = finanzas['labels']
+    monthly_prev = finanzas['preventivo']
+    monthly_corr = finanzas['correctivo']
+    total_preventivo = finanzas['total_preventivo']
+    total_correctivo = finanzas['total_correctivo']
 
     # --- Top 10 vehículos con más gasto ---
-    vehiculos = Vehiculo.objects.exclude(estado='Baja')
+    vehiculos = list(Vehiculo.objects.exclude(estado='Baja').order_by('id'))
+    gasto_vehiculos = finanzas['por_vehiculo']
     gasto_por_vehiculo_detalle = []
     for v in vehiculos:
-        prev = mantenimientos_anio.filter(vehiculo=v, cuenta_presupuestaria__codigo__in=preventive_codes).aggregate(Sum('costo_total_real'))['costo_total_real__sum'] or 0
-        corr = mantenimientos_anio.filter(vehiculo=v, cuenta_presupuestaria__codigo__in=corrective_codes).aggregate(Sum('costo_total_real'))['costo_total_real__sum'] or 0
-        if prev > 0 or corr > 0:
-            gasto_por_vehiculo_detalle.append({
-                'patente': v.patente,
-                'preventivo': int(prev),
-                'correctivo': int(corr),
-                'total': int(prev+corr)
-            })
+        gasto = gasto_vehiculos.get(v.patente)
+        if gasto and (gasto['preventivo'] > 0 or gasto['correctivo'] > 0):
+            gasto_por_vehiculo_detalle.append({'patente': v.patente, **gasto})
     gasto_por_vehiculo_detalle.sort(key=lambda x: x['total'], reverse=True)
 
     # --- Disponibilidad (días fuera de servicio) ---
-    mants_anio = Mantenimiento.objects.filter(
-        Q(fecha_ingreso__year=anio_seleccionado) |
-        Q(fecha_salida__year=anio_seleccionado) |
-        Q(fecha_salida__isnull=True, fecha_ingreso__lte=fin_anio)
-    ).exclude(estado='Cancelado')
+    ids_vehiculos = [v.id for v in vehiculos]
+    if usar_resumen_mensual() and es_periodo_mensual(inicio_anio, fin_calculo):
+        dias_fuera = {
+            vid: {
+                'preventivo': fila['dias_fuera_preventivo'],
+                'correctivo': fila['dias_fuera_correctivo'],
+                'total': fila['dias_fuera_servicio'],
+            }
+            for vid, fila in leer_resumenes(ids_vehiculos, inicio_anio, fin_calculo).items()
+        }
+    else:
+        dias_fuera = calcular_indisponibilidad(ids_vehiculos, inicio_anio, fin_calculo, hoy=hoy)['por_vehiculo']
 
     dias_preventivo = 0
     dias_correctivo = 0
     dias_por_vehiculo = []
 
     for v in vehiculos:
-        mants_v = mants_anio.filter(vehiculo=v)
-        prev_dias = 0
-        corr_dias = 0
-        
-        for m in mants_v:
-            inicio = max(m.fecha_ingreso, inicio_anio)
-            fecha_termino_real = m.fecha_salida if m.fecha_salida else hoy
-            fin = min(fecha_termino_real, fin_calculo)
-            
-            if fin >= inicio:
-                duracion = (fin - inicio).days + 1
-                if m.tipo_mantencion == 'Preventivo':
-                    prev_dias += duracion
-                else:
-                    corr_dias += duracion
-        
-        total_off = min(prev_dias + corr_dias, dias_del_periodo)
+        dias_v = dias_fuera[v.id]
+        prev_dias = dias_v['preventivo']
+        corr_dias = dias_v['correctivo']
+        total_off = dias_v['total']
         operativo = dias_del_periodo - total_off
         
         dias_por_vehiculo.append({
@@ -135,25 +197,18 @@ def panel_control(request):
         dias_correctivo += corr_dias
 
     # --- Separar ambulancias y camioneta ---
-    ambulancias_qs = vehiculos.filter(tipo_carroceria='Ambulancia')
-    patentes_ambulancia = set(ambulancias_qs.values_list('patente', flat=True))
-    
-    camioneta_qs = vehiculos.filter(tipo_carroceria='Camioneta').first()
+    ambulancias_qs = [v for v in vehiculos if v.tipo_carroceria == 'Ambulancia']
+    patentes_ambulancia = {v.patente for v in ambulancias_qs}
+
+    camioneta_qs = next((v for v in vehiculos if v.tipo_carroceria == 'Camioneta'), None)
     patente_camioneta = camioneta_qs.patente if camioneta_qs else None
 
     # --- Salud de Flota (solo ambulancias) ---
     detalle_cumplimiento = []
     cumplimiento_ok = 0
     for v in ambulancias_qs:
-        ultimo_mant = v.mantenimientos.filter(
-            tipo_mantencion='Preventivo',
-            estado='Finalizado'
-        ).order_by('-fecha_salida').first()
-        if ultimo_mant:
-            recorrido = v.kilometraje_actual - ultimo_mant.km_al_ingreso
-        else:
-            recorrido = 0
-        km_ultimo = ultimo_mant.km_al_ingreso if ultimo_mant else 0
+        recorrido = v.km_desde_ultimo_preventivo
+        km_ultimo = v.km_ultimo_preventivo or 0
 
         if recorrido < 8000:
             estado = "OK"
@@ -184,7 +239,7 @@ def panel_control(request):
     cumplimiento_pct = round((cumplimiento_ok / len(ambulancias_qs)) * 100, 1) if ambulancias_qs else 0
 
     # --- Disponibilidad total (solo ambulancias) ---
-    dias_totales_amb = ambulancias_qs.count() * dias_del_periodo
+    dias_totales_amb = len(ambulancias_qs) * dias_del_periodo
     dias_operativos_amb = sum(d['operativo'] for d in dias_por_vehiculo if d['patente'] in patentes_ambulancia)
     dias_preventivo_amb = sum(d['preventivo'] for d in dias_por_vehiculo if d['patente'] in patentes_ambulancia)
     dias_correctivo_amb = sum(d['correctivo'] for d in dias_por_vehiculo if d['patente'] in patentes_ambulancia)
@@ -226,21 +281,9 @@ def panel_control(request):
             dias_por_vehiculo_ambulancias.append(d_clean)
 
     # --- Comparativa Preventivo vs Correctivo (global) usando TODOS los presupuestos ---
-    cuenta_prev_amb = CuentaPresupuestaria.objects.filter(codigo=CUENTA_PREVENTIVO_CRITICO).first()
-    cuenta_corr_amb = CuentaPresupuestaria.objects.filter(codigo=CUENTA_CORRECTIVO_CRITICO).first()
-    cuenta_prev_cam = CuentaPresupuestaria.objects.filter(codigo=CUENTA_PREVENTIVO_NO_CRITICO).first()
-    cuenta_corr_cam = CuentaPresupuestaria.objects.filter(codigo=CUENTA_CORRECTIVO_NO_CRITICO).first()
-
-    prog_prev = 0
-    prog_corr = 0
-    if cuenta_prev_amb:
-        prog_prev += presupuestos_todos.filter(cuenta=cuenta_prev_amb).aggregate(Sum('monto_asignado'))['monto_asignado__sum'] or 0
-    if cuenta_prev_cam:
-        prog_prev += presupuestos_todos.filter(cuenta=cuenta_prev_cam).aggregate(Sum('monto_asignado'))['monto_asignado__sum'] or 0
-    if cuenta_corr_amb:
-        prog_corr += presupuestos_todos.filter(cuenta=cuenta_corr_amb).aggregate(Sum('monto_asignado'))['monto_asignado__sum'] or 0
-    if cuenta_corr_cam:
-        prog_corr += presupuestos_todos.filter(cuenta=cuenta_corr_cam).aggregate(Sum('monto_asignado'))['monto_asignado__sum'] or 0
+    total_asignado = finanzas['total_asignado']
+    prog_prev = finanzas['programado_preventivo']
+    prog_corr = finanzas['programado_correctivo']
 
     ejec_prev = total_preventivo
     ejec_corr = total_correctivo
@@ -249,41 +292,11 @@ def panel_control(request):
     porcentaje_gasto = (total_ejecutado_real / total_asignado * 100) if total_asignado > 0 else 0
 
     # --- Factor Plata (drill‑down financiero) ---
-    gasto_mensual = []
     finance_data = {
         'labels': meses_labels,
-        'monthly_totals': gasto_mensual,
-        'drilldown': []
+        'monthly_totals': finanzas['monthly_totals'],
+        'drilldown': finanzas['drilldown'],
     }
-    for i in range(1, 13):
-        total_mes = mantenimientos_anio.filter(fecha_salida__month=i).aggregate(Sum('costo_total_real'))['costo_total_real__sum'] or 0
-        gasto_mensual.append(int(total_mes or 0))
-
-        qs_mes = mantenimientos_anio.filter(fecha_salida__month=i)
-        vehiculos_mes = {}
-        for m in qs_mes:
-            if m.vehiculo and m.vehiculo.patente and m.cuenta_presupuestaria:
-                pat = m.vehiculo.patente
-                if pat not in vehiculos_mes:
-                    vehiculos_mes[pat] = {'preventivo': 0, 'correctivo': 0}
-                costo = m.costo_total_real or 0
-                codigo = m.cuenta_presupuestaria.codigo
-                if codigo in preventive_codes:
-                    vehiculos_mes[pat]['preventivo'] += costo
-                elif codigo in corrective_codes:
-                    vehiculos_mes[pat]['correctivo'] += costo
-        drill_list = []
-        for pat, montos in vehiculos_mes.items():
-            prev = int(montos.get('preventivo', 0) or 0)
-            corr = int(montos.get('correctivo', 0) or 0)
-            drill_list.append({
-                'patente': pat or '',
-                'preventivo': prev,
-                'correctivo': corr,
-                'total': prev + corr
-            })
-        drill_list.sort(key=lambda x: x['total'], reverse=True)
-        finance_data['drilldown'].append(drill_list)
 
     # --- Datos de disponibilidad para JSON (solo ambulancias) ---
     disponibilidad_data = {
@@ -316,8 +329,6 @@ def panel_control(request):
 
     # --- Contexto final ---
     context = {
-        'years_disponibles': years_disponibles,
-        'anio_filter': anio_filter,
         'presupuesto_total': total_asignado,
         'presupuesto_ejecutado': total_ejecutado_real,
         'presupuesto_pct': porcentaje_gasto,
@@ -338,7 +349,7 @@ def panel_control(request):
         'dias_del_periodo': dias_del_periodo,
         'inicio_anio': inicio_anio,
         'fin_calculo': fin_calculo,
-        'ambulancias_count': ambulancias_qs.count(),
+        'ambulancias_count': len(ambulancias_qs),
         'dias_totales_amb': int(dias_totales_amb),
         'dias_operativos_amb': int(dias_operativos_amb),
         'dias_preventivo_amb': int(dias_preventivo_amb),
@@ -362,4 +373,4 @@ def panel_control(request):
     }
 
     logger.info(f"Contexto generado con {len(gasto_por_vehiculo_detalle)} vehículos con gasto.")
-    return render(request, 'flota/panel_control.html', context)
+    return context
@@ -70,11 +70,21 @@ def listar_presupuestos(request):
     mostrar_deshabilitados = request.GET.get('mostrar_deshabilitados', 'false') == 'true'
     
     presupuestos = Presupuesto.objects.all() if mostrar_deshabilitados else Presupuesto.objects.filter(activo=True)
-    presupuestos = presupuestos.order_by('-anio', 'cuenta__codigo')
+    presupuestos = presupuestos.select_related('cuenta').con_porcentaje_ejecucion()
     
     anio_filter = request.GET.get('anio')
     if anio_filter:
         presupuestos = presupuestos.filter(anio=anio_filter)
+
+    nivel_filter = request.GET.get('nivel')
+    if nivel_filter and nivel_filter.isdigit():
+        presupuestos = presupuestos.filter(nivel_alerta__gte=int(nivel_filter))
+
+    orden = request.GET.get('orden')
+    if orden == 'ejecucion':
+        presupuestos = presupuestos.order_by('-porcentaje_ejecucion', '-anio', 'cuenta__codigo')
+    else:
+        presupuestos = presupuestos.order_by('-anio', 'cuenta__codigo')
     
     total_asignado = presupuestos.aggregate(total=Sum('monto_asignado'))['total'] or 0
     total_ejecutado = presupuestos.aggregate(total=Sum('monto_ejecutado'))['total'] or 0
@@ -85,6 +95,9 @@ def listar_presupuestos(request):
     return render(request, 'flota/listar_presupuestos.html', {
         'presupuestos': presupuestos,
         'anio_filter': anio_filter,
+        'nivel_filter': nivel_filter,
+        'orden': orden,
+        'niveles_alerta': Presupuesto.NIVELES_ALERTA[1:],
         'total_asignado': total_asignado,
         'total_ejecutado': total_ejecutado,
         'total_disponible': total_asignado - total_ejecutado,
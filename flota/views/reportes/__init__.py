@@ -1,10 +1,18 @@
 """Vistas y utilidades de reportes."""
 
-from .vistas import reportes, reporte_disponibilidad, reporte_historial_unidad
+from .vistas import (
+    reportes,
+    reportes_datos_tab,
+    reportes_graficos,
+    reporte_disponibilidad,
+    reporte_historial_unidad,
+)
 from .calculos import obtener_cuentas_por_tipo_mantencion, ReporteCalculos
 
 __all__ = [
     "reportes",
+    "reportes_datos_tab",
+    "reportes_graficos",
     "reporte_disponibilidad",
     "reporte_historial_unidad",
     "obtener_cuentas_por_tipo_mantencion",
@@ -1,4 +1,4 @@
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Q, F, ExpressionWrapper, DurationField
 from decimal import Decimal
 from datetime import datetime, timedelta
 
@@ -11,6 +11,9 @@ from ...indicadores import (
     km_totales_por_vehiculo,
 )
 from ...constants import ids_cuentas_por_tipo_mantencion as _ids_cuentas_por_tipo_mantencion
+from ...services.arriendos import prorratear_arriendos
+from ...services.disponibilidad import calcular_indisponibilidad
+from ...services.resumen_mensual import es_periodo_mensual, leer_resumenes, usar_resumen_mensual
 
 def obtener_cuentas_por_tipo_mantencion(tipo_mantencion):
     """
@@ -25,60 +28,128 @@ class ReporteCalculos:
     """
     
     @staticmethod
-    def calcular_costos_vehiculo(vehiculo, fecha_desde=None, fecha_hasta=None):
+    def calcular_costos_flota(vehiculo_ids, fecha_desde=None, fecha_hasta=None, usar_resumen=None, indicadores=None):
         """
-        Calcula costos de mantenimiento, combustible y arriendos. Si se proporcionan fechas, filtra por ese período.
+        Costos por vehículo para toda la flota con un número fijo de consultas agrupadas (mantenimientos, combustible y arriendos), independiente del tamaño de la flota.
+
+        Retorna {vehiculo_id: {...}} con las mismas cifras que calculaban por separado calcular_costos_vehiculo, calcular_costos_combustible_avanzado y calcular_tiempo_mantenimiento.
+        Con usar_resumen (o settings.USAR_RESUMEN_MENSUAL) y un período de meses completos, combustible y arriendos se leen de ResumenMensualVehiculo.
+        Si se pasa un IndicadoresPeriodo del mismo período, se reutilizan sus agregados de combustible.
         """
-        mantenimientos_qs = Mantenimiento.objects.filter(vehiculo=vehiculo)
-        if fecha_desde:
-            mantenimientos_qs = mantenimientos_qs.filter(fecha_ingreso__gte=fecha_desde)
-        if fecha_hasta:
-            mantenimientos_qs = mantenimientos_qs.filter(fecha_ingreso__lte=fecha_hasta)
-        
-        costo_mantenimientos = mantenimientos_qs.aggregate(
-            total=Sum('costo_total_real')
-        )['total'] or Decimal('0')
-        costo_preventivo = mantenimientos_qs.filter(tipo_mantencion='Preventivo').aggregate(
-            total=Sum('costo_total_real')
-        )['total'] or Decimal('0')
-        costo_correctivo = mantenimientos_qs.filter(tipo_mantencion='Correctivo').aggregate(
-            total=Sum('costo_total_real')
-        )['total'] or Decimal('0')
-        
-        cargas_qs = CargaCombustible.objects.filter(patente_vehiculo=vehiculo)
+        vehiculo_ids = list(vehiculo_ids)
+        if not vehiculo_ids:
+            return {}
+
+        # 1. Mantenimientos: totales por tipo y horas de los finalizados
+        filtros_mant = {'vehiculo_id__in': vehiculo_ids}
         if fecha_desde:
-            cargas_qs = cargas_qs.filter(fecha__gte=fecha_desde)
+            filtros_mant['fecha_ingreso__gte'] = fecha_desde
         if fecha_hasta:
-            cargas_qs = cargas_qs.filter(fecha__lte=fecha_hasta)
-        costo_combustible = cargas_qs.aggregate(total=Sum('costo_total'))['total'] or Decimal('0')
-        
-        arriendos_qs = Arriendo.objects.filter(vehiculo_reemplazado=vehiculo)
-        costo_arriendos = Decimal('0')
-        if fecha_desde and fecha_hasta:
-            for arriendo in arriendos_qs:
-                inicio = arriendo.fecha_inicio
-                fin = arriendo.fecha_fin if arriendo.fecha_fin else fecha_hasta
-                inter_inicio = max(inicio, fecha_desde)
-                inter_fin = min(fin, fecha_hasta)
-                if inter_fin >= inter_inicio:
-                    dias_intersec = (inter_fin - inter_inicio).days + 1
-                    if arriendo.costo_diario:
-                        costo_arriendos += arriendo.costo_diario * dias_intersec
-                    elif arriendo.dias_arriendo > 0:
-                        costo_arriendos += (arriendo.costo_total / arriendo.dias_arriendo) * dias_intersec
+            filtros_mant['fecha_ingreso__lte'] = fecha_hasta
+        finalizado_con_salida = Q(estado='Finalizado', fecha_salida__isnull=False)
+        duracion = ExpressionWrapper(
+            F('fecha_salida') - F('fecha_ingreso'),
+            output_field=DurationField(),
+        )
+        mant_rows = (
+            Mantenimiento.objects.filter(**filtros_mant)
+            .values('vehiculo_id')
+            .annotate(
+                total=Sum('costo_total_real'),
+                preventivo=Sum('costo_total_real', filter=Q(tipo_mantencion='Preventivo')),
+                correctivo=Sum('costo_total_real', filter=Q(tipo_mantencion='Correctivo')),
+                duracion_finalizados=Sum(duracion, filter=finalizado_con_salida),
+                costo_finalizados=Sum('costo_total_real', filter=finalizado_con_salida),
+            )
+        )
+        mant_map = {row['vehiculo_id']: row for row in mant_rows}
+
+        if usar_resumen_mensual(usar_resumen) and es_periodo_mensual(fecha_desde, fecha_hasta):
+            # 2-3. Combustible y arriendos desde el resumen mensual
+            resumen = leer_resumenes(vehiculo_ids, fecha_desde, fecha_hasta)
+            comb_map = {
+                vid: {'litros': fila['litros'], 'costo': fila['costo_combustible']}
+                for vid, fila in resumen.items()
+            }
+            arriendos_map = {vid: fila['costo_arriendo'] for vid, fila in resumen.items()}
+        elif indicadores is not None:
+            comb_map = indicadores.combustible
+            arriendos_map = ReporteCalculos._costos_arriendo_flota(vehiculo_ids, fecha_desde, fecha_hasta)
         else:
-            costo_arriendos = arriendos_qs.aggregate(total=Sum('costo_total'))['total'] or Decimal('0')
-        
-        costo_total = costo_mantenimientos + costo_combustible + costo_arriendos
-        
+            # 2. Combustible: litros y costo
+            filtros_comb = {'patente_vehiculo_id__in': vehiculo_ids}
+            if fecha_desde:
+                filtros_comb['fecha__gte'] = fecha_desde
+            if fecha_hasta:
+                filtros_comb['fecha__lte'] = fecha_hasta
+            comb_rows = (
+                CargaCombustible.objects.filter(**filtros_comb)
+                .values('patente_vehiculo_id')
+                .annotate(litros=Sum('litros'), costo=Sum('costo_total'))
+            )
+            comb_map = {row['patente_vehiculo_id']: row for row in comb_rows}
+
+            # 3. Arriendos del vehículo reemplazado, prorrateados por días de intersección
+            arriendos_map = ReporteCalculos._costos_arriendo_flota(vehiculo_ids, fecha_desde, fecha_hasta)
+
+        resultado = {}
+        for vid in vehiculo_ids:
+            mant = mant_map.get(vid, {})
+            comb = comb_map.get(vid, {})
+
+            costo_mantenimientos = mant.get('total') or Decimal('0')
+            costo_combustible = comb.get('costo') or Decimal('0')
+            costo_arriendos = arriendos_map.get(vid, Decimal('0'))
+
+            total_litros = comb.get('litros') or Decimal('0')
+            costo_por_litro = (costo_combustible / total_litros) if total_litros > 0 else None
+
+            duracion_fin = mant.get('duracion_finalizados') or timedelta(0)
+            horas_mantenimiento = duracion_fin.days * 24 + (duracion_fin.seconds // 3600)
+            costo_finalizados = mant.get('costo_finalizados') or Decimal('0')
+            costo_por_hora = (costo_finalizados / horas_mantenimiento) if horas_mantenimiento > 0 else None
+
+            resultado[vid] = {
+                'costo_mantenimientos': costo_mantenimientos,
+                'costo_preventivo': mant.get('preventivo') or Decimal('0'),
+                'costo_correctivo': mant.get('correctivo') or Decimal('0'),
+                'costo_combustible': costo_combustible,
+                'costo_arriendos': costo_arriendos,
+                'costo_total': costo_mantenimientos + costo_combustible + costo_arriendos,
+                'total_litros': float(total_litros),
+                'costo_por_litro': float(costo_por_litro) if costo_por_litro is not None else None,
+                'horas_mantenimiento': horas_mantenimiento,
+                'costo_mantenimiento_total': float(costo_finalizados),
+                'costo_por_hora_mantenimiento': float(costo_por_hora) if costo_por_hora is not None else None,
+            }
+        return resultado
+
+    @staticmethod
+    def _costos_arriendo_flota(vehiculo_ids, fecha_desde=None, fecha_hasta=None):
+        """
+        Costo de arriendos por vehículo reemplazado. Con período completo prorratea vía services.arriendos; sin período suma costo_total.
+        """
+        arriendos_qs = Arriendo.objects.filter(vehiculo_reemplazado_id__in=vehiculo_ids)
+        if not (fecha_desde and fecha_hasta):
+            rows = arriendos_qs.values('vehiculo_reemplazado_id').annotate(total=Sum('costo_total'))
+            return {row['vehiculo_reemplazado_id']: row['total'] or Decimal('0') for row in rows}
+
+        return prorratear_arriendos(fecha_desde, fecha_hasta, vehiculo_ids=vehiculo_ids)['por_vehiculo']
+
+    @staticmethod
+    def calcular_costos_vehiculo(vehiculo, fecha_desde=None, fecha_hasta=None):
+        """
+        Calcula costos de mantenimiento, combustible y arriendos. Si se proporcionan fechas, filtra por ese período.
+        """
+        calculos = ReporteCalculos.calcular_costos_flota([vehiculo.id], fecha_desde, fecha_hasta)[vehiculo.id]
         return {
             'vehiculo': vehiculo,
-            'costo_mantenimientos': costo_mantenimientos,
-            'costo_preventivo': costo_preventivo,
-            'costo_correctivo': costo_correctivo,
-            'costo_combustible': costo_combustible,
-            'costo_arriendos': costo_arriendos,
-            'costo_total': costo_total,
+            'costo_mantenimientos': calculos['costo_mantenimientos'],
+            'costo_preventivo': calculos['costo_preventivo'],
+            'costo_correctivo': calculos['costo_correctivo'],
+            'costo_combustible': calculos['costo_combustible'],
+            'costo_arriendos': calculos['costo_arriendos'],
+            'costo_total': calculos['costo_total'],
         }
 
 
@@ -87,18 +158,10 @@ class ReporteCalculos:
         """
         Retorna total litros y costo por litro para un vehículo en el período.
         """
-        from decimal import Decimal
-        cargas = CargaCombustible.objects.filter(
-            patente_vehiculo=vehiculo,
-            fecha__gte=fecha_desde,
-            fecha__lte=fecha_hasta
-        )
-        total_litros = cargas.aggregate(total=Sum('litros'))['total'] or Decimal('0')
-        total_costo = cargas.aggregate(total=Sum('costo_total'))['total'] or Decimal('0')
-        costo_por_litro = (total_costo / total_litros) if total_litros > 0 else None
+        calculos = ReporteCalculos.calcular_costos_flota([vehiculo.id], fecha_desde, fecha_hasta)[vehiculo.id]
         return {
-            'total_litros': float(total_litros),
-            'costo_por_litro': float(costo_por_litro) if costo_por_litro is not None else None,
+            'total_litros': calculos['total_litros'],
+            'costo_por_litro': calculos['costo_por_litro'],
         }
 
     @staticmethod
@@ -106,25 +169,11 @@ class ReporteCalculos:
         """
         Calcula horas totales en mantenimiento y costo por hora detenida. Solo considera mantenimientos finalizados con fecha_salida.
         """
-        from decimal import Decimal
-        mants = Mantenimiento.objects.filter(
-            vehiculo=vehiculo,
-            fecha_ingreso__gte=fecha_desde,
-            fecha_ingreso__lte=fecha_hasta,
-            estado='Finalizado',
-            fecha_salida__isnull=False
-        )
-        horas_totales = 0
-        costo_total = Decimal('0')
-        for mant in mants:
-            delta = mant.fecha_salida - mant.fecha_ingreso
-            horas_totales += delta.days * 24 + (delta.seconds // 3600)
-            costo_total += mant.costo_total_real or Decimal('0')
-        costo_por_hora = (costo_total / horas_totales) if horas_totales > 0 else None
+        calculos = ReporteCalculos.calcular_costos_flota([vehiculo.id], fecha_desde, fecha_hasta)[vehiculo.id]
         return {
-            'horas_mantenimiento': horas_totales,
-            'costo_mantenimiento_total': float(costo_total),
-            'costo_por_hora_mantenimiento': float(costo_por_hora) if costo_por_hora is not None else None,
+            'horas_mantenimiento': calculos['horas_mantenimiento'],
+            'costo_mantenimiento_total': calculos['costo_mantenimiento_total'],
+            'costo_por_hora_mantenimiento': calculos['costo_por_hora_mantenimiento'],
         }
 
 
@@ -177,8 +226,15 @@ class ReporteCalculos:
         return reporte, alertas
     
     @staticmethod
-    def obtener_datos_graficos_costos(fecha_desde=None, fecha_hasta=None):
-        vehiculos = Vehiculo.objects.all()
+    def obtener_datos_graficos_costos(fecha_desde=None, fecha_hasta=None, costos_flota=None):
+        vehiculos = list(Vehiculo.objects.values_list('id', 'patente'))
+        v_ids = [vid for vid, _ in vehiculos]
+        if costos_flota is None:
+            costos_flota = ReporteCalculos.calcular_costos_flota(v_ids, fecha_desde, fecha_hasta)
+        if fecha_desde and fecha_hasta:
+            dias_fuera = calcular_indisponibilidad(v_ids, fecha_desde, fecha_hasta)['por_vehiculo']
+        else:
+            dias_fuera = {}
         datos = {
             'patentes': [],
             'costos_mantenimiento': [],
@@ -187,24 +243,14 @@ class ReporteCalculos:
             'costos_totales': [],
             'dias_fuera_servicio': []
         }
-        for vehiculo in vehiculos:
-            calculos = ReporteCalculos.calcular_costos_vehiculo(vehiculo, fecha_desde, fecha_hasta)
-            datos['patentes'].append(vehiculo.patente)
+        for vid, patente in vehiculos:
+            calculos = costos_flota[vid]
+            datos['patentes'].append(patente)
             datos['costos_mantenimiento'].append(float(calculos['costo_mantenimientos']))
             datos['costos_combustible'].append(float(calculos['costo_combustible']))
             datos['costos_arriendo'].append(float(calculos['costo_arriendos']))
             datos['costos_totales'].append(float(calculos['costo_total']))
-            
-            total_dias = 0
-            mantenimientos = vehiculo.mantenimientos.all()
-            if fecha_desde:
-                mantenimientos = mantenimientos.filter(fecha_ingreso__gte=fecha_desde)
-            if fecha_hasta:
-                mantenimientos = mantenimientos.filter(fecha_ingreso__lte=fecha_hasta)
-            for mant in mantenimientos:
-                if mant.fecha_salida:
-                    total_dias += (mant.fecha_salida - mant.fecha_ingreso).days
-            datos['dias_fuera_servicio'].append(total_dias)
+            datos['dias_fuera_servicio'].append(dias_fuera.get(vid, {}).get('total', 0))
         return datos
 
 
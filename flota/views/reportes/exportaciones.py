@@ -2,15 +2,10 @@ from decimal import Decimal
 from datetime import datetime
 from calendar import monthrange
 from django.db.models import Sum
-from ...models import Vehiculo, Mantenimiento, Presupuesto, FallaReportada
+from ...models import Vehiculo, Presupuesto
 from ...utils import exportar_reporte_excel, MESES
-from ...indicadores import (
-    frecuencia_fallas_por_vehiculo,
-    indicadores_costos_combustible,
-    promedio_dias_indisponibilidad_por_vehiculo,
-    rango_fechas_reporte,
-    km_totales_por_vehiculo,
-)
+from ...indicadores import IndicadoresPeriodo, rango_fechas_reporte
+from ...services.disponibilidad import calcular_indisponibilidad
 from .calculos import ReporteCalculos, obtener_anios_disponibles_disponibilidad
 
 def exportar_costos_excel(request, anio_excel, mes_excel=None):
@@ -18,12 +13,15 @@ def exportar_costos_excel(request, anio_excel, mes_excel=None):
 
     vehiculos = Vehiculo.objects.all().order_by('patente')
     v_ids = [v.id for v in vehiculos]
-    ind_map = indicadores_costos_combustible(v_ids, fecha_desde, fecha_hasta)
-    km_periodo_map = km_totales_por_vehiculo(v_ids, fecha_desde, fecha_hasta)
+    indicadores = IndicadoresPeriodo(v_ids, fecha_desde, fecha_hasta)
+    ind_map = indicadores.costos_combustible
+    km_periodo_map = indicadores.km
+    costos_flota = ReporteCalculos.calcular_costos_flota(v_ids, fecha_desde, fecha_hasta, indicadores=indicadores)
+    presupuesto_total = Presupuesto.objects.filter(activo=True).aggregate(total=Sum('monto_asignado'))['total'] or Decimal('0')
     
     datos = []
     for vehiculo in vehiculos:
-        calculos = ReporteCalculos.calcular_costos_vehiculo(vehiculo, fecha_desde, fecha_hasta)
+        calculos = costos_flota[vehiculo.id]
         ind = ind_map.get(vehiculo.id, {})
         km_periodo = km_periodo_map.get(vehiculo.id, 0)
         costo_periodo_total = calculos['costo_total']
@@ -41,7 +39,7 @@ def exportar_costos_excel(request, anio_excel, mes_excel=None):
             'rendimiento_km_l': ind.get('rendimiento', 'N/A'),
             'costo_combustible_km': ind.get('costo_combustible_km', 'N/A'),
             'indice_eficiencia': ind.get('indice_eficiencia', 'N/A'),
-            'presupuesto': Presupuesto.objects.filter(activo=True).aggregate(total=Sum('monto_asignado'))['total'] or Decimal('0'),
+            'presupuesto': presupuesto_total,
         })
 
     columnas = [
@@ -104,24 +102,16 @@ def exportar_disponibilidad_excel(request, anio_disp, mes_disp):
     fecha_desde, fecha_hasta = rango_fechas_reporte(anio_disp, mes_disp)
     vehiculos = Vehiculo.objects.all().order_by('patente')
     v_ids = [v.id for v in vehiculos]
-    frecuencia_map = frecuencia_fallas_por_vehiculo(v_ids, fecha_desde, fecha_hasta)
-    indisp_prom_map = promedio_dias_indisponibilidad_por_vehiculo(v_ids, fecha_desde, fecha_hasta)
+    indicadores = IndicadoresPeriodo(v_ids, fecha_desde, fecha_hasta)
+    frecuencia_map = indicadores.frecuencia_fallas
+    indisp_prom_map = indicadores.promedio_indisponibilidad
+
+    indisponibilidad = calcular_indisponibilidad(v_ids, fecha_desde, fecha_hasta)
 
     datos = []
     for vehiculo in vehiculos:
-        mantenimientos = Mantenimiento.objects.filter(vehiculo=vehiculo)
-        if mes_disp:
-            mantenimientos = mantenimientos.filter(fecha_ingreso__year=anio_disp, fecha_ingreso__month=mes_disp)
-        else:
-            mantenimientos = mantenimientos.filter(fecha_ingreso__year=anio_disp)
-
-        total_dias_fuera = 0
-        for mant in mantenimientos:
-            if mant.fecha_salida:
-                dias = (mant.fecha_salida - mant.fecha_ingreso).days
-                total_dias_fuera += max(0, dias)
-
-        incidentes = FallaReportada.objects.filter(vehiculo=vehiculo).count()
+        total_dias_fuera = indisponibilidad['por_vehiculo'][vehiculo.id]['total']
+        incidentes = indicadores.incidentes.get(vehiculo.id, 0)
         dias_disponibles = max(0, dias_periodo - total_dias_fuera)
 
         datos.append({
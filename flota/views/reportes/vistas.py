@@ -1,24 +1,22 @@
 from django.shortcuts import render, get_object_or_404
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Count
 from decimal import Decimal
 from calendar import monthrange
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
 
 from django.utils import timezone as tz
 from flota.models import (
     Vehiculo, Mantenimiento, CargaCombustible, Arriendo, Presupuesto,
-    FallaReportada, HojaRuta, Alerta, Viaje,
+    FallaReportada, HojaRuta, Alerta,
 )
 from ...utils import exportar_reporte_excel, MESES
-from ...indicadores import (
-    frecuencia_fallas_por_vehiculo,
-    indicadores_costos_combustible,
-    promedio_dias_indisponibilidad_por_vehiculo,
-    rango_fechas_reporte,
-    km_totales_por_vehiculo,
-)
+from ...indicadores import IndicadoresPeriodo, rango_fechas_reporte
+from ...services.disponibilidad import calcular_indisponibilidad, dias_fuera_por_mes_anio
+from ...services.cache_reportes import estadisticas_cache, obtener_o_calcular
+from ..utilidades import es_administrador
 from .calculos import (
     ReporteCalculos,
     TabManager,
@@ -69,8 +67,33 @@ def reportes(request):
             return exportar_costos_excel(request, anio, mes_costos)
 
     active_tab = request.GET.get('tab', 'costos')
-    tab_manager = TabManager(request)
+    parametros = parametros_reportes(request)
+
+    contexto = dict(parametros)
+    contexto.update({
+        'active_tab': active_tab,
+        'tab_manager': TabManager(request),
+        'vehiculos': Vehiculo.objects.all().order_by('patente'),
+    })
+    # Solo la pestaña visible se calcula aquí; las demás y los gráficos se piden a reportes_datos_tab / reportes_graficos
+    if active_tab in PLANTILLAS_TAB:
+        contexto.update(datos_tab(active_tab, parametros))
+    if es_administrador(request.user):
+        contexto['estadisticas_cache'] = estadisticas_cache()
+
+    return render(request, 'flota/reportes.html', contexto)
 
+
+PLANTILLAS_TAB = {
+    'costos': 'flota/reportes_tab_costos.html',
+    'disponibilidad': 'flota/reportes_tab_disponibilidad.html',
+}
+
+
+def parametros_reportes(request):
+    """
+    Filtros de las pestañas de reportes leídos del query string (con los mismos valores por defecto que la página).
+    """
     anios_disponibles = sorted(Presupuesto.objects.values_list('anio', flat=True).distinct(), reverse=True)
     if not anios_disponibles:
         anios_disponibles = [datetime.now().year]
@@ -91,22 +114,159 @@ def reportes(request):
     else:
         mes_costos = None
 
+    anio = request.GET.get('anio')
+    try:
+        anio = int(anio) if anio else anios_disponibles[0]
+    except ValueError:
+        anio = anios_disponibles[0]
+
+    if anio not in anios_disponibles:
+        anio = anios_disponibles[0]
+
+    anios_disponibles_disp = obtener_anios_disponibles_disponibilidad()
+    anio_disp = request.GET.get('anio_disp')
+    try:
+        anio_disp = int(anio_disp) if anio_disp else anios_disponibles_disp[0]
+    except (TypeError, ValueError):
+        anio_disp = anios_disponibles_disp[0]
+
+    if anio_disp not in anios_disponibles_disp:
+        anio_disp = anios_disponibles_disp[0]
+
+    mes_disp = request.GET.get('mes_disp')
+    if mes_disp and mes_disp.isdigit():
+        mes_disp = int(mes_disp)
+        if not (1 <= mes_disp <= 12):
+            mes_disp = None
+    else:
+        mes_disp = None
+
+    return {
+        'anio': anio,
+        'anio_costos': anio_costos,
+        'mes_costos': mes_costos,
+        'anios_disponibles': anios_disponibles,
+        'tipo_mantencion': request.GET.get('tipo_mantencion', ''),
+        'vehiculo_filter': request.GET.get('vehiculo', ''),
+        'anios_disponibles_disp': anios_disponibles_disp,
+        'anio_disp': anio_disp,
+        'mes_disp': mes_disp,
+    }
+
+
+def datos_tab(tab, parametros):
+    """
+    Contexto de una pestaña (cacheado por services.cache_reportes).
+    """
+    if tab == 'costos':
+        return obtener_o_calcular(
+            'costos', lambda: contexto_tab_costos(parametros['anio_costos'], parametros['mes_costos']),
+            anio=parametros['anio_costos'], mes=parametros['mes_costos'],
+        )
+    if tab == 'variacion':
+        return obtener_o_calcular(
+            'variacion', lambda: contexto_tab_variacion(parametros['anio'], parametros['tipo_mantencion']),
+            anio=parametros['anio'], tipo_mantencion=parametros['tipo_mantencion'],
+        )
+    if tab == 'disponibilidad':
+        return obtener_o_calcular(
+            'disponibilidad', lambda: contexto_tab_disponibilidad(parametros['anio_disp'], parametros['mes_disp']),
+            anio=parametros['anio_disp'], mes=parametros['mes_disp'],
+        )
+    raise Http404("Pestaña de reportes desconocida")
+
+
+@login_required
+def reportes_datos_tab(request, tab):
+    """
+    JSON de una pestaña: el HTML de sus tablas (costos, disponibilidad) o las filas de variación presupuestaria.
+    """
+    parametros = parametros_reportes(request)
+    datos = datos_tab(tab, parametros)
+    if tab == 'variacion':
+        return JsonResponse(datos)
+    html = render_to_string(PLANTILLAS_TAB[tab], {**parametros, **datos}, request=request)
+    return JsonResponse({'tab': tab, 'html': html})
+
+
+@login_required
+def reportes_graficos(request, tab):
+    """
+    JSON con las series de los gráficos de una pestaña (las mismas variables window.* que usa reportes.js).
+    """
+    parametros = parametros_reportes(request)
+    if tab == 'costos':
+        anio, mes = parametros['anio_costos'], parametros['mes_costos']
+        filas = datos_tab('costos', parametros)['reporte']
+
+        def calcular_graficos():
+            # Las cifras por vehículo ya están en las filas de la pestaña de costos: no se vuelven a consultar
+            costos_flota = {
+                item['vehiculo'].id: {
+                    'costo_mantenimientos': item['costo_mantenimiento_total'],
+                    'costo_combustible': item['costo_combustible'],
+                    'costo_arriendos': item['costo_arriendos'],
+                    'costo_total': item['costo_total_con_arriendos'],
+                }
+                for item in filas
+            }
+            return ReporteCalculos.obtener_datos_graficos_costos(*rango_fechas_reporte(anio, mes), costos_flota=costos_flota)
+
+        datos = obtener_o_calcular('graficos_costos', calcular_graficos, anio=anio, mes=mes)
+        return JsonResponse({
+            'datosGraficos': datos,
+            'patentesList': [item['patente'] for item in filas],
+            'rendimientosList': [float(item['rendimiento_km_l']) if item['rendimiento_km_l'] not in ('—', 'N/A', 'Sin datos') else 0 for item in filas],
+            'costoPorLitroList': [item['costo_por_litro'] if item['costo_por_litro'] is not None else 0 for item in filas],
+            'costoPreventivoKmList': [item['costo_preventivo_km'] for item in filas],
+            'costoCorrectivoKmList': [item['costo_correctivo_km'] for item in filas],
+            'costoMantenimientoTotalKmList': [item['costo_mant_por_km'] or None for item in filas],
+            'costoCombustibleKmList': [_numero_o_none(item['costo_combustible_km']) for item in filas],
+            'costoTotalKmList': [item['costo_total_combustible_mantenciones_km'] or None for item in filas],
+            'costoTotalConArriendoKmList': [item['costo_total_con_arriendos_km'] or None for item in filas],
+        })
+    if tab == 'disponibilidad':
+        datos = datos_tab('disponibilidad', parametros)
+        return JsonResponse({
+            'patentesDisp': datos['patentes_disp'],
+            'diasFueraDisp': datos['dias_fuera_disp'],
+            'diasPeriodoDisp': datos['dias_periodo_disp'],
+            'diasFueraMensual': datos['dias_fuera_mensual'],
+            'disponibilidadGlobal': datos['disponibilidad_global'],
+            'patentesDispList': datos['patentes_disp_list'],
+            'frecuenciasList': datos['frecuencias_list'],
+            'promediosList': datos['promedios_list'],
+            'tiemposHBOList': datos['tiempos_hbo_list'],
+        })
+    raise Http404("Pestaña de reportes desconocida")
+
+
+def _numero_o_none(valor):
+    try:
+        return float(valor) if valor not in (None, '', 'N/A') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def contexto_tab_costos(anio_costos, mes_costos):
+    """
+    Tablas de la pestaña de costos para el año/mes indicado (los gráficos se sirven aparte en reportes_graficos).
+    """
     fecha_desde_c, fecha_hasta_c = rango_fechas_reporte(anio_costos, mes_costos)
 
     vehiculos = Vehiculo.objects.all().order_by('patente')
     v_ids = [v.id for v in vehiculos]
-    ind_costos_map = indicadores_costos_combustible(v_ids, fecha_desde_c, fecha_hasta_c)
-    km_periodo_map = km_totales_por_vehiculo(v_ids, fecha_desde_c, fecha_hasta_c)
+    indicadores = IndicadoresPeriodo(v_ids, fecha_desde_c, fecha_hasta_c)
+    ind_costos_map = indicadores.costos_combustible
+    km_periodo_map = indicadores.km
+    costos_flota = ReporteCalculos.calcular_costos_flota(v_ids, fecha_desde_c, fecha_hasta_c, indicadores=indicadores)
     
     reporte_costos_data = []
     for vehiculo in vehiculos:
-        calculos = ReporteCalculos.calcular_costos_vehiculo(vehiculo, fecha_desde_c, fecha_hasta_c)
+        calculos = costos_flota[vehiculo.id]
         ind_c = ind_costos_map.get(vehiculo.id, {})
         km_periodo = km_periodo_map.get(vehiculo.id, 0)
         
-        comb_avanzado = ReporteCalculos.calcular_costos_combustible_avanzado(vehiculo, fecha_desde_c, fecha_hasta_c)
-        tiempos_mant = ReporteCalculos.calcular_tiempo_mantenimiento(vehiculo, fecha_desde_c, fecha_hasta_c)
-        
         costo_total_sin_arriendo = calculos['costo_mantenimientos'] + calculos['costo_combustible']
 
         if km_periodo > 0:
@@ -130,8 +290,8 @@ def reportes(request):
             'costo_combustible': calculos['costo_combustible'],
             'rendimiento_km_l': ind_c.get('rendimiento', '—'),
             'costo_combustible_km': ind_c.get('costo_combustible_km', 'N/A'),
-            'costo_por_litro': comb_avanzado['costo_por_litro'],
-            'total_litros': comb_avanzado['total_litros'],
+            'costo_por_litro': calculos['costo_por_litro'],
+            'total_litros': calculos['total_litros'],
             'costo_preventivo': calculos['costo_preventivo'],
             'costo_correctivo': calculos['costo_correctivo'],
             'costo_mantenimiento_total': calculos['costo_mantenimientos'],
@@ -141,53 +301,30 @@ def reportes(request):
             'costo_arriendos': calculos['costo_arriendos'],
             'costo_total_combustible_mantenciones': float(costo_total_sin_arriendo),
             'costo_total_combustible_mantenciones_km': float(costo_total_km_sin_arriendo) if costo_total_km_sin_arriendo is not None else None,
-            'horas_mantenimiento': tiempos_mant['horas_mantenimiento'],
-            'costo_por_hora_mantenimiento': tiempos_mant['costo_por_hora_mantenimiento'],
+            'horas_mantenimiento': calculos['horas_mantenimiento'],
+            'costo_por_hora_mantenimiento': calculos['costo_por_hora_mantenimiento'],
             'costo_total_con_arriendos': calculos['costo_total'],
             'costo_total_con_arriendos_km': float(costo_total_con_arriendos_km) if costo_total_con_arriendos_km is not None else None,
         })
 
-    patentes_list = [item['patente'] for item in reporte_costos_data]
-    rendimientos_list = [float(item['rendimiento_km_l']) if item['rendimiento_km_l'] not in ('—','N/A','Sin datos') else 0 for item in reporte_costos_data]
-    costo_por_litro_list = [item['costo_por_litro'] if item['costo_por_litro'] is not None else 0 for item in reporte_costos_data]
-    costo_preventivo_km_list = [item['costo_preventivo_km'] for item in reporte_costos_data]
-    costo_correctivo_km_list = [item['costo_correctivo_km'] for item in reporte_costos_data]
+    return {'reporte': reporte_costos_data}
 
-    anio = request.GET.get('anio')
-    try:
-        anio = int(anio) if anio else anios_disponibles[0]
-    except ValueError:
-        anio = anios_disponibles[0]
-
-    if anio not in anios_disponibles:
-        anio = anios_disponibles[0]
 
-    tipo_mant = request.GET.get('tipo_mantencion', '')
-    vehiculo_filter = request.GET.get('vehiculo', '')
-    
+def contexto_tab_variacion(anio, tipo_mant):
+    """
+    Datos de la pestaña de variación presupuestaria.
+    """
     reporte_variacion, alertas_variacion = ReporteCalculos.calcular_variacion_anio(anio, tipo_mantencion=tipo_mant if tipo_mant else None)
+    return {
+        'reporte_variacion': reporte_variacion,
+        'alertas_variacion': alertas_variacion,
+    }
 
-    datos_graficos = ReporteCalculos.obtener_datos_graficos_costos(fecha_desde_c, fecha_hasta_c)
-    graficos_json = json.dumps(datos_graficos)
-
-    anios_disponibles_disp = obtener_anios_disponibles_disponibilidad()
-    anio_disp = request.GET.get('anio_disp')
-    try:
-        anio_disp = int(anio_disp) if anio_disp else anios_disponibles_disp[0]
-    except (TypeError, ValueError):
-        anio_disp = anios_disponibles_disp[0]
-
-    if anio_disp not in anios_disponibles_disp:
-        anio_disp = anios_disponibles_disp[0]
-
-    mes_disp = request.GET.get('mes_disp')
-    if mes_disp and mes_disp.isdigit():
-        mes_disp = int(mes_disp)
-        if not (1 <= mes_disp <= 12):
-            mes_disp = None
-    else:
-        mes_disp = None
 
+def contexto_tab_disponibilidad(anio_disp, mes_disp):
+    """
+    Datos de la pestaña de disponibilidad (tabla por vehículo, disponibilidad global y gráficos).
+    """
     if mes_disp:
         dias_periodo = monthrange(anio_disp, mes_disp)[1]
     else:
@@ -196,39 +333,23 @@ def reportes(request):
     fecha_desde_disp, fecha_hasta_disp = rango_fechas_reporte(anio_disp, mes_disp)
     vehiculos_disp = Vehiculo.objects.all().order_by('patente')
     v_ids_disp = [v.id for v in vehiculos_disp]
-    frecuencia_map = frecuencia_fallas_por_vehiculo(v_ids_disp, fecha_desde_disp, fecha_hasta_disp)
-    indisp_prom_map = promedio_dias_indisponibilidad_por_vehiculo(v_ids_disp, fecha_desde_disp, fecha_hasta_disp)
-    tiempos_hbo = calcular_tiempos_retencion_hbo(v_ids_disp, fecha_desde_disp, fecha_hasta_disp)
+    indicadores = IndicadoresPeriodo(v_ids_disp, fecha_desde_disp, fecha_hasta_disp)
+    frecuencia_map = indicadores.frecuencia_fallas
+    indisp_prom_map = indicadores.promedio_indisponibilidad
+    tiempos_hbo = indicadores.tiempos_hbo
+
+    indisponibilidad_anio = calcular_indisponibilidad(v_ids_disp, *rango_fechas_reporte(anio_disp))
 
     reporte_disponibilidad = []
     for vehiculo in vehiculos_disp:
-        mantenimientos = Mantenimiento.objects.filter(vehiculo=vehiculo)
-        if mes_disp:
-            mantenimientos = mantenimientos.filter(fecha_ingreso__year=anio_disp, fecha_ingreso__month=mes_disp)
-        else:
-            mantenimientos = mantenimientos.filter(fecha_ingreso__year=anio_disp)
-
-        total_dias_fuera = 0
-        correctivos = Mantenimiento.objects.filter(
-            vehiculo=vehiculo,
-            tipo_mantencion='Correctivo',
-            estado='Finalizado',
-            fecha_ingreso__gte=fecha_desde_disp,
-            fecha_ingreso__lte=fecha_hasta_disp
-        ).count()
-
-        km_periodo_vehiculo = km_totales_por_vehiculo([vehiculo.id], fecha_desde_disp, fecha_hasta_disp).get(vehiculo.id, 0)
-
-        for mant in mantenimientos:
-            if mant.fecha_salida:
-                dias = (mant.fecha_salida - mant.fecha_ingreso).days
-                total_dias_fuera += max(0, dias)
-
-        incidentes = FallaReportada.objects.filter(vehiculo=vehiculo).count()
+        total_dias_fuera = dias_fuera_vehiculo(indisponibilidad_anio, vehiculo.id, anio_disp, mes_disp)
+        correctivos = indicadores.correctivos.get(vehiculo.id, 0)
+        km_periodo_vehiculo = indicadores.km.get(vehiculo.id, 0)
+        incidentes = indicadores.incidentes.get(vehiculo.id, 0)
         dias_disponibles = max(0, dias_periodo - total_dias_fuera)
 
-        tiempo_hbo = tiempos_hbo.get(vehiculo.id)
-        tiempo_hbo_formateado = f"{tiempo_hbo:.0f} min" if tiempo_hbo is not None else "N/D"
+        tiempo_hbo = tiempos_hbo.get(vehiculo.id, {})
+        tiempo_hbo_formateado = f"{tiempo_hbo['promedio']:.0f} min" if tiempo_hbo.get('promedio') is not None else "N/D"
 
         reporte_disponibilidad.append({
             'vehiculo': vehiculo,
@@ -242,6 +363,10 @@ def reportes(request):
             'frecuencia_fallas': frecuencia_map.get(vehiculo.id, 'N/A'),
             'promedio_indisponibilidad': indisp_prom_map.get(vehiculo.id, 'N/A'),
             'tiempo_hbo': tiempo_hbo_formateado,
+            'tiempo_hbo_minutos': tiempo_hbo.get('promedio'),
+            'tiempo_hbo_p50': tiempo_hbo.get('p50'),
+            'tiempo_hbo_p90': tiempo_hbo.get('p90'),
+            'viajes_hbo': tiempo_hbo.get('viajes', 0),
             'correctivos': correctivos,
             'km_periodo': km_periodo_vehiculo,
         })
@@ -272,61 +397,33 @@ def reportes(request):
         else:
             promedios_list.append(None)
 
-        tiempo_str = item['tiempo_hbo']
-        if tiempo_str and tiempo_str != 'N/D' and 'min' in tiempo_str:
-            try:
-                minutos = int(tiempo_str.split()[0])
-                tiempos_hbo_list.append(minutos)
-            except (ValueError, IndexError):
-                tiempos_hbo_list.append(None)
-        else:
-            tiempos_hbo_list.append(None)
+        minutos_hbo = item['tiempo_hbo_minutos']
+        tiempos_hbo_list.append(round(minutos_hbo) if minutos_hbo is not None else None)
 
     patentes_disp = [item['patente'] for item in reporte_disponibilidad]
     dias_fuera_disp = [item['dias_fuera_servicio'] for item in reporte_disponibilidad]
     pares = sorted(zip(patentes_disp, dias_fuera_disp), key=lambda x: x[1], reverse=True)
     patentes_disp_ordenadas, dias_fuera_disp_ordenadas = zip(*pares) if pares else ([], [])
     
-    disponibilidad_global = calcular_disponibilidad_global(vehiculos_disp, fecha_desde_disp, fecha_hasta_disp, dias_periodo)
-    dias_fuera_mensual = calcular_dias_fuera_por_mes(vehiculos_disp, anio_disp)
+    disponibilidad_global = calcular_disponibilidad_global(
+        vehiculos_disp, fecha_desde_disp, fecha_hasta_disp, dias_periodo,
+        indisponibilidad=indisponibilidad_anio, anio=anio_disp, mes=mes_disp,
+    )
+    dias_fuera_mensual = calcular_dias_fuera_por_mes(vehiculos_disp, anio_disp, indisponibilidad_anio)
 
-    disponibilidad_global_json = json.dumps(disponibilidad_global)
-    dias_fuera_mensual_json = json.dumps(dias_fuera_mensual)
-
-    return render(request, 'flota/reportes.html', {
-        'reporte': reporte_costos_data,
-        'reporte_variacion': reporte_variacion,
-        'alertas_variacion': alertas_variacion,
-        'anio': anio,
-        'anio_costos': anio_costos,
-        'mes_costos': mes_costos,
-        'anios_disponibles': anios_disponibles,
-        'active_tab': active_tab,
-        'tab_manager': tab_manager,
-        'graficos_json': graficos_json,
-        'tipo_mantencion': tipo_mant,
-        'vehiculos': vehiculos,
-        'vehiculo_filter': vehiculo_filter,
+    return {
         'reporte_disponibilidad': reporte_disponibilidad,
-        'anios_disponibles_disp': anios_disponibles_disp,
-        'anio_disp': anio_disp,
-        'mes_disp': mes_disp,
         'dias_periodo_disp': dias_periodo,
-        'patentes_list': patentes_list,
-        'rendimientos_list': rendimientos_list,
-        'costo_por_litro_list': costo_por_litro_list,
-        'costo_preventivo_km_list': costo_preventivo_km_list,
-        'costo_correctivo_km_list': costo_correctivo_km_list,
-        'disponibilidad_global_json': disponibilidad_global_json,
-        'dias_fuera_mensual_json': dias_fuera_mensual_json,
+        'disponibilidad_global': disponibilidad_global,
+        'dias_fuera_mensual': dias_fuera_mensual,
         'patentes_disp': list(patentes_disp_ordenadas),
         'dias_fuera_disp': list(dias_fuera_disp_ordenadas),
-        'patentes_disp_list_json': json.dumps(patentes_disp_list),
-        'frecuencias_list_json': json.dumps(frecuencias_list),
-        'promedios_list_json': json.dumps(promedios_list),
-        'tiempos_hbo_list_json': json.dumps(tiempos_hbo_list),
-    })
-    
+        'patentes_disp_list': patentes_disp_list,
+        'frecuencias_list': frecuencias_list,
+        'promedios_list': promedios_list,
+        'tiempos_hbo_list': tiempos_hbo_list,
+    }
+
 
 @login_required
 def reporte_disponibilidad(request):
@@ -350,26 +447,17 @@ def reporte_disponibilidad(request):
     
     fecha_desde_d, fecha_hasta_d = rango_fechas_reporte(anio, mes)
     v_ids = list(vehiculos.values_list('id', flat=True))
-    frecuencia_map = frecuencia_fallas_por_vehiculo(v_ids, fecha_desde_d, fecha_hasta_d)
-    indisp_prom_map = promedio_dias_indisponibilidad_por_vehiculo(v_ids, fecha_desde_d, fecha_hasta_d)
+    indicadores = IndicadoresPeriodo(v_ids, fecha_desde_d, fecha_hasta_d)
+    frecuencia_map = indicadores.frecuencia_fallas
+    indisp_prom_map = indicadores.promedio_indisponibilidad
+
+    indisponibilidad = calcular_indisponibilidad(v_ids, fecha_desde_d, fecha_hasta_d)
 
     reporte = []
     for vehiculo in vehiculos:
-        mantenimientos = Mantenimiento.objects.filter(vehiculo=vehiculo)
-        if mes:
-            mantenimientos = mantenimientos.filter(
-                fecha_ingreso__year=anio, fecha_ingreso__month=mes
-            )
-        else:
-            mantenimientos = mantenimientos.filter(fecha_ingreso__year=anio)
+        total_dias_fuera = indisponibilidad['por_vehiculo'][vehiculo.id]['total']
         
-        total_dias_fuera = 0
-        for mant in mantenimientos:
-            if mant.fecha_salida:
-                dias = (mant.fecha_salida - mant.fecha_ingreso).days
-                total_dias_fuera += max(0, dias)
-        
-        incidentes = FallaReportada.objects.filter(vehiculo=vehiculo).count()
+        incidentes = indicadores.incidentes.get(vehiculo.id, 0)
         dias_disponibles = max(0, dias_periodo - total_dias_fuera)
         
         reporte.append({
@@ -448,48 +536,24 @@ def reporte_historial_unidad(request, patente):
     })
 
 
-def calcular_tiempos_retencion_hbo(vehiculo_ids, fecha_desde, fecha_hasta):
+def dias_fuera_vehiculo(indisponibilidad, vehiculo_id, anio, mes=None):
     """
-    Retorna un diccionario {vehiculo_id: minutos_promedio_en_HBO} para cada vehículo en el período.
+    Días fuera de servicio del vehículo en el año o en un mes, a partir de un cálculo de indisponibilidad anual.
     """
-    resultados = {}
-    for vid in vehiculo_ids:
-        viajes = Viaje.objects.filter(
-            hoja_ruta__vehiculo_id=vid,
-            hora_salida_hbo__isnull=False,
-            hora_llegada_hbo__isnull=False,
-            hoja_ruta__fecha__gte=fecha_desde,
-            hoja_ruta__fecha__lte=fecha_hasta
-        )
-        total_minutos = 0
-        count = 0
-        for viaje in viajes:
-            fecha = viaje.hoja_ruta.fecha
-            salida = datetime.combine(fecha, viaje.hora_salida_hbo)
-            llegada = datetime.combine(fecha, viaje.hora_llegada_hbo)
-            if llegada < salida:
-                llegada += timedelta(days=1)
-            minutos = (llegada - salida).total_seconds() / 60
-            total_minutos += minutos
-            count += 1
-        promedio = (total_minutos / count) if count > 0 else None
-        resultados[vid] = promedio
-    return resultados
-
-
-def calcular_disponibilidad_global(vehiculos, fecha_desde, fecha_hasta, dias_periodo):
-    total_dias_posibles = dias_periodo * vehiculos.count()
-    total_dias_fuera = 0
-    for v in vehiculos:
-        mants = Mantenimiento.objects.filter(
-            vehiculo=v,
-            fecha_ingreso__gte=fecha_desde,
-            fecha_ingreso__lte=fecha_hasta,
-            estado='Finalizado',
-            fecha_salida__isnull=False
-        )
-        for m in mants:
-            total_dias_fuera += max(0, (m.fecha_salida - m.fecha_ingreso).days)
+    if mes:
+        mensual = indisponibilidad['por_vehiculo_mes'].get(vehiculo_id, {})
+        return mensual.get((anio, mes), {}).get('total', 0)
+    return indisponibilidad['por_vehiculo'].get(vehiculo_id, {}).get('total', 0)
+
+
+def calcular_disponibilidad_global(vehiculos, fecha_desde, fecha_hasta, dias_periodo, indisponibilidad=None, anio=None, mes=None):
+    v_ids = [v.id for v in vehiculos]
+    total_dias_posibles = dias_periodo * len(v_ids)
+    if indisponibilidad is None:
+        indisponibilidad = calcular_indisponibilidad(v_ids, fecha_desde, fecha_hasta)
+        total_dias_fuera = indisponibilidad['total']['total']
+    else:
+        total_dias_fuera = sum(dias_fuera_vehiculo(indisponibilidad, vid, anio, mes) for vid in v_ids)
     disponibilidad = max(0, total_dias_posibles - total_dias_fuera)
     porcentaje = (disponibilidad / total_dias_posibles * 100) if total_dias_posibles > 0 else 0
     return {
@@ -500,20 +564,10 @@ def calcular_disponibilidad_global(vehiculos, fecha_desde, fecha_hasta, dias_per
     }
 
 
-def calcular_dias_fuera_por_mes(vehiculos, anio):
+def calcular_dias_fuera_por_mes(vehiculos, anio, indisponibilidad=None):
     """
-    Retorna una lista de 12 elementos con la suma de días fuera de servicio cuyos mantenimientos comenzaron en cada mes del año.
+    Retorna una lista de 12 elementos con los días fuera de servicio de la flota en cada mes del año.
     """
-    meses_dias = [0] * 12
-    for v in vehiculos:
-        mants = Mantenimiento.objects.filter(
-            vehiculo=v,
-            fecha_ingreso__year=anio,
-            estado='Finalizado',
-            fecha_salida__isnull=False
-        )
-        for m in mants:
-            duracion = max(0, (m.fecha_salida - m.fecha_ingreso).days)
-            mes_idx = m.fecha_ingreso.month - 1
-            meses_dias[mes_idx] += duracion
-    return meses_dias
+    if indisponibilidad is None:
+        indisponibilidad = calcular_indisponibilidad([v.id for v in vehiculos], *rango_fechas_reporte(anio))
+    return dias_fuera_por_mes_anio(indisponibilidad, anio)
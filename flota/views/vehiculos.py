@@ -12,6 +12,7 @@ from ..services.alertas import (
     presupuestos_con_alerta,
     resolver_alerta_mantenimiento,
 )
+from ..services.cache_reportes import invalidar_modelos
 from .utilidades import es_administrador, puede_escribir, rechazar_escritura_visualizador
 
 @login_required
@@ -226,27 +227,13 @@ def eliminar_alerta_presupuesto(request, id):
 @login_required
 @rechazar_escritura_visualizador
 def alertas(request):
-    from datetime import timedelta
-    # Sincronizar alertas por tiempo: mantenimientos Programado con fecha_programada próxima o vencida
-    hoy = timezone.now().date()
-    umbral_dias = 7
-    for mant in Mantenimiento.objects.filter(estado='Programado', fecha_programada__isnull=False):
-        if mant.fecha_programada <= hoy + timedelta(days=umbral_dias):
-            if not Alerta.objects.filter(
-                vehiculo=mant.vehiculo, vigente=True,
-                descripcion__icontains='Mantenimiento programado'
-            ).exists():
-                Alerta.objects.create(
-                    vehiculo=mant.vehiculo,
-                    descripcion=f'Mantenimiento programado {mant.fecha_programada} ({mant.get_tipo_mantencion_display()})',
-                    valor_umbral=mant.km_al_ingreso or 0,
-                )
-
+    # Las alertas las abre y resuelve services/motor_alertas.py (manage.py evaluar_alertas); aquí solo se leen
     if request.method == 'POST' and request.POST.get('action') == 'marcar_revisadas':
         Alerta.objects.filter(vigente=True).update(
             vigente=False,
             resuelta_en=timezone.now()
         )
+        invalidar_modelos('Alerta')
         messages.success(request, 'Todas las alertas han sido marcadas como revisadas.')
         return redirect('alertas')
 
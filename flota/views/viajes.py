@@ -9,7 +9,7 @@ from django.utils import timezone
 from openpyxl import Workbook
 from openpyxl.styles import Font
 from ..models import (
-    HojaRuta, CargaCombustible, FallaReportada, Alerta, Viaje, Vehiculo, Usuario,
+    HojaRuta, CargaCombustible, FallaReportada, Viaje, Vehiculo, Usuario,
     PacienteTraslado, PacienteViaje, PersonaTripulacion, TripulacionViaje,
     DESTINOS_COMUNES, ROL_TRIPULACION,
 )
@@ -19,6 +19,7 @@ from ..forms import (
 )
 from .utilidades import es_conductor_o_admin, es_conductor
 from ..validators import normalizar_rut
+from ..services.kilometraje import registrar_kilometraje
 from datetime import datetime, timedelta
 import json
 
@@ -225,10 +226,7 @@ def cerrar_hoja_ruta(request, id):
             hoja.abierta = False
             hoja.save(update_fields=['km_fin', 'abierta'])
 
-            vehiculo = hoja.vehiculo
-            if km_final > vehiculo.kilometraje_actual:
-                vehiculo.kilometraje_actual = km_final
-                vehiculo.save()
+            registrar_kilometraje(hoja.vehiculo, km_final)
 
             messages.success(request, f"Turno cerrado correctamente. KM Final: {km_final}. Total recorrido: {hoja.km_recorridos} km.")
             if request.POST.get('next') == 'detalle':
@@ -338,9 +336,7 @@ def agregar_viaje(request, id):
             if not errores and pacientes_ok and tripulacion_ok:
                 viaje.save()
 
-                if viaje.km_llegada and viaje.km_llegada > hoja.vehiculo.kilometraje_actual:
-                    hoja.vehiculo.kilometraje_actual = viaje.km_llegada
-                    hoja.vehiculo.save()
+                registrar_kilometraje(hoja.vehiculo, viaje.km_llegada)
 
                 if vehiculo_tipo != 'Camioneta':
                     _guardar_tripulacion_formset(tripulacion_formset, viaje)
@@ -452,9 +448,7 @@ def modificar_viaje(request, id):
             if not errores and pacientes_ok and tripulacion_ok:
                 viaje_editado.save()
 
-                if viaje_editado.km_llegada and viaje_editado.km_llegada > hoja.vehiculo.kilometraje_actual:
-                    hoja.vehiculo.kilometraje_actual = viaje_editado.km_llegada
-                    hoja.vehiculo.save()
+                registrar_kilometraje(hoja.vehiculo, viaje_editado.km_llegada)
 
                 if vehiculo_tipo != 'Camioneta':
                     _guardar_tripulacion_formset(tripulacion_formset, viaje_editado)
@@ -626,11 +620,7 @@ def registrar_carga_combustible(request):
                     carga.conductor = request.user
                 carga.save()
                 # Actualizar kilometraje del vehículo
-                if carga.kilometraje_al_cargar:
-                    vehiculo = carga.patente_vehiculo
-                    if carga.kilometraje_al_cargar > vehiculo.kilometraje_actual:
-                        vehiculo.kilometraje_actual = carga.kilometraje_al_cargar
-                        vehiculo.save()
+                registrar_kilometraje(carga.patente_vehiculo, carga.kilometraje_al_cargar)
                 messages.success(request, 'Carga de combustible registrada exitosamente.')
                 return redirect('listar_cargas_combustible')
             except Exception as e:
@@ -698,15 +688,6 @@ def registrar_incidente(request):
                 falla = form.save(commit=False)
                 falla.conductor = request.user
                 falla.save()
-
-                # Crear alerta por falla cuando se supera el umbral de mantención
-                vehiculo = falla.vehiculo
-                if vehiculo.umbral_mantencion > 0 and vehiculo.kilometraje_actual >= vehiculo.umbral_mantencion:
-                    Alerta.objects.create(
-                        vehiculo=vehiculo,
-                        descripcion=f'Falla reportada: {falla.descripcion}',
-                        valor_umbral=vehiculo.kilometraje_actual,
-                    )
                 
                 messages.success(request, 'Incidente registrado exitosamente.')
                 return redirect('listar_incidentes')
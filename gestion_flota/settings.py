@@ -144,4 +144,60 @@ LOGOUT_REDIRECT_URL = 'login'
 
 # Ticket de Mercado Público
 MERCADO_PUBLICO_TICKET = os.getenv('MERCADO_PUBLICO_TICKET')
-
+# API de órdenes de compra (se puede apuntar a un servidor local de prueba)
+MERCADO_PUBLICO_URL = os.getenv(
+    'MERCADO_PUBLICO_URL', 'https://api.mercadopublico.cl/servicios/v1/publico/ordenesdecompra.json'
+)
+# Importación masiva (services/importacion_oc.py): consultas simultáneas, tope de consultas por segundo entre todos
+# los hilos y reintentos ante errores transitorios (timeouts, 429, 5xx) con espera exponencial desde MERCADO_PUBLICO_ESPERA s;
+# ninguna espera (tampoco la que pida un Retry-After) pasa de MERCADO_PUBLICO_ESPERA_MAXIMA s
+MERCADO_PUBLICO_HILOS = int(os.getenv('MERCADO_PUBLICO_HILOS', '4'))
+MERCADO_PUBLICO_CONSULTAS_POR_SEGUNDO = float(os.getenv('MERCADO_PUBLICO_CONSULTAS_POR_SEGUNDO', '5'))
+MERCADO_PUBLICO_REINTENTOS = int(os.getenv('MERCADO_PUBLICO_REINTENTOS', '3'))
+MERCADO_PUBLICO_ESPERA = float(os.getenv('MERCADO_PUBLICO_ESPERA', '1'))
+MERCADO_PUBLICO_ESPERA_MAXIMA = float(os.getenv('MERCADO_PUBLICO_ESPERA_MAXIMA', '30'))
+MERCADO_PUBLICO_TIMEOUT = float(os.getenv('MERCADO_PUBLICO_TIMEOUT', '30'))
+# Cliente de la API (services/mercado_publico.py): conexiones keep-alive por proceso y vigencia en segundos de las respuestas
+# guardadas (0 desactiva el caché). Con MERCADO_PUBLICO_CACHE_DIR el caché va a archivos y lo comparten los workers.
+MERCADO_PUBLICO_POOL = int(os.getenv('MERCADO_PUBLICO_POOL', str(MERCADO_PUBLICO_HILOS)))
+MERCADO_PUBLICO_CACHE_TTL = int(os.getenv('MERCADO_PUBLICO_CACHE_TTL', '600'))
+MERCADO_PUBLICO_CACHE_DIR = os.getenv('MERCADO_PUBLICO_CACHE_DIR')
+# 'grabar' guarda cada respuesta en MERCADO_PUBLICO_FIXTURES_DIR; 'reproducir' responde solo desde ahí (pruebas y benchmarks sin red)
+MERCADO_PUBLICO_MODO = os.getenv('MERCADO_PUBLICO_MODO', '')
+MERCADO_PUBLICO_FIXTURES_DIR = os.getenv(
+    'MERCADO_PUBLICO_FIXTURES_DIR', str(BASE_DIR / 'flota' / 'fixtures' / 'mercado_publico')
+)
+
+
+# Reportes: leer totales mensuales desde ResumenMensualVehiculo en vez de recalcular desde las tablas de origen
+USAR_RESUMEN_MENSUAL = os.getenv('USAR_RESUMEN_MENSUAL', 'False').lower() in ('1', 'true', 'yes')
+
+# Alertas de kilometraje (services/motor_alertas.py): umbrales (preventivo, crítico) en km desde el último preventivo por
+# tipo de carrocería. Los tipos no listados usan Vehiculo.UMBRAL_KM_PREVENTIVO / UMBRAL_KM_CRITICO. Ej.: {'Camión': (10000, 15000)}
+UMBRALES_KM_ALERTA = {}
+
+# Caché de reportes (services/cache_reportes.py). Sin REPORTES_CACHE_DIR se usa memoria local (válido con un solo proceso);
+# con varios workers, apuntar REPORTES_CACHE_DIR a un directorio compartido para usar el caché en archivos.
+REPORTES_CACHE_DIR = os.getenv('REPORTES_CACHE_DIR')
+REPORTES_CACHE_TIMEOUT = int(os.getenv('REPORTES_CACHE_TIMEOUT', '3600'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reportes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': REPORTES_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    } if REPORTES_CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reportes',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    'mercado_publico': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': MERCADO_PUBLICO_CACHE_DIR,
+    } if MERCADO_PUBLICO_CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mercado_publico',
+    },
+}